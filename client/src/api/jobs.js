@@ -0,0 +1,102 @@
+// Helpers for the backend's asynchronous job API (POST returns a job id, results are polled)
+export const API_BASE_URL = 'https://automl-studio.onrender.com';
+
+const POLL_INTERVAL_MS = 1000;
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+async function errorMessage(res) {
+  try {
+    const data = await res.json();
+    return data.detail || data.message || `Server responded with ${res.status}`;
+  } catch {
+    return `Server responded with ${res.status}`;
+  }
+}
+
+// Submit a form to a job endpoint and resolve with the job's result once it completes
+export async function submitJob(path, formData) {
+  const res = await fetch(`${API_BASE_URL}${path}`, {
+    method: 'POST',
+    body: formData,
+  });
+  if (!res.ok) throw new Error(await errorMessage(res));
+
+  const { job_id: jobId } = await res.json();
+  return waitForJob(jobId);
+}
+
+export async function waitForJob(jobId) {
+  for (;;) {
+    const res = await fetch(`${API_BASE_URL}/jobs/${jobId}/result`);
+    if (res.status === 202) {
+      await sleep(POLL_INTERVAL_MS);
+      continue;
+    }
+    if (!res.ok) throw new Error(await errorMessage(res));
+    return res.json();
+  }
+}
+
+const UPLOAD_CHUNK_BYTES = 8 * 1024 * 1024;
+const UPLOAD_RETRIES = 5;
+
+// One upload per File object: later experiments on the same file reuse its dataset id
+const uploadedDatasets = new WeakMap();
+
+async function uploadOffset(datasetId) {
+  const res = await fetch(`${API_BASE_URL}/datasets/${datasetId}`);
+  if (!res.ok) throw new Error(await errorMessage(res));
+  return (await res.json()).offset;
+}
+
+// Send a file in chunks, resuming from the server's offset after a failed chunk
+async function sendChunks(datasetId, file) {
+  let offset = 0;
+  let retries = 0;
+  while (offset < file.size) {
+    try {
+      const res = await fetch(`${API_BASE_URL}/datasets/${datasetId}`, {
+        method: 'PATCH',
+        headers: { 'Upload-Offset': String(offset) },
+        body: file.slice(offset, offset + UPLOAD_CHUNK_BYTES),
+      });
+      if (res.status === 409) {
+        offset = await uploadOffset(datasetId);
+        continue;
+      }
+      if (!res.ok) throw new Error(await errorMessage(res));
+      offset = (await res.json()).offset;
+      retries = 0;
+    } catch (err) {
+      if (++retries > UPLOAD_RETRIES) throw err;
+      await sleep(POLL_INTERVAL_MS * retries);
+      offset = await uploadOffset(datasetId);
+    }
+  }
+}
+
+async function createDataset(file) {
+  const form = new FormData();
+  form.append('filename', file.name);
+  form.append('size', file.size);
+  const res = await fetch(`${API_BASE_URL}/datasets`, { method: 'POST', body: form });
+  if (!res.ok) throw new Error(await errorMessage(res));
+  const { dataset_id: datasetId } = await res.json();
+
+  await sendChunks(datasetId, file);
+  const done = await fetch(`${API_BASE_URL}/datasets/${datasetId}/complete`, { method: 'POST' });
+  if (!done.ok) throw new Error(await errorMessage(done));
+  await waitForJob((await done.json()).job_id);
+  return datasetId;
+}
+
+// Upload a CSV once and resolve with the id /train and /api/clean accept in place of the file
+export function uploadDataset(file) {
+  if (!uploadedDatasets.has(file)) {
+    const upload = createDataset(file);
+    uploadedDatasets.set(file, upload);
+    upload.catch(() => uploadedDatasets.delete(file));
+  }
+  return uploadedDatasets.get(file);
+}
@@ -1,9 +1,11 @@
 import React, { useState, useEffect } from 'react';
+import { submitJob, uploadDataset, API_BASE_URL } from '../../api/jobs';
 
 export default function AdvancedResult({ csv, preprocessing = null, columns = [] }) {
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState('');
-  const [cleanedCSV, setCleanedCSV] = useState('');
+  const [downloadUrl, setDownloadUrl] = useState('');
+  const [sparse, setSparse] = useState(null);
   const [previewData, setPreviewData] = useState([]);
   const [stats, setStats] = useState(null);
 
@@ -13,12 +15,13 @@ export default function AdvancedResult({ csv, preprocessing = null, columns = []
     const sendToBackend = async () => {
       setLoading(true);
       setError('');
-      setCleanedCSV('');
+      setDownloadUrl('');
+      setSparse(null);
       setStats(null);
 
       try {
         const formData = new FormData();
-        formData.append('file', csv);
+        formData.append('dataset_id', await uploadDataset(csv));
         
         // Send preprocessing options as JSON if they exist
         if (preprocessing) {
@@ -32,35 +35,14 @@ export default function AdvancedResult({ csv, preprocessing = null, columns = []
 }
 
 
-        const res = await fetch('https://automl-studio.onrender.com/api/clean', {
-          method: 'POST',
-          body: formData,
-        });
-
-        if (!res.ok) {
-          const errorData = await res.json();
-          throw new Error(errorData.message || `Server responded with ${res.status}`);
-        }
-
-        // Expect JSON response with CSV and stats
-        const data = await res.json();
-        setCleanedCSV(data.csv);
+        // Cleaning runs as a background job; its result links to the stored dataset
+        // and carries the stats plus a few preview rows
+        const data = await submitJob('/api/clean', formData);
+        setDownloadUrl(`${API_BASE_URL}${data.download}`);
+        // Encoded/vectorized features also come as a compact sparse matrix
+        setSparse(data.sparse || null);
         setStats(data.stats);
-        
-        // Create preview of cleaned data
-        if (data.csv) {
-          const lines = data.csv.split('\n').slice(0, 6);
-          const headers = lines[0].split(',');
-          const previewRows = lines.slice(1).map(line => {
-            const cells = line.split(',');
-            const obj = {};
-            headers.forEach((header, idx) => {
-              obj[header] = cells[idx] ?? '';
-            });
-            return obj;
-          });
-          setPreviewData(previewRows);
-        }
+        setPreviewData(data.preview || []);
       } catch (err) {
         console.error(err);
         setError(err.message || 'Failed to clean CSV. Please try again.');
@@ -73,14 +55,12 @@ export default function AdvancedResult({ csv, preprocessing = null, columns = []
   }, [csv, preprocessing, columns]);
 
   const handleDownload = () => {
-    if (!cleanedCSV) return;
-    const blob = new Blob([cleanedCSV], { type: 'text/csv' });
-    const url = URL.createObjectURL(blob);
+    if (!downloadUrl) return;
+    // The server streams the file as an attachment, so the browser saves it directly
     const a = document.createElement('a');
-    a.href = url;
+    a.href = downloadUrl;
     a.download = 'cleaned_data.csv';
     a.click();
-    URL.revokeObjectURL(url);
   };
 
   return (
@@ -117,7 +97,7 @@ export default function AdvancedResult({ csv, preprocessing = null, columns = []
         </div>
       )}
 
-      {cleanedCSV && !loading && (
+      {downloadUrl && !loading && (
         <div className="space-y-4">
           <div className="flex justify-between items-center">
             <div>
@@ -130,12 +110,24 @@ export default function AdvancedResult({ csv, preprocessing = null, columns = []
                 </p>
               )}
             </div>
-            <button
-              onClick={handleDownload}
-              className="inline-flex items-center px-4 py-2 bg-green-600 text-white font-semibold rounded-lg hover:bg-green-700 transition-all"
-            >
-              Download Cleaned CSV
-            </button>
+            <div className="flex items-center space-x-2">
+              <button
+                onClick={handleDownload}
+                className="inline-flex items-center px-4 py-2 bg-green-600 text-white font-semibold rounded-lg hover:bg-green-700 transition-all"
+              >
+                Download Cleaned CSV
+              </button>
+              {sparse && (
+                <a
+                  href={`${API_BASE_URL}${sparse.url}`}
+                  download="cleaned_sparse.npz"
+                  title={`${sparse.columns.length} encoded features, ${sparse.nnz} non-zero values (scipy.sparse CSR)`}
+                  className="inline-flex items-center px-4 py-2 bg-white text-green-700 font-semibold border border-green-600 rounded-lg hover:bg-green-50 transition-all"
+                >
+                  Download Sparse Features (.npz)
+                </a>
+              )}
+            </div>
           </div>
 
           {stats && (
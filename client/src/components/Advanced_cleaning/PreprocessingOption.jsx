@@ -12,6 +12,7 @@ export default function PreprocessingOption({ columns = [], onChange }) {
     remove_outliers: false,
     outlier_method: 'iqr',
     outlier_threshold: 1.5,
+    outlier_action: 'remove',
     
     // Feature scaling
     feature_scaling: false,
@@ -172,6 +173,19 @@ export default function PreprocessingOption({ columns = [], onChange }) {
                 </select>
               </div>
               
+              <div>
+                <label className="block text-sm font-medium text-gray-700 mb-1">Action</label>
+                <select
+                  name="outlier_action"
+                  value={selectedOptions.outlier_action}
+                  onChange={handleInputChange}
+                  className="mt-1 block w-full pl-3 pr-10 py-2 text-base border-gray-300 focus:outline-none focus:ring-blue-500 focus:border-blue-500 sm:text-sm rounded-md"
+                >
+                  <option value="remove">Remove rows</option>
+                  <option value="clip">Clip to bounds (winsorize)</option>
+                </select>
+              </div>
+              
               {selectedOptions.outlier_method === 'iqr' && (
                 <div>
                   <label className="block text-sm font-medium text-gray-700 mb-1">IQR Threshold</label>
@@ -401,6 +415,7 @@ export default function PreprocessingOption({ columns = [], onChange }) {
                   className="mt-1 block w-full pl-3 pr-10 py-2 text-base border-gray-300 focus:outline-none focus:ring-blue-500 focus:border-blue-500 sm:text-sm rounded-md"
                 >
                   <option value="tfidf">TF-IDF</option>
+                  <option value="hashing">Hashing (fixed width)</option>
                   <option value="count">Count Vectorizer</option>
                   <option value="embedding">Word Embeddings</option>
                 </select>
@@ -2,6 +2,7 @@ import React, { useEffect, useState } from 'react';
 import { FiBarChart2, FiTrendingUp, FiCheck, FiAlertTriangle, FiDownload, FiRefreshCw } from 'react-icons/fi';
 import Dashboard from './Dashboard';
 import Dashboard2 from './Dashboard2';
+import { API_BASE_URL, submitJob, uploadDataset } from '../api/jobs';
 
 function Result({
   csv,
@@ -21,7 +22,6 @@ function Result({
       if (!csv) return;
 
       const formData = new FormData();
-      formData.append('file', csv);
       formData.append('missing', missing);
       formData.append('encoding', encoding);
       formData.append('scaler', scaler);
@@ -29,13 +29,9 @@ function Result({
       formData.append('splitRatio', splitRatio);
 
       try {
-        const res = await fetch('https://automl-studio.onrender.com/train', {
-          method: 'POST',
-          body: formData,
-        });
-
-        if (!res.ok) throw new Error(`HTTP error! Status: ${res.status}`);
-        const data = await res.json();
+        // The CSV is uploaded once; later runs on the same file only send its dataset id
+        formData.append('datasetId', await uploadDataset(csv));
+        const data = await submitJob('/train', formData);
         setResponse(data);
       } catch (err) {
         setError(err.message);
@@ -115,7 +111,7 @@ function Result({
 
   if (!response) return null;
 
-  const { metrics, visualization, prediction_plot, columns, rows, dashboard_metrics } = response;
+  const { metrics, plots = {}, columns, rows, dashboard_metrics } = response;
 
   return (
     <div className="bg-white rounded-xl shadow-lg overflow-hidden" style={{ marginTop: '10px' }}>
@@ -195,22 +191,22 @@ function Result({
         </h3>
 
         <div className="grid grid-cols-1 lg:grid-cols-2 gap-8">
-          {visualization && (
+          {plots.feature_importance && (
             <div className="bg-white p-4 rounded-lg border border-gray-200 shadow-sm">
               <h4 className="font-semibold text-gray-700 mb-3">Feature Importance</h4>
               <img
-                src={`data:image/png;base64,${visualization}`}
+                src={`${API_BASE_URL}${plots.feature_importance}`}
                 alt="Feature Importance"
                 className="w-full h-auto rounded"
               />
             </div>
           )}
 
-          {prediction_plot && (
+          {plots.prediction && (
             <div className="bg-white p-4 rounded-lg border border-gray-200 shadow-sm">
               <h4 className="font-semibold text-gray-700 mb-3">Actual vs Predicted Values</h4>
               <img
-                src={`data:image/png;base64,${prediction_plot}`}
+                src={`${API_BASE_URL}${plots.prediction}`}
                 alt="Actual vs Predicted"
                 className="w-full h-auto rounded"
               />
@@ -1,9 +1,20 @@
 # main.py
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.routes.data_routes import router as data_router
+from app.routes.job_routes import router as job_router
+from app.routes.run_routes import router as run_router
+from app.routes.metrics_routes import router as metrics_router
+from app.routes.dataset_routes import router as dataset_router
+from app.services.jobs import job_manager
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    job_manager.shutdown()
+
+app = FastAPI(lifespan=lifespan)
 
 # CORS settings
 app.add_middleware(
@@ -18,3 +29,7 @@ app.add_middleware(
 )
 
 app.include_router(data_router)
+app.include_router(job_router)
+app.include_router(run_router)
+app.include_router(metrics_router)
+app.include_router(dataset_router)
@@ -1,42 +1,150 @@
 # app/routes/data_routes.py
-from fastapi import APIRouter, File, UploadFile, Form, HTTPException
-from fastapi.responses import JSONResponse
-from app.services.train_service import train_model_service
-from app.services.adanceCleaning import AdvancedDataCleaner
+import os
+from typing import Optional
+from fastapi import APIRouter, File, UploadFile, Form, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from app.services.train_service import (
+    train_model_service, compare_models_service, validate_train_request, parse_model_list
+)
+from app.services.incremental_service import (
+    train_incremental_service, validate_incremental_request, INCREMENTAL_CHUNK_ROWS, INCREMENTAL_PASSES
+)
+from app.services.adanceCleaning import clean_file
+from app.services.jobs import job_manager
+from app.services.profile_service import (
+    profile_sample, profile_file, PROFILE_SAMPLE_BYTES, PROFILE_MAX_FILE_BYTES
+)
+from app.services.predict_service import validate_prediction_input, iter_predictions
+from app.utils.pipeline import load_pipeline
+from app.utils.ingestion import spool_upload, read_prefix, input_suffix
+from app.utils.export import negotiate_format
+from app.utils.dataset_store import get_dataset, dataset_file, content_key
 import json
 
 router = APIRouter()
 
+def _check_input(file: Optional[UploadFile], dataset_id: Optional[str]):
+    if (file is None) == (dataset_id is None):
+        raise HTTPException(status_code=400, detail="Send either a CSV file or a dataset id")
+
+async def _resolve_input(file: Optional[UploadFile], dataset_id: Optional[str]):
+    """
+    (path, content hash, paths to remove after the job) of a job's input: the
+    upload spooled to disk, or a stored dataset that is read in place.
+    """
+    if dataset_id is not None:
+        path = dataset_file(dataset_id)
+        return path, content_key(get_dataset(dataset_id)), []
+    path, upload_hash = await spool_upload(file, input_suffix(file.filename, default='.csv'))
+    return path, upload_hash, [path]
+
 @router.post("/train")
 async def train(
-    file: UploadFile = File(...),
+    file: Optional[UploadFile] = File(None),
+    datasetId: Optional[str] = Form(None),
     model: str = Form(...),
     scaler: str = Form(...),
     splitRatio: float = Form(...),
     missing: str = Form(...),
-    encoding: str = Form(...)
+    encoding: str = Form(...),
+    optimizeDtypes: bool = Form(True),
+    search: bool = Form(False),
+    searchBudget: float = Form(60.0),
+    searchMaxCandidates: int = Form(20),
+    permutationImportance: bool = Form(False),
+    permutationBudget: float = Form(30.0),
+    permutationRepeats: int = Form(5),
+    incremental: bool = Form(False),
+    chunkRows: int = Form(INCREMENTAL_CHUNK_ROWS),
+    passes: int = Form(INCREMENTAL_PASSES)
+):
+    _check_input(file, datasetId)
+    validate_train_request(None if file is None else file.filename or '', model, splitRatio)
+    if search and (searchBudget <= 0 or searchMaxCandidates < 1):
+        raise HTTPException(status_code=400, detail="Search budget and max candidates must be positive")
+    if permutationImportance and (permutationBudget <= 0 or permutationRepeats < 1):
+        raise HTTPException(status_code=400, detail="Permutation budget and repeats must be positive")
+    if incremental:
+        if search:
+            raise HTTPException(status_code=400, detail="Hyperparameter search is not available for incremental training")
+        if permutationImportance:
+            raise HTTPException(status_code=400, detail="Permutation importance is not available for incremental training")
+        validate_incremental_request(model, scaler, chunkRows, passes)
+    search_options = {"budget_seconds": searchBudget, "max_candidates": searchMaxCandidates} if search else None
+    permutation_options = {
+        "budget_seconds": permutationBudget, "n_repeats": permutationRepeats
+    } if permutationImportance else None
+    try:
+        path, upload_hash, cleanup_paths = await _resolve_input(file, datasetId)
+        if incremental:
+            # Out-of-core: the file is streamed in chunks instead of loaded whole
+            job_id = job_manager.submit(
+                "train", train_incremental_service, path, model, scaler, splitRatio, missing, encoding,
+                chunkRows, passes, cleanup_paths=cleanup_paths
+            )
+            return JSONResponse(status_code=202, content={"job_id": job_id, "status": "queued"})
+        job_id = job_manager.submit(
+            "train", train_model_service, path, model, scaler, splitRatio, missing, encoding, upload_hash,
+            optimizeDtypes, search_options, permutation_options, cleanup_paths=cleanup_paths
+        )
+        return JSONResponse(status_code=202, content={"job_id": job_id, "status": "queued"})
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/train/compare")
+async def train_compare(
+    file: Optional[UploadFile] = File(None),
+    datasetId: Optional[str] = Form(None),
+    models: str = Form(""),
+    scaler: str = Form(...),
+    splitRatio: float = Form(...),
+    missing: str = Form(...),
+    encoding: str = Form(...),
+    optimizeDtypes: bool = Form(True)
 ):
+    # models is a comma-separated subset of the model types; empty compares all of them
+    model_list = parse_model_list(models)
+    _check_input(file, datasetId)
+    validate_train_request(None if file is None else file.filename or '', model_list[0], splitRatio)
     try:
-        result = await train_model_service(file, model, scaler, splitRatio, missing, encoding)
-        return JSONResponse(content=result)
+        path, upload_hash, cleanup_paths = await _resolve_input(file, datasetId)
+        job_id = job_manager.submit(
+            "compare", compare_models_service, path, model_list, scaler, splitRatio, missing, encoding, upload_hash,
+            optimizeDtypes, cleanup_paths=cleanup_paths
+        )
+        return JSONResponse(status_code=202, content={"job_id": job_id, "status": "queued"})
+    except HTTPException as he:
+        raise he
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/api/clean")
 async def clean_data(
-    file: UploadFile = File(...),
-    preprocessing: str = Form(...)
+    request: Request,
+    file: Optional[UploadFile] = File(None),
+    dataset_id: Optional[str] = Form(None),
+    preprocessing: str = Form(...),
+    format: Optional[str] = Form(None)
 ):
+    _check_input(file, dataset_id)
     try:
         # Parse preprocessing JSON
         preprocessing_config = json.loads(preprocessing)
         # print(preprocessing_config)
+        # Format of the result's download link: the form field, else the Accept header
+        export_format = negotiate_format(format, request.headers.get("accept"))
         
-        # Initialize cleaner and process data
-        cleaner = AdvancedDataCleaner(file, preprocessing_config)
-        result = await cleaner.clean_data()
+        # Spool the upload (or use the stored dataset) and queue the cleaning job
+        path, _, cleanup_paths = await _resolve_input(file, dataset_id)
+        job_id = job_manager.submit(
+            "clean", clean_file, path, preprocessing_config, export_format, cleanup_paths=cleanup_paths
+        )
         
-        return JSONResponse(content=result)
+        return JSONResponse(status_code=202, content={"job_id": job_id, "status": "queued"})
     except json.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid preprocessing JSON")
     except HTTPException as he:
@@ -44,6 +152,54 @@ async def clean_data(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/api/profile")
+async def profile_data(file: UploadFile = File(...)):
+    """
+    Profile a sample of a dataset and suggest a /api/clean config.
+
+    For a CSV, only the first AUTOML_PROFILE_SAMPLE_BYTES (1 MB) are profiled.
+    The whole request body is still received and buffered before this runs,
+    so for a large file send only its first bytes (e.g. `file.slice(0, 1 << 20)`
+    in the browser) to save the upload's time and disk. Parquet and Arrow files
+    must be sent whole and are limited to AUTOML_PROFILE_MAX_FILE_BYTES (413 above).
+    """
+    suffix = input_suffix(file.filename, default='.csv')
+    if suffix != '.csv':
+        if file.size is not None and file.size > PROFILE_MAX_FILE_BYTES:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Parquet and Arrow files over {PROFILE_MAX_FILE_BYTES // (1024 * 1024)} MB can't be profiled; "
+                       "send the first rows as a CSV instead"
+            )
+        # Their metadata is at the end of the file, so the upload is spooled
+        # and only its leading row groups are read
+        path, _ = await spool_upload(file, suffix)
+        try:
+            return await run_in_threadpool(profile_file, path)
+        finally:
+            os.remove(path)
+    # A prefix is read; cut back to the last complete line if the client sent more
+    data, truncated = await read_prefix(file, PROFILE_SAMPLE_BYTES)
+    return await run_in_threadpool(profile_sample, data, truncated, file.size)
+
+@router.post("/predict/{run_id}")
+async def predict(run_id: str, file: UploadFile = File(...)):
+    pipeline = await run_in_threadpool(load_pipeline, run_id)
+    path, _ = await spool_upload(file)
+    try:
+        validate_prediction_input(pipeline, path)
+    except Exception:
+        os.remove(path)
+        raise
+    
+    # Batches are scored while the response streams; the spooled file is removed afterwards
+    return StreamingResponse(
+        iter_predictions(pipeline, path),
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="predictions_{run_id}.csv"'},
+        background=BackgroundTask(os.remove, path)
+    )
+
 @router.get("/test")
 def test():
-    return {"message": "Backend is working!"}
\ No newline at end of file
+    return {"message": "Backend is working!"}
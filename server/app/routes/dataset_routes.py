@@ -0,0 +1,72 @@
+# app/routes/dataset_routes.py
+from typing import Optional
+from fastapi import APIRouter, File, UploadFile, Form, Header, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from app.services.jobs import job_manager
+from app.utils.ingestion import UPLOAD_CHUNK_BYTES
+from app.utils.dataset_store import (
+    create_upload, append_chunk, complete_upload, reopen_upload, ingest_upload, get_dataset,
+    MAX_UPLOAD_CHUNK_BYTES
+)
+
+router = APIRouter()
+
+
+async def _read_upload(file: UploadFile):
+    while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+        yield chunk
+
+
+def _queue_ingest(dataset_id: str) -> JSONResponse:
+    complete_upload(dataset_id)
+    try:
+        job_id = job_manager.submit("dataset", ingest_upload, dataset_id)
+    except Exception:
+        reopen_upload(dataset_id)
+        raise
+    # The dataset is ready for /train and /api/clean once the job completes
+    return JSONResponse(status_code=202, content={"dataset_id": dataset_id, "job_id": job_id, "status": "queued"})
+
+
+@router.post("/datasets")
+async def create_dataset(
+    file: Optional[UploadFile] = File(None),
+    filename: Optional[str] = Form(None),
+    size: Optional[int] = Form(None)
+):
+    # With a file the whole CSV is uploaded at once; otherwise a resumable upload
+    # is started, its chunks sent with PATCH /datasets/{dataset_id}
+    try:
+        if file is None:
+            dataset_id = await run_in_threadpool(create_upload, filename, size)
+            return JSONResponse(status_code=201, content={
+                "dataset_id": dataset_id, "status": "uploading", "offset": 0,
+                "max_chunk_bytes": MAX_UPLOAD_CHUNK_BYTES
+            })
+        dataset_id = await run_in_threadpool(create_upload, file.filename)
+        await append_chunk(dataset_id, 0, _read_upload(file), max_bytes=None)
+        return await run_in_threadpool(_queue_ingest, dataset_id)
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.patch("/datasets/{dataset_id}")
+async def upload_dataset_chunk(dataset_id: str, request: Request, upload_offset: int = Header(...)):
+    # Upload-Offset must equal the bytes received so far (GET /datasets/{dataset_id}
+    # reports it after an interruption); the request body is appended there.
+    # A PATCH arriving while another one is still writing gets 409
+    offset = await append_chunk(dataset_id, upload_offset, request.stream())
+    return {"dataset_id": dataset_id, "status": "uploading", "offset": offset}
+
+
+@router.post("/datasets/{dataset_id}/complete")
+async def complete_dataset_upload(dataset_id: str):
+    return await run_in_threadpool(_queue_ingest, dataset_id)
+
+
+@router.get("/datasets/{dataset_id}")
+async def get_dataset_info(dataset_id: str):
+    return await run_in_threadpool(get_dataset, dataset_id)
@@ -0,0 +1,18 @@
+# app/routes/job_routes.py
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.services.jobs import job_manager
+
+router = APIRouter()
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    return job_manager.status(job_id)
+
+@router.get("/jobs/{job_id}/result")
+def get_job_result(job_id: str):
+    result = job_manager.result(job_id)
+    if result is None:
+        # Still queued or running; clients keep polling
+        return JSONResponse(status_code=202, content=job_manager.status(job_id))
+    return JSONResponse(content=result)
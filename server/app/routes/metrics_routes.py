@@ -0,0 +1,13 @@
+# app/routes/metrics_routes.py
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.utils.instrumentation import metrics
+
+router = APIRouter()
+
+# Prometheus text exposition format
+METRICS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+@router.get("/metrics")
+def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type=METRICS_MEDIA_TYPE)
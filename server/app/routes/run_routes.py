@@ -0,0 +1,69 @@
+# app/routes/run_routes.py
+import os
+from typing import Optional
+import numpy as np
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, StreamingResponse, Response
+from app.utils.run_store import run_path, write_atomic
+from app.utils.visualization import PLOT_NAMES, render_run_plot
+from app.services.adanceCleaning import SPARSE_EXPORT_FILE, STATS_FILE
+from app.utils.export import CLEANED_FILE, EXPORT_MEDIA_TYPES, negotiate_format, iter_export
+from app.utils.instrumentation import observe_stage
+from app.utils.dashboard import run_dashboard, run_dashboard_section
+
+router = APIRouter()
+
+@router.get("/runs/{run_id}/plots/{name}")
+def get_run_plot(run_id: str, name: str):
+    # Sync endpoint: FastAPI runs it in its threadpool, and the renderers are thread-safe
+    if name not in PLOT_NAMES:
+        raise HTTPException(status_code=404, detail=f"Unknown plot '{name}'. Available plots: {list(PLOT_NAMES)}")
+
+    png_path = run_path(run_id, 'plots', f'{name}.png')
+    if not os.path.exists(png_path):
+        with observe_stage('plot', f'render_{name}'), \
+                np.load(run_path(run_id, 'plot_data.npz'), allow_pickle=False) as data:
+            png = render_run_plot(name, data)
+        if png is None:
+            raise HTTPException(status_code=404, detail=f"Plot '{name}' is not available for this run")
+        write_atomic(png_path, png)
+
+    return FileResponse(png_path, media_type="image/png")
+
+@router.get("/runs/{run_id}/sparse")
+def get_run_sparse_export(run_id: str):
+    path = run_path(run_id, SPARSE_EXPORT_FILE)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="This run has no sparse export")
+    return FileResponse(path, media_type="application/octet-stream", filename=SPARSE_EXPORT_FILE)
+
+@router.get("/runs/{run_id}/cleaned")
+def download_cleaned(run_id: str, request: Request, format: Optional[str] = None):
+    # ?format= wins over the Accept header; the stored Parquet is converted batch by batch
+    path = run_path(run_id, CLEANED_FILE)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="This run has no cleaned dataset")
+    fmt = negotiate_format(format, request.headers.get("accept"))
+    return StreamingResponse(
+        iter_export(path, fmt),
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="cleaned_{run_id}.{fmt}"'}
+    )
+
+@router.get("/runs/{run_id}/stats")
+def get_run_stats(run_id: str):
+    path = run_path(run_id, STATS_FILE)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="This run has no cleaning stats")
+    return FileResponse(path, media_type="application/json")
+
+@router.get("/runs/{run_id}/dashboard")
+def get_run_dashboard(run_id: str):
+    # Plotly figure specs for plotly.js; sections are generated once and cached in the run
+    with observe_stage('plot', 'dashboard'):
+        return Response(run_dashboard(run_id), media_type="application/json")
+
+@router.get("/runs/{run_id}/dashboard/{section}")
+def get_run_dashboard_section(run_id: str, section: str):
+    with observe_stage('plot', f'dashboard_{section}'):
+        return Response(run_dashboard_section(run_id, section), media_type="application/json")
@@ -1,25 +1,232 @@
 # app/services/advanceCleaning.py
+import io
+import os
+import math
+import time
 import pandas as pd
 import numpy as np
+import scipy.sparse as sp
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 import json
-from io import StringIO
 from fastapi import HTTPException
-from sklearn.impute import KNNImputer
+from sklearn.neighbors import NearestNeighbors
 from sklearn.preprocessing import StandardScaler, MinMaxScaler, OneHotEncoder
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer
 from sklearn.decomposition import PCA
 from imblearn.over_sampling import SMOTE
-from scipy import stats
+from joblib import Parallel, delayed
 import re
 import logging
+from app.utils.ingestion import read_dataset
+from app.utils.preprocessing import add_fill_categories
+from app.utils.run_store import create_run, run_path, write_atomic
+from app.utils.instrumentation import StageTimer
+from app.utils.export import (
+    CLEANED_FILE, DEFAULT_EXPORT_FORMAT, EXPORT_BATCH_ROWS, write_parquet, write_parquet_tables, to_arrow_table
+)
+from app.utils.dataset_store import register_dataset
+from app.services.jobs import job_cpus
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Standard missing value indicators, compared after strip() and lower()
+MISSING_INDICATORS = frozenset([
+    '', 'none', 'na', 'n/a', 'nan', 'null', 'missing', '-',
+    'we dont have comf', '?', '.'
+])
+
+# File the sparse (one-hot / TF-IDF) part of a cleaned dataset is exported to
+SPARSE_EXPORT_FILE = 'cleaned_sparse.npz'
+STATS_FILE = 'stats.json'
+# Rows of the cleaned dataset included inline in the job result
+PREVIEW_ROWS = 5
+# Memory for one batch of sparse features expanded to dense columns in the export
+EXPORT_DENSE_BATCH_BYTES = int(os.getenv("AUTOML_EXPORT_DENSE_BATCH_MB", "64")) * 1024 * 1024
+
+# KNN imputation searches neighbors in a bounded sample of complete rows (the
+# reference set) and imputes incomplete rows in chunks spread over workers
+KNN_REFERENCE_ROWS = int(os.getenv("AUTOML_KNN_REFERENCE_ROWS", "20000"))
+KNN_CHUNK_ROWS = int(os.getenv("AUTOML_KNN_CHUNK_ROWS", "5000"))
+# Parallel chunk queries; -1 uses the job's share of the cores (see job_cpus)
+KNN_WORKERS = int(os.getenv("AUTOML_KNN_WORKERS", "-1"))
+
+
+def _sparse_row_hashes(matrix) -> np.ndarray:
+    """
+    64-bit hash of every row of a CSR matrix, so rows can take part in
+    drop_duplicates without densifying. Equal rows always get equal hashes.
+    """
+    matrix = matrix.tocsr(copy=True)
+    matrix.sum_duplicates()
+    matrix.eliminate_zeros()
+    # Mix each stored value with its column index; the per-row sum does not depend on order
+    with np.errstate(over='ignore'):
+        element_hashes = (pd.util.hash_array(matrix.data) * np.uint64(0x9E3779B97F4A7C15)
+                          + pd.util.hash_array(matrix.indices.astype(np.int64)))
+    row_ids = np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+    hashes = np.zeros(matrix.shape[0], dtype=np.uint64)
+    np.add.at(hashes, row_ids, element_hashes)
+    return hashes
+
+
+# Text columns are vectorized in chunks of rows spread over worker threads ('hashing' only);
+# -1 uses the job's share of the cores (see job_cpus)
+TEXT_CHUNK_ROWS = int(os.getenv("AUTOML_TEXT_CHUNK_ROWS", "100000"))
+TEXT_WORKERS = int(os.getenv("AUTOML_TEXT_WORKERS", "-1"))
+# Output width of the stateless hashing vectorizer, per text column
+HASHING_FEATURES = 1024
+
+# Basic English stop words list (can be expanded)
+STOP_WORDS = frozenset([
+    'i', 'me', 'my', 'myself', 'we', 'our', 'ours', 'ourselves', 'you', "you're", 
+    "you've", "you'll", "you'd", 'your', 'yours', 'yourself', 'yourselves', 'he', 
+    'him', 'his', 'himself', 'she', "she's", 'her', 'hers', 'herself', 'it', 
+    "it's", 'its', 'itself', 'they', 'them', 'their', 'theirs', 'themselves', 
+    'what', 'which', 'who', 'whom', 'this', 'that', "that'll", 'these', 'those', 
+    'am', 'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 
+    'having', 'do', 'does', 'did', 'doing', 'a', 'an', 'the', 'and', 'but', 'if', 
+    'or', 'because', 'as', 'until', 'while', 'of', 'at', 'by', 'for', 'with', 
+    'about', 'against', 'between', 'into', 'through', 'during', 'before', 'after', 
+    'above', 'below', 'to', 'from', 'up', 'down', 'in', 'out', 'on', 'off', 'over', 
+    'under', 'again', 'further', 'then', 'once', 'here', 'there', 'when', 'where', 
+    'why', 'how', 'all', 'any', 'both', 'each', 'few', 'more', 'most', 'other', 
+    'some', 'such', 'no', 'nor', 'not', 'only', 'own', 'same', 'so', 'than', 'too', 
+    'very', 's', 't', 'can', 'will', 'just', 'don', "don't", 'should', "should've", 
+    'now', 'd', 'll', 'm', 'o', 're', 've', 'y', 'ain', 'aren', "aren't", 'couldn', 
+    "couldn't", 'didn', "didn't", 'doesn', "doesn't", 'hadn', "hadn't", 'hasn', 
+    "hasn't", 'haven', "haven't", 'isn', "isn't", 'ma', 'mightn', "mightn't", 
+    'mustn', "mustn't", 'needn', "needn't", 'shan', "shan't", 'shouldn', 
+    "shouldn't", 'wasn', "wasn't", 'weren', "weren't", 'won', "won't", 'wouldn', 
+    "wouldn't"
+])
+
+# Text cleaning runs as Arrow compute kernels (RE2 regexes over whole arrays).
+# Special characters are anything but ASCII letters, digits and whitespace, where
+# whitespace matches Python's str.isspace() so results equal the old re-based cleaning.
+_SPECIAL_CHARS_PATTERN = r'[^a-zA-Z0-9\t\n\x0b\f\r\x1c-\x1f\x85\p{Z}]'
+# Basic lemmatization: strip one of -ing, -ly, -s, -ed from the end of a token
+_LEMMA_PATTERN = r'^(.*)(?:ing|ly|s|ed)$'
+_STOP_WORDS_ARRAY = pa.array(sorted(STOP_WORDS))
+
+
+def clean_text_series(series: pd.Series, remove_stopwords: bool = False, lemmatize: bool = False) -> pd.Series:
+    """
+    Lowercase, strip special characters and optionally drop stop words and
+    lemmatize, without per-row Python calls. Only distinct values are cleaned,
+    and stop words and lemmas are resolved once per distinct token.
+    """
+    codes, uniques = pd.factorize(series.astype(str))
+    text = pa.array(uniques, type=pa.string())
+    text = pc.replace_substring_regex(pc.utf8_lower(text), _SPECIAL_CHARS_PATTERN, '')
+    
+    if remove_stopwords or lemmatize:
+        # Tokenize into one flat array plus the index of the text each token came from
+        token_lists = pc.utf8_split_whitespace(text)
+        tokens = pc.list_flatten(token_lists)
+        parents = pc.list_parent_indices(token_lists)
+        keep = pc.greater(pc.utf8_length(tokens), 0)
+        if remove_stopwords:
+            keep = pc.and_(keep, pc.invert(pc.is_in(tokens, value_set=_STOP_WORDS_ARRAY)))
+        tokens, parents = tokens.filter(keep), parents.filter(keep)
+        if lemmatize:
+            encoded = pc.dictionary_encode(tokens)
+            tokens = pc.take(pc.replace_substring_regex(encoded.dictionary, _LEMMA_PATTERN, r'\1'), encoded.indices)
+        
+        # Re-join the surviving tokens of every text with single spaces
+        counts = np.bincount(parents.to_numpy(), minlength=len(text))
+        offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int32)
+        text = pc.binary_join(pa.ListArray.from_arrays(pa.array(offsets), tokens), ' ')
+    
+    return pd.Series(text.to_numpy(zero_copy_only=False)[codes], index=series.index)
+
+
+def _hash_text_chunk(vectorizer, texts):
+    return vectorizer.transform(texts)
+
+
+def _knn_impute_chunk(index, fill_source, observed, block):
+    """
+    Impute a chunk of rows sharing one missing-value pattern: index is the
+    nearest-neighbor index of the reference rows on the observed columns only
+    (what nan_euclidean ranks on), fill_source the reference rows' values of
+    the missing columns. Returns the filled block.
+    """
+    block = block.copy()
+    neighbors = index.kneighbors(block[:, observed], return_distance=False)
+    block[:, ~observed] = fill_source[neighbors].mean(axis=1)
+    return block
+
+
+def knn_impute(values: np.ndarray, n_neighbors: int = 5, reference_size: int = KNN_REFERENCE_ROWS,
+               chunk_rows: int = KNN_CHUNK_ROWS, n_jobs: int = KNN_WORKERS, random_state: int = 0) -> dict:
+    """
+    Approximate KNN imputation of a float matrix, in place.
+
+    Neighbors are searched in a random sample of at most reference_size complete
+    rows instead of the whole dataset. Incomplete rows are grouped by missing
+    pattern, so each group is a plain nearest-neighbor query on its observed
+    columns, and processed in chunks spread over parallel workers.
+    Raises ValueError if fewer than two rows are complete.
+    """
+    missing = np.isnan(values)
+    row_missing = missing.any(axis=1)
+    complete = np.flatnonzero(~row_missing)
+    if len(complete) < 2:
+        raise ValueError("Not enough complete rows for KNN")
+
+    if len(complete) > reference_size:
+        rng = np.random.default_rng(random_state)
+        reference = np.sort(rng.choice(complete, size=reference_size, replace=False))
+    else:
+        reference = complete
+    reference_values = values[reference]
+    n_neighbors = min(n_neighbors, len(reference))
+
+    incomplete = np.flatnonzero(row_missing)
+    patterns, pattern_ids = np.unique(missing[incomplete], axis=0, return_inverse=True)
+    tasks = []
+    for p, pattern in enumerate(patterns):
+        rows = incomplete[pattern_ids.ravel() == p]
+        observed = ~pattern
+        if not observed.any():
+            values[rows] = reference_values.mean(axis=0)
+            continue
+        # One index per pattern, shared by all of its chunks
+        index = NearestNeighbors(n_neighbors=n_neighbors).fit(reference_values[:, observed])
+        fill_source = reference_values[:, pattern]
+        tasks.extend((index, fill_source, observed, rows[i:i + chunk_rows]) for i in range(0, len(rows), chunk_rows))
+
+    if tasks:
+        # Threads share the fitted indexes instead of pickling them to every
+        # chunk; neighbor queries release the GIL
+        n_jobs = n_jobs if n_jobs > 0 else job_cpus()
+        imputed = Parallel(n_jobs=n_jobs if len(tasks) > 1 else 1, prefer='threads')(
+            delayed(_knn_impute_chunk)(index, fill_source, observed, values[rows])
+            for index, fill_source, observed, rows in tasks
+        )
+        for (*_, rows), block in zip(tasks, imputed):
+            values[rows] = block
+
+    return {
+        'reference_rows': int(len(reference)),
+        'complete_rows': int(len(complete)),
+        'rows_imputed': int(len(incomplete)),
+        'missing_patterns': int(len(patterns)),
+        'chunks': len(tasks),
+        'n_neighbors': int(n_neighbors)
+    }
+
+
 class AdvancedDataCleaner:
-    def __init__(self, file, preprocessing_config):
-        self.file = file
+    def __init__(self, path, preprocessing_config, export_format=DEFAULT_EXPORT_FORMAT):
+        self.path = path
         self.preprocessing = preprocessing_config
+        self.export_format = export_format
         self.df = None
+        # One-hot and TF-IDF blocks as (column names, CSR matrix), row-aligned with self.df
+        self.sparse_blocks = []
         self.stats = {
             'rows_processed': 0,
             'rows_removed': 0,
@@ -30,60 +237,83 @@ class AdvancedDataCleaner:
             'duplicates_removed': 0,
             'outliers_removed': 0
         }
+        self.timer = StageTimer()
     
-    async def clean_data(self):
+    def clean_data(self):
         try:
-            # Read the CSV file
-            contents = await self.file.read()
-            self.df = pd.read_csv(StringIO(contents.decode('utf-8')))
-            self.stats['rows_processed'] = len(self.df)
-            
             # Validate columns from preprocessing config
             self._validate_columns()
             
+            # Read the spooled upload or stored dataset, optionally with compact dtypes.
+            # Only the configured columns are read (all of them when none are configured)
+            memory_report = {}
+            with self.timer.stage('parse'):
+                self.df = read_dataset(
+                    self.path,
+                    columns=self._configured_columns() or None,
+                    optimize=self.preprocessing.get('optimize_dtypes', False),
+                    report=memory_report
+                )
+            if memory_report:
+                self.stats['memory'] = memory_report
+            self.stats['rows_processed'] = len(self.df)
+            
             # Apply preprocessing steps
             if self.preprocessing.get('impute_missing', False):
-                self._handle_missing_values()
+                with self.timer.stage('handle_missing_values'):
+                    self._handle_missing_values()
             
             if self.preprocessing.get('remove_outliers', False):
-                self._handle_outliers()
+                with self.timer.stage('handle_outliers'):
+                    self._handle_outliers()
             
             if self.preprocessing.get('feature_scaling', False):
-                self._scale_features()
+                with self.timer.stage('scale_features'):
+                    self._scale_features()
             
             if self.preprocessing.get('encode_categorical', False):
-                self._encode_categorical()
+                with self.timer.stage('encode_categorical'):
+                    self._encode_categorical()
             
             if self.preprocessing.get('text_processing', False):
-                self._process_text_columns()
+                with self.timer.stage('process_text_columns'):
+                    self._process_text_columns()
             
             if self.preprocessing.get('dimensionality_reduction', False):
-                self._reduce_dimensionality()
+                with self.timer.stage('reduce_dimensionality'):
+                    self._reduce_dimensionality()
             
             if self.preprocessing.get('handle_imbalance', False):
-                self._handle_imbalance()
+                with self.timer.stage('handle_imbalance'):
+                    self._handle_imbalance()
             
             # Final cleanup
-            self._remove_duplicates()
-            
-            return {
-                'csv': self.df.to_csv(index=False),
-                'stats': self.stats
-            }
+            with self.timer.stage('remove_duplicates'):
+                self._remove_duplicates()
+            
+            with self.timer.stage('export'):
+                result = self._export()
+            result['timings'] = self.timer.to_dict()
+            return result
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
     
-    def _validate_columns(self):
-        available_cols = set(self.preprocessing.get('available_columns', []))
-        config_cols = set()
-        
-        # Collect all columns mentioned in preprocessing config
+    def _configured_columns(self) -> list:
+        # All columns mentioned in the preprocessing config
+        columns = []
         for col_type in ['numeric_columns', 'categorical_columns', 'text_columns', 
                         'datetime_columns']:
-            config_cols.update(self.preprocessing.get(col_type, []))
+            columns.extend(self.preprocessing.get(col_type, []))
         
         if self.preprocessing.get('target_column'):
-            config_cols.add(self.preprocessing['target_column'])
+            columns.append(self.preprocessing['target_column'])
+        return list(dict.fromkeys(columns))
+    
+    def _validate_columns(self):
+        available_cols = set(self.preprocessing.get('available_columns', []))
+        config_cols = set(self._configured_columns())
         
         # Check if all configured columns exist in the dataframe
         missing_cols = config_cols - available_cols
@@ -97,24 +327,9 @@ class AdvancedDataCleaner:
         try:
             logger.info("Starting missing value handling")
             
-            # Standard missing value indicators
-            missing_indicators = ['', 'none', 'na', 'n/a', 'nan', 'null', 'missing', '-', 
-                                'we dont have comf', 'null', 'NULL', 'NaN', 'N/A', 'NA',
-                                'missing', 'MISSING', 'None', 'NONE', '?', '.']
-            
-            # Step 1: Convert all missing indicators to NaN across ALL columns
+            # Step 1: Convert missing indicators to NaN (object columns only)
             logger.info("Converting all missing indicators to NaN")
-            for col in self.df.columns:
-                # Convert to string for reliable comparison
-                self.df[col] = self.df[col].astype(str)
-                
-                # Replace missing indicators with NaN
-                self.df[col] = self.df[col].apply(
-                    lambda x: np.nan if str(x).strip().lower() in [m.strip().lower() for m in missing_indicators] else x
-                )
-            
-            # Also replace empty strings and whitespace only
-            self.df.replace(r'^\s*$', np.nan, regex=True, inplace=True)
+            self._normalize_missing_indicators()
             
             # Step 2: Clean raw data (handles numeric conversions)
             self._clean_raw_data()
@@ -137,38 +352,44 @@ class AdvancedDataCleaner:
                 
                 # Now impute
                 if method == 'knn':
-                    # Handle KNN imputation for all numeric columns at once
+                    # Handle KNN imputation for all numeric columns at once, against a
+                    # bounded reference sample of complete rows (see knn_impute)
                     try:
-                        # Check if we have enough data for KNN
-                        non_missing_count = self.df[numeric_cols].dropna().shape[0]
-                        if non_missing_count < 2:
-                            logger.warning("Not enough data for KNN, using median instead")
-                            raise ValueError("Not enough non-missing values for KNN")
-                        
-                        n_neighbors = min(5, non_missing_count)
-                        imputer = KNNImputer(n_neighbors=n_neighbors)
-                        self.df[numeric_cols] = imputer.fit_transform(self.df[numeric_cols])
+                        start = time.perf_counter()
+                        values = self.df[numeric_cols].to_numpy(dtype=np.float64)
+                        missing_counts = np.isnan(values).sum(axis=0)
+                        knn_stats = knn_impute(
+                            values,
+                            n_neighbors=int(self.preprocessing.get('imputation_n_neighbors', 5)),
+                            reference_size=int(self.preprocessing.get('knn_reference_size', KNN_REFERENCE_ROWS))
+                        )
                         
-                        # Record stats
-                        for col in numeric_cols:
-                            missing_count = self.df[col].isna().sum()
-                            if missing_count > 0:
-                                self.stats['missing_values_imputed'][col] = missing_count
+                        # Write back only the imputed columns, keeping their dtype
+                        for j, col in enumerate(numeric_cols):
+                            if missing_counts[j] > 0:
+                                self.df[col] = values[:, j].astype(self.df[col].dtype, copy=False)
+                                self.stats['missing_values_imputed'][col] = int(missing_counts[j])
+                        self.stats['imputation'] = {
+                            'method': 'knn',
+                            'time_seconds': time.perf_counter() - start,
+                            **knn_stats
+                        }
                     except Exception as e:
                         logger.error(f"KNN failed: {e}, using median instead")
                         # Fallback to median imputation
                         for col in numeric_cols:
                             missing_count = self.df[col].isna().sum()
                             if missing_count > 0:
-                                self.stats['missing_values_imputed'][col] = missing_count
+                                self.stats['missing_values_imputed'][col] = int(missing_count)
                                 self.df[col].fillna(self.df[col].median(), inplace=True)
+                        self.stats['imputation'] = {'method': 'median', 'knn_error': str(e)}
                 else:
                     # Handle mean/median imputation
                     for col in numeric_cols:
                         try:
                             missing_count = self.df[col].isna().sum()
                             if missing_count > 0:
-                                self.stats['missing_values_imputed'][col] = missing_count
+                                self.stats['missing_values_imputed'][col] = int(missing_count)
                                 
                                 if method == 'mean':
                                     fill_value = self.df[col].mean()
@@ -191,7 +412,7 @@ class AdvancedDataCleaner:
                         
                         missing_count = self.df[col].isna().sum()
                         if missing_count > 0:
-                            self.stats['missing_values_imputed'][col] = missing_count
+                            self.stats['missing_values_imputed'][col] = int(missing_count)
                             
                             if col in categorical_cols:
                                 # For categorical, use mode or "missing" category
@@ -202,14 +423,16 @@ class AdvancedDataCleaner:
                             else:  # text columns
                                 fill_value = ""
                             
-                            self.df[col].fillna(fill_value, inplace=True)
+                            self.df = add_fill_categories(self.df, {col: fill_value})
+                            self.df[col] = self.df[col].fillna(fill_value)
                             
                             # Clean text data - remove asterisk prefix
                             if col in text_cols:
                                 self.df[col] = self.df[col].str.replace(r'^\*', '', regex=True)
                     except Exception as e:
                         logger.error(f"Error processing {col}: {str(e)}")
-                        self.df[col].fillna("missing", inplace=True)
+                        self.df = add_fill_categories(self.df, {col: "missing"})
+                        self.df[col] = self.df[col].fillna("missing")
             
             # Final check: ensure no missing values remain
             for col in self.df.columns:
@@ -217,7 +440,8 @@ class AdvancedDataCleaner:
                     if pd.api.types.is_numeric_dtype(self.df[col]):
                         self.df[col].fillna(self.df[col].median(), inplace=True)
                     else:
-                        self.df[col].fillna("missing", inplace=True)
+                        self.df = add_fill_categories(self.df, {col: "missing"})
+                        self.df[col] = self.df[col].fillna("missing")
             
             logger.info("Missing value handling completed successfully")
             
@@ -227,39 +451,90 @@ class AdvancedDataCleaner:
                 status_code=500,
                 detail=f"Failed to handle missing values: {str(e)}"
             )
+
+    def _normalize_missing_indicators(self):
+        """
+        Replace missing indicators with NaN. Each column is factorized so the
+        string normalization runs once per distinct value instead of once per cell;
+        numeric columns cannot hold indicators and keep their dtype.
+        """
+        for col in self.df.select_dtypes(include=['object', 'string']).columns:
+            codes, uniques = pd.factorize(self.df[col])
+            normalized = pd.Index(uniques).astype(str).str.strip().str.lower()
+            missing_codes = np.flatnonzero(normalized.isin(MISSING_INDICATORS))
+            if len(missing_codes):
+                self.df[col] = self.df[col].mask(np.isin(codes, missing_codes))
+        
+        # Categorical columns already store their distinct values; dropping the
+        # indicator categories turns those cells into NaN without touching the codes
+        for col in self.df.select_dtypes(include='category').columns:
+            categories = self.df[col].cat.categories
+            normalized = pd.Index(categories).astype(str).str.strip().str.lower()
+            indicators = categories[normalized.isin(MISSING_INDICATORS)]
+            if len(indicators):
+                self.df[col] = self.df[col].cat.remove_categories(indicators)
+
     def _handle_outliers(self):
+        """
+        Flag outliers in all numeric columns at once. Bounds come from the full
+        frame (IQR fences or mean +/- threshold * std), so they do not depend on
+        column order. 'remove' drops every row with an outlier in a single filter;
+        'clip' winsorizes the values to the bounds and keeps all rows.
+        Missing values are never treated as outliers.
+        """
         method = self.preprocessing.get('outlier_method', 'iqr')
         threshold = self.preprocessing.get('outlier_threshold', 1.5)
+        action = self.preprocessing.get('outlier_action', 'remove')
         cols = self.preprocessing.get('numeric_columns', [])
+        cols = [col for col in cols if col in self.df.columns and pd.api.types.is_numeric_dtype(self.df[col])]
         
         if not cols:
             return
             
-        initial_rows = len(self.df)
-        
+        values = self.df[cols]
         if method == 'iqr':
-            for col in cols:
-                if col not in self.df.columns:
-                    continue
-                    
-                Q1 = self.df[col].quantile(0.25)
-                Q3 = self.df[col].quantile(0.75)
-                IQR = Q3 - Q1
-                lower_bound = Q1 - (threshold * IQR)
-                upper_bound = Q3 + (threshold * IQR)
-                
-                self.df = self.df[(self.df[col] >= lower_bound) & 
-                                (self.df[col] <= upper_bound)]
+            quartiles = values.quantile([0.25, 0.75])
+            q1, q3 = quartiles.iloc[0], quartiles.iloc[1]
+            lower_bound = q1 - threshold * (q3 - q1)
+            upper_bound = q3 + threshold * (q3 - q1)
         else:  # z-score method
-            for col in cols:
-                if col not in self.df.columns:
-                    continue
-                    
-                z_scores = np.abs(stats.zscore(self.df[col]))
-                self.df = self.df[z_scores < threshold]
+            mean, std = values.mean(), values.std(ddof=0)
+            # Constant columns have no spread and no outliers
+            std = std.where(std > 0)
+            lower_bound = mean - threshold * std
+            upper_bound = mean + threshold * std
         
-        self.stats['rows_removed'] += initial_rows - len(self.df)
-        self.stats['outliers_removed'] = initial_rows - len(self.df)
+        if action == 'clip':
+            # Column by column, so only one column is copied at a time and downcast
+            # dtypes are kept: integer columns are clipped to the integers within the
+            # bounds. Missing bounds (constant columns) leave values untouched
+            clipped = 0
+            for col in cols:
+                series = self.df[col]
+                # Python scalars: NumPy float64 bounds would upcast float32 columns
+                lower = None if pd.isna(lower_bound[col]) else float(lower_bound[col])
+                upper = None if pd.isna(upper_bound[col]) else float(upper_bound[col])
+                if pd.api.types.is_integer_dtype(series):
+                    lower = None if lower is None else math.ceil(lower)
+                    upper = None if upper is None else math.floor(upper)
+                    if lower is not None and upper is not None:
+                        upper = max(upper, lower)
+                if lower is not None:
+                    clipped += int((series < lower).sum())
+                if upper is not None:
+                    clipped += int((series > upper).sum())
+                self.df[col] = series.clip(lower, upper)
+            self.stats['outliers_clipped'] = clipped
+        else:
+            # One boolean matrix for all columns; NaN values and bounds compare False
+            arr = values.to_numpy(dtype=np.float64)
+            outside = (arr < lower_bound.to_numpy()) | (arr > upper_bound.to_numpy())
+            outlier_rows = outside.any(axis=1)
+            initial_rows = len(self.df)
+            if outlier_rows.any():
+                self.df = self.df[~outlier_rows]
+            self.stats['rows_removed'] += initial_rows - len(self.df)
+            self.stats['outliers_removed'] = initial_rows - len(self.df)
         self.stats['columns_processed'] += len(cols)
     
     def _scale_features(self):
@@ -286,13 +561,13 @@ class AdvancedDataCleaner:
             return
             
         if method == 'onehot':
-            encoder = OneHotEncoder(sparse=False, drop='first')
+            # Kept as a CSR block instead of dense columns: one non-zero per row and column
+            encoder = OneHotEncoder(sparse_output=True, drop='first')
             encoded = encoder.fit_transform(self.df[cols])
-            encoded_cols = encoder.get_feature_names_out(cols)
-            encoded_df = pd.DataFrame(encoded, columns=encoded_cols)
+            encoded_cols = list(encoder.get_feature_names_out(cols))
             
-            self.df = pd.concat([self.df.drop(cols, axis=1), encoded_df], axis=1)
-            self.stats['columns_encoded'] = list(encoded_cols)
+            self._add_sparse_block(encoded_cols, encoded, drop=cols)
+            self.stats['columns_encoded'] = encoded_cols
         else:  # ordinal or other methods would go here
             pass
             
@@ -304,79 +579,50 @@ class AdvancedDataCleaner:
         lemmatize = self.preprocessing.get('lemmatize', False)
         method = self.preprocessing.get('text_vectorization', 'tfidf')
         
+        cols = [col for col in cols if col in self.df.columns]
         if not cols:
             return
             
-        # Basic English stop words list (can be expanded)
-        stop_words = set([
-            'i', 'me', 'my', 'myself', 'we', 'our', 'ours', 'ourselves', 'you', "you're", 
-            "you've", "you'll", "you'd", 'your', 'yours', 'yourself', 'yourselves', 'he', 
-            'him', 'his', 'himself', 'she', "she's", 'her', 'hers', 'herself', 'it', 
-            "it's", 'its', 'itself', 'they', 'them', 'their', 'theirs', 'themselves', 
-            'what', 'which', 'who', 'whom', 'this', 'that', "that'll", 'these', 'those', 
-            'am', 'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 
-            'having', 'do', 'does', 'did', 'doing', 'a', 'an', 'the', 'and', 'but', 'if', 
-            'or', 'because', 'as', 'until', 'while', 'of', 'at', 'by', 'for', 'with', 
-            'about', 'against', 'between', 'into', 'through', 'during', 'before', 'after', 
-            'above', 'below', 'to', 'from', 'up', 'down', 'in', 'out', 'on', 'off', 'over', 
-            'under', 'again', 'further', 'then', 'once', 'here', 'there', 'when', 'where', 
-            'why', 'how', 'all', 'any', 'both', 'each', 'few', 'more', 'most', 'other', 
-            'some', 'such', 'no', 'nor', 'not', 'only', 'own', 'same', 'so', 'than', 'too', 
-            'very', 's', 't', 'can', 'will', 'just', 'don', "don't", 'should', "should've", 
-            'now', 'd', 'll', 'm', 'o', 're', 've', 'y', 'ain', 'aren', "aren't", 'couldn', 
-            "couldn't", 'didn', "didn't", 'doesn', "doesn't", 'hadn', "hadn't", 'hasn', 
-            "hasn't", 'haven', "haven't", 'isn', "isn't", 'ma', 'mightn', "mightn't", 
-            'mustn', "mustn't", 'needn', "needn't", 'shan', "shan't", 'shouldn', 
-            "shouldn't", 'wasn', "wasn't", 'weren', "weren't", 'won', "won't", 'wouldn', 
-            "wouldn't"
-        ]) if remove_stop else None
-        
         for col in cols:
-            if col not in self.df.columns:
-                continue
-                
             # Text cleaning
-            self.df[col] = self.df[col].astype(str).apply(
-                lambda x: self._clean_text(x, stop_words, lemmatize))
+            self.df[col] = clean_text_series(self.df[col], remove_stop, lemmatize)
             
             # Vectorization
             if method == 'tfidf':
                 vectorizer = TfidfVectorizer(max_features=100)
                 vectors = vectorizer.fit_transform(self.df[col])
                 vector_cols = [f"{col}_tfidf_{i}" for i in range(vectors.shape[1])]
-                vector_df = pd.DataFrame(vectors.toarray(), columns=vector_cols)
                 
-                self.df = pd.concat([self.df.drop(col, axis=1), vector_df], axis=1)
+                self._add_sparse_block(vector_cols, vectors, drop=[col])
                 self.stats['columns_encoded'].extend(vector_cols)
         
+        if method == 'hashing':
+            self._hash_text_columns(cols)
+        
         self.stats['columns_processed'] += len(cols)
     
-    def _clean_text(self, text, stop_words=None, lemmatize=False):
-        # Lowercase
-        text = text.lower()
-        # Remove special chars
-        text = re.sub(r'[^a-zA-Z0-9\s]', '', text)
-        # Remove stopwords
-        if stop_words:
-            text = ' '.join([word for word in text.split() if word not in stop_words])
-        # Basic lemmatization (can be enhanced with more rules)
-        if lemmatize:
-            text = ' '.join([self._simple_lemmatize(word) for word in text.split()])
-        return text
-    
-    def _simple_lemmatize(self, word):
-        # Basic lemmatization rules (can be expanded)
-        if word.endswith('ing'):
-            return word[:-3]
-        elif word.endswith('ly'):
-            return word[:-2]
-        elif word.endswith('s'):
-            return word[:-1]
-        elif word.endswith('es'):
-            return word[:-2]
-        elif word.endswith('ed'):
-            return word[:-2]
-        return word
+    def _hash_text_columns(self, cols):
+        """
+        Stateless hashing vectorizer: no vocabulary pass, a fixed number of output
+        columns per text column, and every chunk of rows of every column can be
+        transformed independently, so all of them run in parallel.
+        """
+        n_features = int(self.preprocessing.get('hashing_features', HASHING_FEATURES))
+        vectorizer = HashingVectorizer(n_features=n_features, alternate_sign=False)
+        tasks = [(col, start) for col in cols for start in range(0, len(self.df), TEXT_CHUNK_ROWS)]
+        n_jobs = TEXT_WORKERS if TEXT_WORKERS > 0 else job_cpus()
+        # Threads read the chunks in place instead of pickling them to worker processes
+        blocks = Parallel(n_jobs=n_jobs if len(tasks) > 1 else 1, prefer='threads')(
+            delayed(_hash_text_chunk)(vectorizer, self.df[col].iloc[start:start + TEXT_CHUNK_ROWS])
+            for col, start in tasks
+        )
+        
+        for col in cols:
+            col_blocks = [block for (task_col, _), block in zip(tasks, blocks) if task_col == col]
+            vectors = sp.vstack(col_blocks, format='csr') if col_blocks else sp.csr_matrix((0, n_features))
+            vector_cols = [f"{col}_hash_{i}" for i in range(n_features)]
+            self._add_sparse_block(vector_cols, vectors, drop=[col])
+            self.stats['columns_encoded'].extend(vector_cols)
     
     def _reduce_dimensionality(self):
         method = self.preprocessing.get('reduction_method', 'pca')
@@ -390,7 +636,7 @@ class AdvancedDataCleaner:
             pca = PCA(n_components=n_components)
             reduced = pca.fit_transform(self.df[cols])
             reduced_cols = [f'pca_{i}' for i in range(n_components)]
-            reduced_df = pd.DataFrame(reduced, columns=reduced_cols)
+            reduced_df = pd.DataFrame(reduced, columns=reduced_cols, index=self.df.index)
             
             self.df = pd.concat([self.df.drop(cols, axis=1), reduced_df], axis=1)
             self.stats['columns_processed'] += len(cols)
@@ -406,14 +652,131 @@ class AdvancedDataCleaner:
             smote = SMOTE()
             X = self.df.drop(target_col, axis=1)
             y = self.df[target_col]
-            X_res, y_res = smote.fit_resample(X, y)
-            
-            self.df = pd.concat([X_res, y_res], axis=1)
+            if not self.sparse_blocks:
+                X_res, y_res = smote.fit_resample(X, y)
+                self.df = pd.concat([X_res, y_res], axis=1)
+                return
+
+            # SMOTE accepts CSR input: resample the dense and sparse features together
+            # and split the result back, so the encoded blocks are never densified
+            n_dense = X.shape[1]
+            X_all = sp.hstack([sp.csr_matrix(X.to_numpy(dtype=np.float64)), self._sparse_matrix()], format='csr')
+            X_res, y_res = smote.fit_resample(X_all, y)
+
+            self.df = pd.DataFrame(X_res[:, :n_dense].toarray(), columns=X.columns)
+            self.df[target_col] = np.asarray(y_res)
+            offset = n_dense
+            blocks = []
+            for names, _ in self.sparse_blocks:
+                blocks.append((names, X_res[:, offset:offset + len(names)].tocsr()))
+                offset += len(names)
+            self.sparse_blocks = blocks
     
     def _remove_duplicates(self):
         initial_rows = len(self.df)
-        self.df.drop_duplicates(inplace=True)
+        if not self.sparse_blocks:
+            self.df.drop_duplicates(inplace=True)
+        else:
+            # Sparse blocks take part through per-row hashes
+            keys = self.df.assign(**{
+                f'__sparse_{i}': _sparse_row_hashes(block) for i, (_, block) in enumerate(self.sparse_blocks)
+            })
+            keep = ~keys.duplicated().to_numpy()
+            self.df = self.df[keep].reset_index(drop=True)
+            self.sparse_blocks = [(names, block[keep]) for names, block in self.sparse_blocks]
         self.stats['duplicates_removed'] = initial_rows - len(self.df)
+
+    def _add_sparse_block(self, names, matrix, drop):
+        """
+        Replace the `drop` columns with a CSR block. Rows are positional, so the
+        frame's index (filtered by outlier removal) is reset to keep them aligned.
+        """
+        self.df = self.df.drop(drop, axis=1).reset_index(drop=True)
+        self.sparse_blocks.append((list(names), sp.csr_matrix(matrix)))
+
+    def _sparse_matrix(self):
+        return sp.hstack([block for _, block in self.sparse_blocks], format='csr')
+
+    def _export(self) -> dict:
+        """
+        Store the cleaned dataset in a new run instead of returning it inline:
+        every column as Parquet (streamed by GET /runs/{run_id}/cleaned in the
+        requested format) and the stats as JSON (GET /runs/{run_id}/stats).
+        The dataset is also registered, so it can be trained on by dataset_id
+        without a download and re-upload.
+        The result only carries links, the stats and a small preview.
+        """
+        run_id = create_run()
+        table = to_arrow_table(self.df)
+        path = run_path(run_id, CLEANED_FILE)
+        if self.sparse_blocks:
+            # Sparse features are expanded into plain columns a batch of rows at a time
+            sparse_names = [name for names, _ in self.sparse_blocks for name in names]
+            schema = pa.schema(list(table.schema.remove_metadata()) + [
+                pa.field(name, pa.float64()) for name in sparse_names
+            ])
+            write_parquet_tables(schema, self._export_tables(table, schema), path)
+            dataset_id = register_dataset(pq.ParquetFile(path), f'cleaned_{run_id}.csv', source={'run_id': run_id})
+        else:
+            sparse_names = []
+            write_parquet(table, path)
+            dataset_id = register_dataset(table, f'cleaned_{run_id}.csv', source={'run_id': run_id})
+        write_atomic(run_path(run_id, STATS_FILE), json.dumps(self.stats).encode('utf-8'))
+
+        result = {
+            'run_id': run_id,
+            'dataset_id': dataset_id,
+            'download': f'/runs/{run_id}/cleaned?format={self.export_format}',
+            'stats_url': f'/runs/{run_id}/stats',
+            'format': self.export_format,
+            'rows': len(self.df),
+            'columns': [str(col) for col in self.df.columns] + sparse_names,
+            'preview': json.loads(self.df.head(PREVIEW_ROWS).to_json(orient='records')),
+            'stats': self.stats
+        }
+        if self.sparse_blocks:
+            # The encoded features are also saved in sparse form, far smaller than expanded
+            result['sparse'] = self._export_sparse(run_id)
+        return result
+
+    def _export_tables(self, table: pa.Table, schema: pa.Schema):
+        """
+        Slices of the dense table with the sparse features appended as columns,
+        sized so each expanded slice takes about EXPORT_DENSE_BATCH_BYTES.
+        """
+        matrix = self._sparse_matrix().astype(np.float64)
+        rows = max(1, min(EXPORT_BATCH_ROWS, EXPORT_DENSE_BATCH_BYTES // (8 * max(matrix.shape[1], 1))))
+        for start in range(0, table.num_rows, rows):
+            dense = table.slice(start, rows)
+            expanded = matrix[start:start + rows].toarray(order='F')
+            yield pa.Table.from_arrays(
+                dense.columns + [pa.array(expanded[:, i]) for i in range(expanded.shape[1])],
+                schema=schema
+            )
+
+    def _export_sparse(self, run_id) -> dict:
+        """
+        Save the sparse features of the cleaned dataset as a CSR .npz
+        (readable with scipy.sparse.load_npz, column names under 'columns').
+        Rows line up with the rows of the dense export.
+        """
+        matrix = self._sparse_matrix()
+        columns = [name for names, _ in self.sparse_blocks for name in names]
+        buf = io.BytesIO()
+        np.savez_compressed(
+            buf, format=np.array('csr'), shape=np.array(matrix.shape),
+            data=matrix.data, indices=matrix.indices, indptr=matrix.indptr,
+            columns=np.array(columns, dtype=str)
+        )
+        write_atomic(run_path(run_id, SPARSE_EXPORT_FILE), buf.getvalue())
+        return {
+            'url': f'/runs/{run_id}/sparse',
+            'columns': columns,
+            'shape': list(matrix.shape),
+            'nnz': int(matrix.nnz),
+            'density': float(matrix.nnz / max(matrix.shape[0] * matrix.shape[1], 1))
+        }
+
     def _clean_raw_data(self):
         try:
             logger.info("Cleaning raw data")
@@ -442,4 +805,11 @@ class AdvancedDataCleaner:
         except Exception as e:
             logger.error(f"Error in _clean_raw_data: {str(e)}")
             raise
-        
\ No newline at end of file
+
+
+def clean_file(path, preprocessing_config, export_format=DEFAULT_EXPORT_FORMAT):
+    """
+    Job entry point: clean the CSV, Parquet or Arrow file (or stored dataset) at path
+    with the given preprocessing config.
+    """
+    return AdvancedDataCleaner(path, preprocessing_config, export_format).clean_data()
@@ -0,0 +1,90 @@
+# app/services/importance_service.py
+import os
+import time
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.metrics import r2_score
+
+from app.services.jobs import job_cpus
+
+# Parallel feature scoring; -1 uses the job's share of the cores (see job_cpus)
+PERMUTATION_WORKERS = int(os.getenv("AUTOML_PERMUTATION_WORKERS", "-1"))
+# Test rows permutation importance is computed on; larger test splits are subsampled
+PERMUTATION_MAX_SAMPLES = int(os.getenv("AUTOML_PERMUTATION_MAX_SAMPLES", "2000"))
+
+
+def _take_rows(X, rows):
+    return X.iloc[rows] if hasattr(X, 'iloc') else np.asarray(X)[rows]
+
+
+def _score_feature(col: int, estimator, X, y, baseline: float, n_repeats: int, random_state: int,
+                   deadline: float):
+    """
+    Score drop of every repeat with column col permuted, or None once the
+    deadline has passed, so threads that can't be cancelled stop by themselves.
+    """
+    if time.monotonic() > deadline:
+        return col, None
+    rng = np.random.default_rng([random_state, col])
+    is_frame = hasattr(X, 'iloc')
+    X_permuted = X.copy()
+    original = X.iloc[:, col].to_numpy() if is_frame else X[:, col]
+    drops = []
+    for _ in range(n_repeats):
+        if time.monotonic() > deadline:
+            return col, None
+        if is_frame:
+            X_permuted.isetitem(col, rng.permutation(original))
+        else:
+            X_permuted[:, col] = rng.permutation(original)
+        drops.append(baseline - r2_score(y, estimator.predict(X_permuted)))
+    return col, drops
+
+
+def permutation_importance(estimator, X_test, y_test, feature_names, budget_seconds: float,
+                           n_repeats: int = 5, max_samples: int = PERMUTATION_MAX_SAMPLES,
+                           random_state: int = 42) -> dict:
+    """
+    Model-agnostic feature importance: the mean drop in R² on the test split
+    when one feature's values are shuffled, over n_repeats shuffles.
+
+    Scored on a random subsample of at most max_samples test rows, with the
+    features scored in parallel. Features not done by the deadline
+    (budget_seconds after the start) are left out, so importances then cover
+    the features that finished, which 'features_scored' reports; the overrun
+    is at most one prediction per worker.
+    """
+    start = time.monotonic()
+    deadline = start + budget_seconds
+
+    n_rows = len(y_test)
+    rows = np.arange(n_rows)
+    if n_rows > max_samples:
+        rows = np.sort(np.random.default_rng(random_state).choice(n_rows, size=max_samples, replace=False))
+    X = _take_rows(X_test, rows)
+    y = np.asarray(y_test)[rows]
+    baseline = float(r2_score(y, estimator.predict(X)))
+
+    n_features = len(feature_names)
+    n_jobs = min(n_features, PERMUTATION_WORKERS if PERMUTATION_WORKERS > 0 else job_cpus())
+    # Threads share the fitted model, where processes would each be sent a copy
+    # (hundreds of MB for a forest); prediction releases the GIL. Workers check
+    # the deadline between predictions and give up on their feature once it passes
+    results = Parallel(n_jobs=n_jobs, prefer='threads')(
+        delayed(_score_feature)(col, estimator, X, y, baseline, n_repeats, random_state, deadline)
+        for col in range(n_features)
+    )
+    drops = {col: scores for col, scores in results if scores is not None}
+
+    scored = sorted(drops)
+    return {
+        'importances': {str(feature_names[col]): float(np.mean(drops[col])) for col in scored},
+        'importances_std': {str(feature_names[col]): float(np.std(drops[col])) for col in scored},
+        'baseline_score': baseline,
+        'n_samples': int(len(rows)),
+        'n_repeats': n_repeats,
+        'features_scored': len(scored),
+        'features_total': n_features,
+        'time_spent': time.monotonic() - start,
+        'budget_seconds': budget_seconds
+    }
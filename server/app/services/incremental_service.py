@@ -0,0 +1,331 @@
+# app/services/incremental_service.py
+import os
+import traceback
+from collections import Counter, defaultdict
+import numpy as np
+import pandas as pd
+from fastapi import HTTPException
+from sklearn.linear_model import SGDRegressor
+
+from app.utils.ingestion import iter_chunks
+from app.utils.preprocessing import make_scaler
+from app.utils.profiling import HIGH_CARDINALITY_THRESHOLD
+from app.utils.run_store import create_run
+from app.utils.pipeline import FittedPipeline
+from app.utils.instrumentation import StageTimer
+from app.utils.dashboard import save_run_summary
+from app.utils.correlation import save_correlation_data
+from app.services.train_service import (
+    compute_metrics, get_feature_importances, save_plot_data, build_dashboard_metrics
+)
+
+# Rows read per chunk and passes over the training rows, unless the request overrides them
+INCREMENTAL_CHUNK_ROWS = int(os.getenv("AUTOML_INCREMENTAL_CHUNK_ROWS", "50000"))
+INCREMENTAL_PASSES = int(os.getenv("AUTOML_INCREMENTAL_PASSES", "1"))
+# Upper bound on the test rows kept for metrics, and on the values sampled per
+# column for median/mode fill values; together they cap the memory used
+HOLDOUT_MAX_ROWS = int(os.getenv("AUTOML_INCREMENTAL_HOLDOUT_ROWS", "100000"))
+PROFILE_SAMPLE_ROWS = 20000
+MAX_CATEGORIES = HIGH_CARDINALITY_THRESHOLD
+RANDOM_STATE = 42
+
+# Models that learn with partial_fit; LinearRegression is fitted by SGD on squared error
+INCREMENTAL_MODEL_MAP = {
+    "LinearRegression": lambda: SGDRegressor(loss='squared_error', random_state=RANDOM_STATE)
+}
+
+
+def validate_incremental_request(model: str, scaler: str, chunk_rows: int, passes: int):
+    if model not in INCREMENTAL_MODEL_MAP:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Incremental training supports: {list(INCREMENTAL_MODEL_MAP.keys())}"
+        )
+    fitted_scaler = make_scaler(scaler)
+    if fitted_scaler is not None and not hasattr(fitted_scaler, 'partial_fit'):
+        raise HTTPException(status_code=400, detail=f"Scaler '{scaler}' cannot be fitted incrementally")
+    if chunk_rows < 1 or passes < 1:
+        raise HTTPException(status_code=400, detail="Chunk rows and passes must be positive")
+
+
+def _iter_chunks(path: str, chunk_rows: int):
+    return enumerate(iter_chunks(path, chunk_rows))
+
+
+class _StreamingProfile:
+    """
+    Column statistics gathered chunk by chunk in bounded memory: what
+    compute_fill_values, drop_constant and drop_high_cardinality need.
+    """
+
+    def __init__(self):
+        self.columns = None
+        self.rows = 0
+        self.numeric = {}
+        self.missing = defaultdict(int)
+        self.count = defaultdict(int)
+        self.total = defaultdict(float)
+        self.minimum = {}
+        self.maximum = {}
+        self.samples = {}
+        self.sample_keys = {}
+        self.value_counts = defaultdict(Counter)
+        self.high_cardinality = set()
+        self._rng = np.random.default_rng(RANDOM_STATE)
+
+    def update(self, chunk: pd.DataFrame):
+        if self.columns is None:
+            self.columns = chunk.columns.tolist()
+        self.rows += len(chunk)
+        for col in self.columns:
+            series = chunk[col]
+            values = series.dropna()
+            self.missing[col] += int(len(series) - len(values))
+            # A column is numeric only if every chunk parsed it as numeric
+            is_numeric = pd.api.types.is_numeric_dtype(series)
+            self.numeric[col] = self.numeric.get(col, True) and is_numeric
+            if is_numeric:
+                self._update_numeric(col, values)
+            elif col not in self.high_cardinality:
+                self.value_counts[col].update(values.astype(str).value_counts().to_dict())
+                if len(self.value_counts[col]) > MAX_CATEGORIES:
+                    self.high_cardinality.add(col)
+                    del self.value_counts[col]
+
+    def _update_numeric(self, col, values):
+        if values.empty:
+            return
+        self.count[col] += len(values)
+        self.total[col] += float(values.sum())
+        self.minimum[col] = min(self.minimum.get(col, np.inf), float(values.min()))
+        self.maximum[col] = max(self.maximum.get(col, -np.inf), float(values.max()))
+        # Reservoir for the median and mode: the values with the smallest random
+        # keys seen so far are a uniform sample of the whole stream
+        sample = np.concatenate([self.samples.get(col, np.empty(0)), values.to_numpy(dtype=float)])
+        keys = np.concatenate([self.sample_keys.get(col, np.empty(0)), self._rng.random(len(values))])
+        if len(sample) > PROFILE_SAMPLE_ROWS:
+            keep = np.argpartition(keys, PROFILE_SAMPLE_ROWS)[:PROFILE_SAMPLE_ROWS]
+            sample, keys = sample[keep], keys[keep]
+        self.samples[col], self.sample_keys[col] = sample, keys
+
+    def fill_value(self, col, strategy: str, text_placeholder: str = "missing"):
+        if self.numeric[col]:
+            # A column without any observed value (dropped as constant anyway) is
+            # filled with 0: a NaN fill would leave NaNs for partial_fit to reject
+            if not self.count[col]:
+                return 0
+            if strategy == "mean":
+                return self.total[col] / self.count[col]
+            if strategy == "median":
+                return float(np.median(self.samples[col]))
+            if strategy == "mode":
+                values, counts = np.unique(self.samples[col], return_counts=True)
+                return float(values[np.argmax(counts)])
+            return 0
+        if strategy == "mode" and self.value_counts.get(col):
+            return self.value_counts[col].most_common(1)[0][0]
+        return text_placeholder
+
+    def is_constant(self, col) -> bool:
+        if self.numeric[col]:
+            return self.count[col] == 0 or self.minimum[col] == self.maximum[col]
+        return col not in self.high_cardinality and len(self.value_counts[col]) <= 1
+
+
+def _prepare_chunk(chunk: pd.DataFrame, missing: str, fill_values: dict, features: list, target: str):
+    if missing == "drop":
+        chunk = chunk.dropna()
+    else:
+        chunk = chunk[features + [target]].fillna(fill_values)
+    X = chunk[features].to_numpy(dtype=np.float64)
+    y = chunk[target].to_numpy(dtype=np.float64)
+    return X, y
+
+
+def _holdout_mask(chunk_index: int, n: int, split_ratio: float):
+    """
+    Deterministic per-chunk train/test assignment, identical on every pass.
+    Returns (test mask, random reservoir keys for the test rows).
+    """
+    rng = np.random.default_rng([RANDOM_STATE, chunk_index])
+    is_test = rng.random(n) >= split_ratio
+    return is_test, rng.random(int(is_test.sum()))
+
+
+def train_incremental_service(
+    path: str, model: str, scaler: str, split_ratio: float, missing: str, encoding: str,
+    chunk_rows: int = INCREMENTAL_CHUNK_ROWS, passes: int = INCREMENTAL_PASSES
+):
+    """
+    Out-of-core training: the CSV is read in chunks of chunk_rows rows and never
+    held in memory at once. One pass profiles the columns (fill values, dropped
+    columns, target), one fits the scaler with partial_fit and collects a
+    bounded random sample of the test rows, then `passes` epochs train the model
+    with partial_fit. Runs inside a job worker.
+    """
+    try:
+        valid_strategies = ["drop", "mean", "median", "mode", "zero"]
+        if missing not in valid_strategies:
+            raise ValueError(f"Invalid strategy. Expected one of: {valid_strategies}")
+        timer = StageTimer()
+
+        # Pass 1: profile
+        with timer.stage('profile'):
+            profile = _StreamingProfile()
+            raw_sample = None
+            for _, chunk in _iter_chunks(path, chunk_rows):
+                if raw_sample is None:
+                    raw_sample = chunk.head(5)
+                profile.update(chunk)
+            if not profile.rows:
+                raise HTTPException(status_code=400, detail="Uploaded file is empty")
+
+            columns = profile.columns
+            dropped_columns = [col for col in columns if profile.is_constant(col) or col in profile.high_cardinality]
+            kept = [col for col in columns if col not in dropped_columns]
+            if not kept:
+                raise HTTPException(status_code=400, detail="All columns were dropped during preprocessing")
+            # Same convention as split_features_target: the last remaining column is the target
+            target = kept[-1]
+            if not profile.numeric[target]:
+                raise HTTPException(status_code=400, detail=f"Target column '{target}' must be numeric for incremental training")
+            features = [col for col in kept if profile.numeric[col] and col != target]
+            if not features:
+                raise HTTPException(status_code=400, detail="No numeric feature columns left after preprocessing")
+            fill_values = {} if missing == "drop" else {col: profile.fill_value(col, missing) for col in kept}
+            categories = {col: sorted(profile.value_counts[col]) for col in kept if not profile.numeric[col]}
+
+        # Pass 2: fit the scaler on the training rows, sample the test rows
+        with timer.stage('scaler'):
+            fitted_scaler = make_scaler(scaler)
+            X_test = np.empty((0, len(features)))
+            y_test = np.empty(0)
+            test_keys = np.empty(0)
+            training_rows = testing_rows = 0
+            for chunk_index, chunk in _iter_chunks(path, chunk_rows):
+                X, y = _prepare_chunk(chunk, missing, fill_values, features, target)
+                is_test, keys = _holdout_mask(chunk_index, len(y), split_ratio)
+                training_rows += int((~is_test).sum())
+                testing_rows += int(is_test.sum())
+                if fitted_scaler is not None and (~is_test).any():
+                    fitted_scaler.partial_fit(X[~is_test])
+                # Keep the test rows with the smallest random keys: a uniform sample of bounded size
+                X_test = np.concatenate([X_test, X[is_test]])
+                y_test = np.concatenate([y_test, y[is_test]])
+                test_keys = np.concatenate([test_keys, keys])
+                if len(test_keys) > HOLDOUT_MAX_ROWS:
+                    keep = np.argpartition(test_keys, HOLDOUT_MAX_ROWS)[:HOLDOUT_MAX_ROWS]
+                    X_test, y_test, test_keys = X_test[keep], y_test[keep], test_keys[keep]
+            if not training_rows:
+                raise HTTPException(status_code=400, detail="No training rows left after preprocessing")
+
+        # Passes 3+: train the model chunk by chunk
+        with timer.stage('training'):
+            estimator = INCREMENTAL_MODEL_MAP[model]()
+            rng = np.random.default_rng(RANDOM_STATE)
+            chunks_read = 0
+            for _ in range(passes):
+                for chunk_index, chunk in _iter_chunks(path, chunk_rows):
+                    X, y = _prepare_chunk(chunk, missing, fill_values, features, target)
+                    is_test, _ = _holdout_mask(chunk_index, len(y), split_ratio)
+                    X, y = X[~is_test], y[~is_test]
+                    if not len(y):
+                        continue
+                    if fitted_scaler is not None:
+                        X = fitted_scaler.transform(X)
+                    # SGD converges poorly on sorted data, so shuffle within the chunk
+                    order = rng.permutation(len(y))
+                    estimator.partial_fit(X[order], y[order])
+                    chunks_read += 1
+
+        with timer.stage('evaluate'):
+            X_test_scaled = fitted_scaler.transform(X_test) if fitted_scaler is not None and len(X_test) else X_test
+            y_pred = estimator.predict(X_test_scaled) if len(y_test) else np.empty(0)
+            metrics = compute_metrics(y_test, y_pred, training_rows)
+        feature_importances = get_feature_importances(estimator, features)
+        if feature_importances:
+            metrics['feature_importances'] = feature_importances
+
+        original_shape = (profile.rows, len(columns))
+        missing_before = {col: profile.missing[col] for col in columns}
+        missing_after = {col: 0 for col in kept}
+        preprocessing_stats = {
+            'missing_values_before': missing_before,
+            'missing_values_after': missing_after,
+            'dropped_constant_columns': len(dropped_columns),
+            'final_shape': (training_rows + testing_rows, len(kept)),
+            # Counted like load_preprocessed: kept numeric columns (target included)
+            'feature_types': {
+                'numeric': len(features) + 1,
+                'categorical': len(columns) - len(features) - 2
+            }
+        }
+
+        with timer.stage('save_run'):
+            run_id = create_run()
+            FittedPipeline(
+                missing_strategy=missing,
+                fill_values=fill_values,
+                dropped_columns=dropped_columns,
+                encoding=encoding,
+                categories=categories,
+                feature_names=features,
+                target=str(target),
+                scaler=fitted_scaler,
+                model=estimator
+            ).save(run_id)
+            save_plot_data(run_id, feature_importances, y_test, y_pred, 'coef')
+            save_run_summary(run_id, metrics, preprocessing_stats, original_shape, model, scaler,
+                             features, missing, encoding)
+            # The held-out sample stands in for the matrix, which is never in memory as a whole
+            save_correlation_data(run_id, X_test_scaled, features, feature_importances)
+        plots = {
+            "feature_importance": f"/runs/{run_id}/plots/feature_importance" if feature_importances else None,
+            "prediction": f"/runs/{run_id}/plots/prediction"
+        }
+
+        # Sample rows after missing-value handling, like the in-memory path reports them
+        raw_sample = raw_sample.dropna() if missing == "drop" else raw_sample.fillna(fill_values)
+        raw_rows = raw_sample[features].to_dict(orient="records")
+        processed_sample = X_test_scaled[:5] if len(X_test_scaled) else np.empty((0, len(features)))
+
+        return {
+            "metrics": metrics,
+            "preprocessing_stats": preprocessing_stats,
+            "run_id": run_id,
+            "plots": plots,
+            "columns": features,
+            "rows": pd.DataFrame(processed_sample, columns=features).to_dict(orient="records"),
+            "raw_rows": raw_rows,
+            "model_type": model,
+            "scaler_type": scaler,
+            "dashboard_metrics": build_dashboard_metrics(
+                metrics, feature_importances, original_shape, preprocessing_stats['final_shape'],
+                missing_before, missing_after, len(dropped_columns), preprocessing_stats['feature_types']
+            ),
+            "cache": None,
+            "search": None,
+            "incremental": {
+                "estimator": type(estimator).__name__,
+                "chunk_rows": chunk_rows,
+                "passes": passes,
+                "chunks_trained": chunks_read,
+                "training_rows": training_rows,
+                "testing_rows": testing_rows,
+                "holdout_sample_rows": int(len(y_test))
+            },
+            "timings": timer.to_dict()
+        }
+
+    except HTTPException:
+        raise
+    except pd.errors.EmptyDataError:
+        raise HTTPException(status_code=400, detail="The CSV file appears to be empty or corrupt")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(
+            status_code=500,
+            detail=f"An unexpected error occurred: {str(e)}"
+        )
@@ -0,0 +1,211 @@
+# app/services/jobs.py
+import os
+import time
+import uuid
+import threading
+import traceback
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from fastapi import HTTPException
+from app.utils.instrumentation import metrics
+
+# "process" runs jobs in a process pool; "thread" shares one process (and its memory)
+# between concurrent jobs, which is safe now that preprocessing state is per request
+JOB_EXECUTOR = os.getenv("AUTOML_JOB_EXECUTOR", "process")
+# Workers and the maximum number of queued + running jobs
+JOB_WORKERS = int(os.getenv("AUTOML_JOB_WORKERS", str(os.cpu_count() or 1)))
+JOB_QUEUE_SIZE = int(os.getenv("AUTOML_JOB_QUEUE_SIZE", "32"))
+# Finished jobs kept around for result retrieval before the oldest are evicted
+MAX_FINISHED_JOBS = int(os.getenv("AUTOML_MAX_FINISHED_JOBS", "100"))
+
+
+# The running job's share of the cores, set by _run_job in its worker (process or thread)
+_job_context = threading.local()
+
+
+def job_cpus() -> int:
+    """
+    Cores a job's own parallel work (search, permutation importance, ...) should
+    use: the machine divided between the jobs running when it was submitted, so
+    a lone job gets every core and concurrent jobs don't oversubscribe the CPU.
+    Outside a job, the share per job worker.
+    """
+    cpus = getattr(_job_context, 'cpus', None)
+    return cpus or max(1, (os.cpu_count() or 1) // max(JOB_WORKERS, 1))
+
+
+def _run_job(fn, args, cpus: int = None):
+    """
+    Executed inside a worker. Errors are returned as data so they survive
+    pickling back from worker processes to the API process.
+    """
+    _job_context.cpus = cpus
+    try:
+        return {'ok': True, 'result': fn(*args)}
+    except HTTPException as he:
+        return {'ok': False, 'status_code': he.status_code, 'detail': he.detail}
+    except Exception as e:
+        traceback.print_exc()
+        return {'ok': False, 'status_code': 500, 'detail': f"An unexpected error occurred: {str(e)}"}
+    finally:
+        _job_context.cpus = None
+
+
+class JobManager:
+    """Bounded job queue backed by a process (or thread) pool"""
+
+    def __init__(self, max_workers: int = JOB_WORKERS, max_queued: int = JOB_QUEUE_SIZE,
+                 max_finished: int = MAX_FINISHED_JOBS, executor: str = JOB_EXECUTOR):
+        self.executor_type = executor
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.max_finished = max_finished
+        self._executor = None
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        if getattr(self._executor, '_broken', False):
+            self._discard_executor()
+        if self._executor is None and self.executor_type == "thread":
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="automl-job")
+        elif self._executor is None:
+            # spawn keeps workers free of the API process' threads and BLAS state
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def _discard_executor(self):
+        # A worker died (e.g. OOM-killed) and broke the pool; its jobs have failed,
+        # and the next submit starts a fresh pool
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+
+    def _submit(self, fn, args, cpus: int):
+        try:
+            return self._get_executor().submit(_run_job, fn, args, cpus)
+        except BrokenProcessPool:
+            # Broken after _get_executor checked it: retry once on a new pool
+            self._discard_executor()
+            return self._get_executor().submit(_run_job, fn, args, cpus)
+
+    def submit(self, kind: str, fn, *args, cleanup_paths=()) -> str:
+        """
+        Queue fn(*args) on the worker pool and return the job id.
+        Files in cleanup_paths are removed once the job finishes.
+        """
+        with self._lock:
+            active = sum(1 for job in self._jobs.values() if not job['future'].done())
+            if active >= self.max_queued:
+                self._cleanup(cleanup_paths)
+                raise HTTPException(status_code=503, detail="Job queue is full, try again later")
+
+            job_id = uuid.uuid4().hex
+            # This job and the others running share the cores (queued ones wait for a worker)
+            running = min(active + 1, self.max_workers)
+            cpus = max(1, (os.cpu_count() or 1) // running)
+            try:
+                future = self._submit(fn, args, cpus)
+            except Exception:
+                self._cleanup(cleanup_paths)
+                raise
+            self._jobs[job_id] = {
+                'kind': kind,
+                'future': future,
+                'submitted_at': time.time(),
+                'finished_at': None
+            }
+
+        future.add_done_callback(lambda _: self._on_done(job_id, cleanup_paths))
+        return job_id
+
+    def _on_done(self, job_id: str, cleanup_paths):
+        self._cleanup(cleanup_paths)
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job['finished_at'] = time.time()
+            self._evict_finished()
+        if job is not None:
+            self._observe(job)
+
+    def _observe(self, job: dict):
+        """Fold the job's duration and its result's stage timings into the /metrics histograms."""
+        outcome = self._outcome(job['future'])
+        metrics.observe_job(job['kind'], 'completed' if outcome['ok'] else 'failed',
+                            job['finished_at'] - job['submitted_at'])
+        result = outcome.get('result')
+        if outcome['ok'] and isinstance(result, dict) and result.get('timings'):
+            metrics.observe_timings(job['kind'], result['timings'])
+
+    def _evict_finished(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job['future'].done()]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+    @staticmethod
+    def _cleanup(paths):
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _get_job(self, job_id: str) -> dict:
+        job = self._jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+        return job
+
+    def status(self, job_id: str) -> dict:
+        job = self._get_job(job_id)
+        future = job['future']
+        info = {
+            'job_id': job_id,
+            'kind': job['kind'],
+            'submitted_at': job['submitted_at'],
+            'finished_at': job['finished_at']
+        }
+        if not future.done():
+            info['status'] = 'running' if future.running() else 'queued'
+            return info
+
+        outcome = self._outcome(future)
+        if outcome['ok']:
+            info['status'] = 'completed'
+        else:
+            info['status'] = 'failed'
+            info['error'] = outcome['detail']
+        return info
+
+    def result(self, job_id: str):
+        """
+        Return the job's result, None while it is still pending, or raise the job's error.
+        """
+        future = self._get_job(job_id)['future']
+        if not future.done():
+            return None
+        outcome = self._outcome(future)
+        if not outcome['ok']:
+            raise HTTPException(status_code=outcome['status_code'], detail=outcome['detail'])
+        return outcome['result']
+
+    @staticmethod
+    def _outcome(future) -> dict:
+        try:
+            return future.result()
+        except Exception as e:
+            # Worker crashed (e.g. OOM-killed) before it could report back
+            return {'ok': False, 'status_code': 500, 'detail': f"Job failed: {str(e)}"}
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+job_manager = JobManager()
@@ -0,0 +1,32 @@
+# app/services/predict_service.py
+import os
+import pandas as pd
+from fastapi import HTTPException
+from app.utils.pipeline import FittedPipeline
+
+# Rows scored per batch when streaming predictions
+PREDICT_BATCH_ROWS = int(os.getenv("AUTOML_PREDICT_BATCH_ROWS", "100000"))
+
+def validate_prediction_input(pipeline: FittedPipeline, path: str):
+    """
+    Check the CSV header before streaming starts, so errors still get a proper status code.
+    """
+    try:
+        columns = pd.read_csv(path, nrows=0).columns
+    except pd.errors.EmptyDataError:
+        raise HTTPException(status_code=400, detail="The CSV file appears to be empty or corrupt")
+    missing = pipeline.missing_features(columns)
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Columns required by the model are missing: {', '.join(missing)}")
+
+def iter_predictions(pipeline: FittedPipeline, path: str, batch_rows: int = PREDICT_BATCH_ROWS):
+    """
+    Score the CSV at path in batches, yielding a CSV with one prediction per input row.
+    Rows that cannot be scored (missing values under the "drop" strategy) are left empty.
+    """
+    yield "prediction\n"
+    # Only the feature columns are parsed; everything else in the file is skipped
+    with pd.read_csv(path, usecols=pipeline.feature_names, chunksize=batch_rows) as reader:
+        for batch in reader:
+            predictions = pipeline.predict(batch)
+            yield pd.Series(predictions).to_csv(index=False, header=False)
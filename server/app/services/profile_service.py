@@ -0,0 +1,237 @@
+# app/services/profile_service.py
+import io
+import os
+import warnings
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from fastapi import HTTPException
+
+from app.utils.ingestion import CATEGORY_MAX_RATIO, ColumnarFile, table_to_pandas
+from app.utils.profiling import column_kind, HIGH_CARDINALITY_THRESHOLD
+from app.utils.instrumentation import StageTimer
+from app.services.adanceCleaning import MISSING_INDICATORS, KNN_REFERENCE_ROWS, TEXT_CHUNK_ROWS
+
+# Bytes read from the start of the upload; the profile describes these rows only
+PROFILE_SAMPLE_BYTES = int(os.getenv("AUTOML_PROFILE_SAMPLE_BYTES", str(1024 * 1024)))
+# Parquet and Arrow keep their metadata at the end, so they can't be sent as a prefix
+# and are spooled whole; larger ones are rejected
+PROFILE_MAX_FILE_BYTES = int(os.getenv("AUTOML_PROFILE_MAX_FILE_BYTES", str(256 * 1024 * 1024)))
+
+QUANTILES = (0.0, 0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99, 1.0)
+# Share of a string column's values that must parse for it to be typed numeric or datetime
+TYPE_MATCH_RATIO = 0.95
+# Distinct values a string column is first tried as numbers or dates on; only
+# strings shaped like dates (2024-01-31, 31/01/2024, 31 Jan, Jan 31) are parsed as dates
+PROBE_VALUES = 200
+DATE_LIKE_PATTERN = r'^\s*(?:\d{1,4}[-/.]\d{1,2}[-/.]\d{1,4}|\d{1,2}\s+[A-Za-z]{3}|[A-Za-z]{3,9}\.?\s+\d{1,2})'
+# String columns averaging at least this many words are free text
+TEXT_MIN_WORDS = 3
+TOP_VALUES = 5
+# Share of values outside the IQR fences above which outlier clipping is suggested
+OUTLIER_SUGGEST_RATIO = 0.01
+
+
+def _normalize_indicators(series: pd.Series) -> pd.Series:
+    """Missing indicators ('?', 'missing', ...) become NaN, as _normalize_missing_indicators does."""
+    codes, uniques = pd.factorize(series)
+    normalized = pd.Index(uniques).astype(str).str.strip().str.lower()
+    missing_codes = np.flatnonzero(normalized.isin(MISSING_INDICATORS))
+    return series.mask(np.isin(codes, missing_codes)) if len(missing_codes) else series
+
+
+def _matched_share(matched: np.ndarray, counts: np.ndarray) -> float:
+    return float(counts[matched].sum() / counts.sum())
+
+
+def _to_datetime(values, mixed: bool) -> pd.Series:
+    with warnings.catch_warnings():
+        # Without a format pandas infers one from the first value and warns when it can't
+        warnings.simplefilter('ignore')
+        return pd.to_datetime(values, errors='coerce', format='mixed' if mixed else None)
+
+
+def _word_counts(strings: pd.Index) -> np.ndarray:
+    return pc.list_value_length(pc.utf8_split_whitespace(pa.array(strings, type=pa.string()))).to_numpy(
+        zero_copy_only=False)
+
+
+def _infer_kind(series: pd.Series, counts: pd.Series) -> tuple:
+    """
+    (kind, numeric values or None) of a column from the counts of its distinct
+    non-null sample values; string checks run once per distinct value, and the
+    slow parses only after the first PROBE_VALUES distinct values passed them.
+    Kinds: numeric, datetime, categorical, text, identifier (unique-ish short
+    strings such as ids) and empty.
+    """
+    if counts.empty:
+        return 'empty', None
+    kind = column_kind(series)
+    if kind == 'numeric':
+        return 'numeric', series.dropna().astype(float)
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        # Parquet and Arrow inputs carry typed timestamps
+        return 'datetime', None
+    if kind != 'text':
+        return 'categorical', None
+
+    strings = counts.index.astype(str)
+    weights = counts.to_numpy()
+    probe = strings[:PROBE_VALUES]
+    if pd.to_numeric(pd.Series(probe), errors='coerce').notna().mean() >= TYPE_MATCH_RATIO:
+        numeric = pd.to_numeric(pd.Series(strings), errors='coerce').to_numpy(dtype=float)
+        matched = ~np.isnan(numeric)
+        if _matched_share(matched, weights) >= TYPE_MATCH_RATIO:
+            return 'numeric', pd.Series(np.repeat(numeric[matched], weights[matched]))
+    if probe.str.contains(DATE_LIKE_PATTERN, regex=True).mean() >= TYPE_MATCH_RATIO and \
+            _to_datetime(probe, mixed=True).notna().mean() >= TYPE_MATCH_RATIO:
+        parsed = _to_datetime(strings, mixed=False)
+        if _matched_share(parsed.notna(), weights) < TYPE_MATCH_RATIO:
+            parsed = _to_datetime(strings, mixed=True)
+        if _matched_share(parsed.notna(), weights) >= TYPE_MATCH_RATIO:
+            return 'datetime', None
+    if (_word_counts(strings) * weights).sum() / weights.sum() >= TEXT_MIN_WORDS:
+        return 'text', None
+    if len(counts) <= HIGH_CARDINALITY_THRESHOLD or len(counts) <= CATEGORY_MAX_RATIO * weights.sum():
+        return 'categorical', None
+    return 'identifier', None
+
+
+def _numeric_summary(numeric: pd.Series) -> dict:
+    arr = numeric.to_numpy()
+    quantiles = np.quantile(arr, QUANTILES)
+    q1, q3 = quantiles[QUANTILES.index(0.25)], quantiles[QUANTILES.index(0.75)]
+    iqr = q3 - q1
+    outside = ((arr < q1 - 1.5 * iqr) | (arr > q3 + 1.5 * iqr)).mean() if iqr > 0 else 0.0
+    return {
+        'min': float(arr.min()),
+        'max': float(arr.max()),
+        'mean': float(arr.mean()),
+        'std': float(arr.std()),
+        'quantiles': {f'p{round(q * 100)}': float(v) for q, v in zip(QUANTILES, quantiles)},
+        'outlier_ratio': float(outside)
+    }
+
+
+def profile_column(series: pd.Series) -> dict:
+    if series.dtype == object:
+        series = _normalize_indicators(series)
+    counts = series.value_counts()
+    kind, numeric = _infer_kind(series, counts)
+    present = int(counts.sum())
+    column = {
+        'name': str(series.name),
+        'kind': kind,
+        'dtype': str(series.dtype),
+        'null_count': int(len(series) - present),
+        'null_rate': float(1 - present / len(series)) if len(series) else 0.0,
+        'distinct_count': int(len(counts)),
+        'distinct_ratio': float(len(counts) / present) if present else 0.0,
+        'constant': len(counts) <= 1
+    }
+    if numeric is not None and len(numeric):
+        column['numeric'] = _numeric_summary(numeric)
+    elif kind == 'categorical':
+        column['top_values'] = [
+            {'value': str(value), 'count': int(count)} for value, count in counts.head(TOP_VALUES).items()
+        ]
+    elif kind == 'text':
+        column['avg_words'] = float((_word_counts(counts.index.astype(str)) * counts.to_numpy()).sum() / present)
+    return column
+
+
+def suggest_config(columns: list, estimated_rows: int) -> dict:
+    """A preprocessing config for /api/clean built from the column profiles."""
+    def named(kind):
+        return [c['name'] for c in columns if c['kind'] == kind and not c['constant']]
+
+    numeric, categorical, text = named('numeric'), named('categorical'), named('text')
+    has_missing = any(c['null_count'] for c in columns)
+    heavy_tails = any(c.get('numeric', {}).get('outlier_ratio', 0) > OUTLIER_SUGGEST_RATIO for c in columns)
+    return {
+        'available_columns': [c['name'] for c in columns],
+        'numeric_columns': numeric,
+        'categorical_columns': categorical,
+        'text_columns': text,
+        'datetime_columns': named('datetime'),
+        'target_column': '',
+        'impute_missing': has_missing,
+        # KNN imputation beyond its reference set size gets slow; median is a single pass
+        'imputation_method': 'knn' if estimated_rows <= KNN_REFERENCE_ROWS else 'median',
+        'imputation_n_neighbors': 5,
+        'remove_outliers': heavy_tails,
+        'outlier_method': 'iqr',
+        'outlier_threshold': 1.5,
+        'outlier_action': 'clip',
+        'feature_scaling': bool(numeric),
+        'scaling_method': 'standard',
+        'encode_categorical': bool(categorical),
+        'encoding_method': 'onehot',
+        'text_processing': bool(text),
+        'remove_stopwords': bool(text),
+        'lemmatize': False,
+        # Hashing needs no vocabulary pass, which matters on large text columns
+        'text_vectorization': 'hashing' if estimated_rows > TEXT_CHUNK_ROWS else 'tfidf',
+        'dimensionality_reduction': False,
+        'handle_imbalance': False
+    }
+
+
+def profile_sample(data: bytes, truncated: bool, total_bytes: int = None) -> dict:
+    """
+    Profile the CSV rows in data, a prefix of an upload of total_bytes bytes
+    (see read_prefix). Statistics describe the sample; row counts for the whole
+    file are extrapolated from the sample's bytes per row.
+    """
+    timer = StageTimer()
+    try:
+        with timer.stage('parse'):
+            df = pd.read_csv(io.BytesIO(data), low_memory=False)
+    except pd.errors.EmptyDataError:
+        raise HTTPException(status_code=400, detail="The CSV file appears to be empty or corrupt")
+    except pd.errors.ParserError as e:
+        raise HTTPException(status_code=400, detail=f"Could not parse the CSV sample: {str(e)}")
+
+    rows = len(df)
+    estimated_rows = rows
+    if truncated and total_bytes and data:
+        estimated_rows = int(rows * total_bytes / len(data))
+    return _profile_frame(df, {
+        'rows': rows,
+        'bytes': len(data),
+        'total_bytes': total_bytes,
+        'truncated': truncated,
+        'estimated_rows': estimated_rows
+    }, timer)
+
+
+def profile_file(path: str) -> dict:
+    """
+    profile_sample for a Parquet or Arrow file. Only its leading row groups
+    (or record batches) within PROFILE_SAMPLE_BYTES are read; the row count of
+    the whole file comes from its metadata.
+    """
+    timer = StageTimer()
+    with timer.stage('parse'):
+        columnar = ColumnarFile(path)
+        table = columnar.head(PROFILE_SAMPLE_BYTES)
+        df = table_to_pandas(table)
+    return _profile_frame(df, {
+        'rows': len(df),
+        'bytes': table.nbytes,
+        'total_bytes': os.path.getsize(path),
+        'truncated': len(df) < columnar.num_rows,
+        'estimated_rows': columnar.num_rows
+    }, timer)
+
+
+def _profile_frame(df: pd.DataFrame, sample: dict, timer: StageTimer) -> dict:
+    with timer.stage('profile'):
+        columns = [profile_column(df[col]) for col in df.columns]
+    return {
+        'sample': sample,
+        'columns': columns,
+        'suggested_config': suggest_config(columns, sample['estimated_rows']),
+        'timings': timer.to_dict()
+    }
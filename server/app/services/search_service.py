@@ -0,0 +1,166 @@
+# app/services/search_service.py
+import os
+import math
+import time
+import multiprocessing
+import numpy as np
+from joblib import Parallel, delayed
+from scipy.stats import randint
+from sklearn.metrics import r2_score
+from sklearn.model_selection import ParameterSampler, train_test_split
+from sklearn.utils import resample
+
+from app.services.jobs import job_cpus
+
+# Parallel candidate fits; -1 uses the job's share of the cores (see job_cpus)
+SEARCH_WORKERS = int(os.getenv("AUTOML_SEARCH_WORKERS", "-1"))
+# Bounds on the sample every candidate is trained on in the first round; later
+# rounds grow it by the halving factor
+MIN_SEARCH_SAMPLES = 50
+MAX_FIRST_ROUND_SAMPLES = 2000
+
+# Randomized search spaces per entry of MODEL_MAP
+PARAM_SPACES = {
+    "LinearRegression": {
+        "fit_intercept": [True, False],
+        "positive": [False, True]
+    },
+    "RandomForest": {
+        "n_estimators": randint(50, 400),
+        "max_depth": [None, 5, 10, 20, 40],
+        "min_samples_split": randint(2, 20),
+        "min_samples_leaf": randint(1, 10),
+        "max_features": [1.0, "sqrt", 0.5]
+    },
+    "DecisionTree": {
+        "max_depth": [None, 3, 5, 10, 20],
+        "min_samples_split": randint(2, 20),
+        "min_samples_leaf": randint(1, 10)
+    }
+}
+
+
+def _max_candidates(space: dict, requested: int) -> int:
+    # ParameterSampler cannot draw more distinct candidates than a finite grid holds
+    if all(isinstance(values, list) for values in space.values()):
+        return min(requested, math.prod(len(values) for values in space.values()))
+    return requested
+
+
+def _to_native(params: dict) -> dict:
+    return {k: v.item() if hasattr(v, 'item') else v for k, v in params.items()}
+
+
+def _score_candidate(index, estimator_cls, params, X_train, y_train, X_valid, y_valid):
+    estimator = estimator_cls(**params)
+    estimator.fit(X_train, y_train)
+    return index, float(r2_score(y_valid, estimator.predict(X_valid)))
+
+
+def _run_round(estimator_cls, candidates, alive, X_round, y_round, X_valid, y_valid, deadline) -> dict:
+    """
+    Score the alive candidates in parallel, stopping at the deadline.
+    Returns {candidate index: score} for the candidates that finished in time.
+    """
+    n_jobs = min(len(alive), SEARCH_WORKERS if SEARCH_WORKERS > 0 else job_cpus())
+    if n_jobs == 1:
+        # joblib runs n_jobs=1 in this process, where a running fit cannot be
+        # interrupted: candidates are scored in turn and none is started past
+        # the deadline, so the round overruns by at most one fit
+        scores = {}
+        for i in alive:
+            if time.monotonic() > deadline:
+                break
+            index, score = _score_candidate(i, estimator_cls, candidates[i], X_round, y_round, X_valid, y_valid)
+            scores[index] = score
+        return scores
+    # Results arrive as candidates finish; a candidate still running at the deadline
+    # times out and leaving the generator aborts (and kills) the remaining work
+    results = Parallel(n_jobs=n_jobs, timeout=max(deadline - time.monotonic(), 1e-3),
+                       return_as='generator_unordered')(
+        delayed(_score_candidate)(i, estimator_cls, candidates[i], X_round, y_round, X_valid, y_valid)
+        for i in alive
+    )
+    scores = {}
+    try:
+        for i, score in results:
+            scores[i] = score
+            if time.monotonic() > deadline:
+                break
+    except (TimeoutError, multiprocessing.TimeoutError):
+        pass
+    finally:
+        results.close()
+    return scores
+
+
+def successive_halving_search(estimator_cls, space: dict, X, y, budget_seconds: float,
+                              max_candidates: int, factor: int = 3, random_state: int = 42) -> dict:
+    """
+    Randomized search with successive halving on sample size.
+
+    Every round trains the surviving candidates in parallel on a sample that is
+    `factor` times larger than the previous one, scores them on a fixed holdout
+    and keeps the best 1/factor. Rounds start on small samples, a round is only
+    started if the previous one's duration fits in the remaining budget, and
+    candidates still running at the deadline are abandoned, so the search ends
+    within budget_seconds even when the full dataset would be too slow to fit
+    (with a single worker, the fit in progress finishes first).
+    If no candidate finishes in time, best_params is empty (model defaults).
+    """
+    start = time.monotonic()
+    deadline = start + budget_seconds
+
+    X_fit, X_valid, y_fit, y_valid = train_test_split(X, y, test_size=0.2, random_state=random_state)
+    n_available = len(y_fit)
+
+    candidates = [
+        _to_native(params) for params in
+        ParameterSampler(space, n_iter=_max_candidates(space, max_candidates), random_state=random_state)
+    ]
+    n_rounds = math.ceil(math.log(len(candidates), factor)) + 1 if len(candidates) > 1 else 1
+    history = [{'params': params, 'scores': []} for params in candidates]
+    alive = list(range(len(candidates)))
+
+    # On large datasets the first round starts small instead of at n / factor^(rounds - 1)
+    first_samples = min(max(MIN_SEARCH_SAMPLES, n_available // factor ** (n_rounds - 1)), MAX_FIRST_ROUND_SAMPLES)
+
+    rounds_completed = 0
+    last_round_time = 0.0
+    for round_idx in range(n_rounds):
+        # Next round has 1/factor candidates on factor x the samples: assume a similar cost
+        if rounds_completed and time.monotonic() + last_round_time > deadline:
+            break
+
+        round_start = time.monotonic()
+        n_samples = min(n_available, first_samples * factor ** round_idx)
+        if n_samples < n_available:
+            X_round, y_round = resample(X_fit, y_fit, n_samples=n_samples, replace=False,
+                                        random_state=random_state + round_idx)
+        else:
+            X_round, y_round = X_fit, y_fit
+
+        scores = _run_round(estimator_cls, candidates, alive, X_round, y_round, X_valid, y_valid, deadline)
+        if not scores:
+            break
+        interrupted = len(scores) < len(alive)
+        for i, score in scores.items():
+            history[i]['scores'].append({'n_samples': int(n_samples), 'score': score})
+        last_round_time = time.monotonic() - round_start
+        rounds_completed += 1
+
+        ranked = sorted(scores.items(), key=lambda item: -item[1] if not np.isnan(item[1]) else float('inf'))
+        alive = [i for i, _ in ranked[:max(1, math.ceil(len(alive) / factor))]]
+        if interrupted:
+            break
+
+    # Nothing finished within the budget: fall back to the default parameters
+    best = alive[0] if rounds_completed else None
+    return {
+        'best_params': candidates[best] if best is not None else {},
+        'best_score': history[best]['scores'][-1]['score'] if best is not None else None,
+        'candidates': history,
+        'rounds': rounds_completed,
+        'time_spent': time.monotonic() - start,
+        'budget_seconds': budget_seconds
+    }
@@ -1,5 +1,3 @@
-import io  # Add this import at the top
-import base64
 import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
@@ -10,157 +8,364 @@ from sklearn.metrics import (
     mean_squared_error, r2_score, mean_absolute_error,
     explained_variance_score, max_error, mean_absolute_percentage_error
 )
-from fastapi import UploadFile, HTTPException
+from fastapi import HTTPException
 from collections import defaultdict
+from typing import Optional
+import os
 import traceback
+import time
+from joblib import Parallel, delayed
 
-from app.utils.visualization import get_visualization_plot, get_prediction_plot
+from app.utils.ingestion import read_dataset, input_format, input_suffix, ColumnarFile
+from app.utils.run_store import create_run, run_path
 from app.utils.preprocessing import (
     drop_constant, drop_high_cardinality, handle_missing,
     encode_categorical, split_features_target, scale_features,
-    track_original_numeric, get_tracked_numeric_cols
+    compute_fill_values, get_categories, skippable_columns,
+    track_original_numeric, get_tracked_numeric_cols, PreprocessingContext
 )
+from app.utils.profiling import profile_dataframe
+from app.utils.dataset_cache import dataset_cache
+from app.utils.pipeline import FittedPipeline
+from app.utils.instrumentation import StageTimer
+from app.utils.dashboard import save_run_summary
+from app.utils.correlation import save_correlation_data
+from app.services.jobs import job_cpus
+from app.services.search_service import successive_halving_search, PARAM_SPACES
+from app.services.importance_service import permutation_importance
 
-async def train_model_service(
-    file: UploadFile, model: str, scaler: str,
-    split_ratio: float, missing: str, encoding: str
-):
-    try:
-        # Validate input parameters
-        if split_ratio <= 0 or split_ratio >= 1:
-            raise HTTPException(status_code=400, detail="Split ratio must be between 0 and 1")
-        
-        if not file.filename.endswith('.csv'):
-            raise HTTPException(status_code=400, detail="Only CSV files are supported")
+# Parallel fits for /train/compare; 0 uses the job's share of the cores (capped by the number of models)
+COMPARE_WORKERS = int(os.getenv("AUTOML_COMPARE_WORKERS", "0"))
 
-        contents = await file.read()
-        df = pd.read_csv(io.BytesIO(contents))
-        
-        if df.empty:
-            raise HTTPException(status_code=400, detail="Uploaded file is empty")
+MODEL_MAP = {
+    "LinearRegression": LinearRegression,
+    "RandomForest": RandomForestRegressor,
+    "DecisionTree": DecisionTreeRegressor
+}
 
-        # Track preprocessing steps
-        preprocessing_stats = defaultdict(dict)
-        original_shape = df.shape
-        
-        # Track missing values before handling
-        missing_before = df.isna().sum().to_dict()
-        preprocessing_stats['missing_values_before'] = missing_before
-        
-        # Preprocessing
-        df = handle_missing(df, missing)
-        df = drop_constant(df)
-        df = drop_high_cardinality(df)
-        
-        if df.empty:
+def validate_train_request(filename: Optional[str], model: str, split_ratio: float):
+    """
+    Cheap checks run in the request handler, before the upload is queued for training.
+    filename is None when training on a stored dataset instead of an upload.
+    """
+    if split_ratio <= 0 or split_ratio >= 1:
+        raise HTTPException(status_code=400, detail="Split ratio must be between 0 and 1")
+
+    if filename is not None:
+        input_suffix(filename)
+
+    if model not in MODEL_MAP:
+        raise HTTPException(status_code=400, detail=f"Invalid model type. Available options: {list(MODEL_MAP.keys())}")
+
+def load_preprocessed(path: str, missing: str, encoding: str, upload_hash: str = None,
+                      optimize_dtypes: bool = True, timer: StageTimer = None):
+    """
+    Parse and preprocess the dataset up to (and including) categorical encoding.
+    Results are cached by upload hash and preprocessing parameters, so repeated
+    experiments on the same file skip straight to scaling and the model fit.
+    Returns (df, preprocessing_stats, original_shape, cache_info, context), where
+    context is the request's PreprocessingContext. Stages are recorded on timer.
+    """
+    timer = timer or StageTimer()
+    key = dataset_cache.make_key(
+        upload_hash, missing=missing, encoding=encoding, optimize_dtypes=optimize_dtypes
+    ) if upload_hash else None
+    with timer.stage('cache_lookup'):
+        cached = dataset_cache.get(key) if key else None
+    if cached is not None:
+        df, meta = cached
+        context = PreprocessingContext.from_dict(meta['context'])
+        preprocessing_stats = defaultdict(dict, meta['preprocessing_stats'])
+        return df, preprocessing_stats, tuple(meta['original_shape']), dataset_cache.info(hit=True), context
+
+    # Parquet and Arrow inputs are scanned column by column first, so columns
+    # the drops below would remove anyway are never converted to pandas
+    columns, skipped = None, {}
+    if input_format(path) != 'csv':
+        with timer.stage('scan'):
+            columnar = ColumnarFile(path)
+            skipped = skippable_columns(columnar, missing)
+            columns = [col for col in columnar.columns if col not in skipped]
+        if columnar.num_rows and not columns:
             raise HTTPException(status_code=400, detail="All columns were dropped during preprocessing")
-        
-        # Track preprocessing changes
-        preprocessing_stats['missing_values_after'] = df.isna().sum().to_dict()
-        preprocessing_stats['dropped_constant_columns'] = original_shape[1] - df.shape[1]
-        preprocessing_stats['final_shape'] = df.shape
-        
-        track_original_numeric(df)
-        df = encode_categorical(df, encoding)
+
+    # Downcast numerics and categorize low-cardinality strings while parsing
+    memory_report = {}
+    with timer.stage('parse'):
+        df = read_dataset(path, columns=columns if skipped else None, optimize=optimize_dtypes, report=memory_report)
+    
+    if df.empty:
+        raise HTTPException(status_code=400, detail="Uploaded file is empty")
+
+    # Track preprocessing steps
+    preprocessing_stats = defaultdict(dict)
+    if memory_report:
+        preprocessing_stats['memory'] = memory_report
+    original_columns = columnar.columns if skipped else df.columns.tolist()
+    original_shape = (len(df), len(original_columns))
+    
+    # One pass over the columns for null counts, kinds and distinct values,
+    # shared by the missing-value stats, the column drops and the categories
+    with timer.stage('profile'):
+        profile = profile_dataframe(df)
+    missing_before = {
+        col: skipped[col].null_count if col in skipped else profile[col].null_count for col in original_columns
+    }
+    preprocessing_stats['missing_values_before'] = missing_before
+    
+    # Preprocessing
+    context = PreprocessingContext(missing, encoding)
+    with timer.stage('handle_missing'):
+        context.fill_values = compute_fill_values(df, missing)
+        df = handle_missing(df, missing, fill_values=context.fill_values)
+        if missing == "drop":
+            # Dropped rows can take distinct values with them
+            profile = profile_dataframe(df)
+        else:
+            profile.apply_fill(context.fill_values)
+    with timer.stage('drop_columns'):
+        df = drop_constant(df, profile)
+        df = drop_high_cardinality(df, profile=profile)
+    context.dropped_columns = [col for col in original_columns if col not in df.columns]
+    context.categories = get_categories(df, profile)
+    
+    if df.empty:
+        raise HTTPException(status_code=400, detail="All columns were dropped during preprocessing")
+    
+    # Track preprocessing changes
+    preprocessing_stats['missing_values_after'] = profile.null_counts(df.columns)
+    preprocessing_stats['dropped_constant_columns'] = original_shape[1] - df.shape[1]
+    preprocessing_stats['final_shape'] = df.shape
+    numeric_columns = profile.count('numeric', df.columns)
+    preprocessing_stats['feature_types'] = {
+        'numeric': numeric_columns,
+        'categorical': original_shape[1] - numeric_columns - 1
+    }
+    
+    track_original_numeric(df, context)
+    with timer.stage('encode_categorical'):
+        df = encode_categorical(df, encoding).reset_index(drop=True)
+
+    if key:
+        with timer.stage('cache_store'):
+            dataset_cache.put(key, df, {
+                'original_shape': list(original_shape),
+                'preprocessing_stats': preprocessing_stats,
+                'context': context.to_dict()
+            })
+    return df, preprocessing_stats, original_shape, dataset_cache.info(hit=False), context
+
+def compute_metrics(y_test, y_pred, training_samples: int) -> dict:
+    """
+    Regression metrics reported for every trained model.
+    """
+    has_test = len(y_test) > 0
+    return {
+        "rmse": float(np.sqrt(mean_squared_error(y_test, y_pred)) if has_test else float('nan')),
+        "r2": float(r2_score(y_test, y_pred)) if has_test else float('nan'),
+        "mae": float(mean_absolute_error(y_test, y_pred)) if has_test else float('nan'),
+        "explained_variance": float(explained_variance_score(y_test, y_pred)) if has_test else float('nan'),
+        "max_error": float(max_error(y_test, y_pred)) if has_test else float('nan'),
+        "mape": float(mean_absolute_percentage_error(y_test, y_pred)) if has_test else float('nan'),
+        "training_samples": int(training_samples),
+        "testing_samples": int(len(y_test))
+    }
+
+def get_feature_importances(estimator, feature_names) -> dict:
+    # Feature importance handling for different models
+    if hasattr(estimator, 'coef_'):  # For linear regression
+        return {str(k): float(v) for k, v in zip(feature_names, estimator.coef_)}
+    if hasattr(estimator, 'feature_importances_'):  # For tree-based models
+        return {str(k): float(v) for k, v in zip(feature_names, estimator.feature_importances_)}
+    return {}
+
+def fit_and_evaluate(model: str, X_train, y_train, X_test, y_test, feature_names, params: dict = None) -> dict:
+    """
+    Fit one entry of MODEL_MAP and evaluate it on the test split, timing fit and predict.
+    """
+    estimator = MODEL_MAP[model](**(params or {}))
+
+    start = time.perf_counter()
+    estimator.fit(X_train, y_train)
+    fit_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    y_pred = estimator.predict(X_test)
+    predict_time = time.perf_counter() - start
+
+    metrics = compute_metrics(y_test, y_pred, X_train.shape[0])
+    feature_importances = get_feature_importances(estimator, feature_names)
+    if feature_importances:
+        metrics['feature_importances'] = feature_importances
+
+    return {
+        'model': model,
+        'estimator': estimator,
+        'y_pred': y_pred,
+        'metrics': metrics,
+        'fit_time': fit_time,
+        'predict_time': predict_time
+    }
+
+def save_plot_data(run_id: str, feature_importances: dict, y_test, y_pred, importance_kind: str):
+    """
+    Persist the arrays the run's plots are rendered from.
+    """
+    with open(run_path(run_id, 'plot_data.npz'), 'wb') as f:
+        np.savez(
+            f,
+            feature_names=np.array(list(feature_importances.keys()), dtype=str),
+            importance_values=np.array(list(feature_importances.values()), dtype=float),
+            importance_kind=np.array(importance_kind),
+            y_test=np.asarray(y_test, dtype=float),
+            y_pred=np.asarray(y_pred, dtype=float)
+        )
+
+def build_dashboard_metrics(metrics: dict, feature_importances: dict, original_shape, final_shape,
+                            missing_before: dict, missing_after: dict, dropped_columns: int,
+                            feature_types: dict) -> dict:
+    # Generate dashboard metrics - improved structure
+    return {
+        "model_performance": {
+            "metrics": metrics,
+            "plots": {
+                "feature_importance": bool(feature_importances),
+                "prediction_plot": True
+            }
+        },
+        "data_quality": {
+            "initial_shape": f"{original_shape[0]} rows × {original_shape[1]} cols",
+            "final_shape": f"{final_shape[0]} rows × {final_shape[1]} cols",
+            "missing_values": {
+                "before": sum(missing_before.values()),
+                "after": sum(missing_after.values())
+            },
+            "dropped_columns": dropped_columns,
+            "feature_types": feature_types
+        },
+        "feature_analysis": {
+            "importances": feature_importances,
+            "top_features": dict(sorted(feature_importances.items(), 
+                                      key=lambda item: abs(item[1]), 
+                               reverse=True)[:5] if feature_importances else {})
+        }
+    }
+
+def train_model_service(
+    path: str, model: str, scaler: str,
+    split_ratio: float, missing: str, encoding: str, upload_hash: str = None,
+    optimize_dtypes: bool = True, search: dict = None, permutation: dict = None
+):
+    """
+    Train and evaluate a model on the CSV spooled at path (or a stored dataset). Runs inside a job worker.
+    search, if given, holds budget_seconds and max_candidates for a hyperparameter
+    search whose best parameters are used for the final fit.
+    permutation, if given, holds budget_seconds and n_repeats for permutation
+    importances on a test subsample, which replace the model's own importances.
+    """
+    timer = StageTimer()
+    try:
+        df, preprocessing_stats, original_shape, cache_info, context = load_preprocessed(
+            path, missing, encoding, upload_hash, optimize_dtypes, timer
+        )
+        missing_before = preprocessing_stats['missing_values_before']
         
         # Preserve raw data sample
-        raw_sample_rows = df[get_tracked_numeric_cols()].head(5).to_dict(orient="records")
+        raw_sample_rows = df[get_tracked_numeric_cols(context)].head(5).to_dict(orient="records")
         
         # Split features and scale
-        X, y, feature_names = split_features_target(df)
-        X = scale_features(X, scaler)
+        with timer.stage('scale_features'):
+            X, y, feature_names = split_features_target(df, context)
+            X, fitted_scaler = scale_features(X, scaler)
         
         # Train-test split
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=(1 - split_ratio), random_state=42
-        )
+        with timer.stage('split'):
+            X_train, X_test, y_train, y_test = train_test_split(
+                X, y, test_size=(1 - split_ratio), random_state=42
+            )
         
         # Model selection with validation
-        model_map = {
-            "LinearRegression": LinearRegression(),
-            "RandomForest": RandomForestRegressor(),
-            "DecisionTree": DecisionTreeRegressor()
-        }
+        if model not in MODEL_MAP:
+            raise HTTPException(status_code=400, detail=f"Invalid model type. Available options: {list(MODEL_MAP.keys())}")
         
-        if model not in model_map:
-            raise HTTPException(status_code=400, detail=f"Invalid model type. Available options: {list(model_map.keys())}")
-        
-        selected = model_map[model]
-        selected.fit(X_train, y_train)
-        
-        # Predict and evaluate
-        y_pred = selected.predict(X_test)
-        
-        # Enhanced metrics with validation
-        metrics = {
-            "rmse": float(np.sqrt(mean_squared_error(y_test, y_pred)) if len(y_test) > 0 else float('nan')),
-            "r2": float(r2_score(y_test, y_pred)) if len(y_test) > 0 else float('nan'),
-            "mae": float(mean_absolute_error(y_test, y_pred)) if len(y_test) > 0 else float('nan'),
-            "explained_variance": float(explained_variance_score(y_test, y_pred)) if len(y_test) > 0 else float('nan'),
-            "max_error": float(max_error(y_test, y_pred)) if len(y_test) > 0 else float('nan'),
-            "mape": float(mean_absolute_percentage_error(y_test, y_pred)) if len(y_test) > 0 else float('nan'),
-            "training_samples": int(X_train.shape[0]),
-            "testing_samples": int(X_test.shape[0])
-        }
+        # Optional budgeted hyperparameter search on the training split
+        search_result = None
+        if search:
+            with timer.stage('search'):
+                search_result = successive_halving_search(
+                    MODEL_MAP[model], PARAM_SPACES[model], X_train, y_train,
+                    budget_seconds=search['budget_seconds'], max_candidates=search['max_candidates']
+                )
         
-        # Feature importance handling for different models
-        feature_importances = {}
-        if hasattr(selected, 'coef_'):  # For linear regression
-            feature_importances = {str(k): float(v) for k, v in zip(feature_names, selected.coef_)}
-        elif hasattr(selected, 'feature_importances_'):  # For tree-based models
-            feature_importances = {str(k): float(v) for k, v in zip(feature_names, selected.feature_importances_)}
+        with timer.stage('fit_and_evaluate'):
+            fitted = fit_and_evaluate(model, X_train, y_train, X_test, y_test, feature_names,
+                                      params=search_result['best_params'] if search_result else None)
+        selected, y_pred, metrics = fitted['estimator'], fitted['y_pred'], fitted['metrics']
+        importance_kind = 'coef' if hasattr(selected, 'coef_') else 'importance'
         
-        if feature_importances:
-            metrics['feature_importances'] = feature_importances
+        # Optional model-agnostic importances, within their own time budget
+        permutation_result = None
+        if permutation and len(y_test):
+            with timer.stage('permutation_importance'):
+                permutation_result = permutation_importance(
+                    selected, X_test, y_test, feature_names,
+                    budget_seconds=permutation['budget_seconds'], n_repeats=permutation['n_repeats']
+                )
+            if permutation_result['importances']:
+                metrics['feature_importances'] = permutation_result['importances']
+                importance_kind = 'permutation'
+        feature_importances = metrics.get('feature_importances', {})
         
-        # Visualizations
-        vis = get_visualization_plot(selected, feature_names, model)
-        pred_plot = get_prediction_plot(y_test, y_pred)
+        # Visualizations are rendered lazily by GET /runs/{run_id}/plots/{name};
+        # only the data they need is stored with the run
+        with timer.stage('save_run'):
+            run_id = create_run()
+            
+            # Persist the fitted pipeline so POST /predict/{run_id} can score new data
+            FittedPipeline(
+                missing_strategy=context.missing,
+                fill_values=context.fill_values,
+                dropped_columns=context.dropped_columns,
+                encoding=context.encoding,
+                categories=context.categories,
+                feature_names=list(feature_names),
+                target=str(context.target),
+                scaler=fitted_scaler,
+                model=selected
+            ).save(run_id)
+            save_plot_data(run_id, feature_importances, y_test, y_pred, importance_kind)
+            save_run_summary(run_id, metrics, preprocessing_stats, original_shape, model, scaler,
+                             feature_names, missing, encoding)
+            save_correlation_data(run_id, X, feature_names, feature_importances)
+        plots = {
+            "feature_importance": f"/runs/{run_id}/plots/feature_importance" if feature_importances else None,
+            "prediction": f"/runs/{run_id}/plots/prediction"
+        }
         
         # Prepare processed sample
         processed_sample_rows = pd.DataFrame(X, columns=feature_names).head(5).to_dict(orient="records")
         
-        # Generate dashboard metrics - improved structure
-        dashboard_metrics = {
-            "model_performance": {
-                "metrics": metrics,
-                "plots": {
-                    "feature_importance": bool(feature_importances),
-                    "prediction_plot": True
-                }
-            },
-            "data_quality": {
-                "initial_shape": f"{original_shape[0]} rows × {original_shape[1]} cols",
-                "final_shape": f"{df.shape[0]} rows × {df.shape[1]} cols",
-                "missing_values": {
-                    "before": sum(missing_before.values()),
-                    "after": sum(preprocessing_stats['missing_values_after'].values())
-                },
-                "dropped_columns": preprocessing_stats['dropped_constant_columns'],
-                "feature_types": {
-                    "numeric": len(get_tracked_numeric_cols()),
-                    "categorical": original_shape[1] - len(get_tracked_numeric_cols()) - 1
-                }
-            },
-            "feature_analysis": {
-                "importances": feature_importances,
-                "top_features": dict(sorted(feature_importances.items(), 
-                                          key=lambda item: abs(item[1]), 
-                                   reverse=True)[:5] if feature_importances else {})
-            }
-        }
+        dashboard_metrics = build_dashboard_metrics(
+            metrics, feature_importances, original_shape, df.shape, missing_before,
+            preprocessing_stats['missing_values_after'], preprocessing_stats['dropped_constant_columns'],
+            preprocessing_stats['feature_types']
+        )
         
         return {
             "metrics": metrics,
             "preprocessing_stats": preprocessing_stats,
-            "visualization": vis,
-            "prediction_plot": pred_plot,
+            "run_id": run_id,
+            "plots": plots,
             "columns": list(feature_names),
             "rows": processed_sample_rows,
             "raw_rows": raw_sample_rows,
             "model_type": model,
             "scaler_type": scaler,
-            "dashboard_metrics": dashboard_metrics
+            "dashboard_metrics": dashboard_metrics,
+            "cache": cache_info,
+            "search": search_result,
+            "permutation": permutation_result,
+            "timings": timer.to_dict()
         }
         
     except HTTPException:
@@ -174,4 +379,88 @@ async def train_model_service(
         raise HTTPException(
             status_code=500,
             detail=f"An unexpected error occurred: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+def parse_model_list(models: str) -> list:
+    """
+    Parse a comma-separated list of MODEL_MAP keys; an empty value selects every model.
+    """
+    selected = [m.strip() for m in (models or '').split(',') if m.strip()]
+    if not selected:
+        return list(MODEL_MAP.keys())
+    invalid = [m for m in selected if m not in MODEL_MAP]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Invalid model type(s) {invalid}. Available options: {list(MODEL_MAP.keys())}")
+    return list(dict.fromkeys(selected))
+
+def _leaderboard_entry(model: str, X_train, y_train, X_test, y_test, feature_names) -> dict:
+    # Runs in a joblib worker; only the lightweight results are sent back
+    fitted = fit_and_evaluate(model, X_train, y_train, X_test, y_test, feature_names)
+    return {
+        'model': model,
+        'metrics': fitted['metrics'],
+        'fit_time': fitted['fit_time'],
+        'predict_time': fitted['predict_time']
+    }
+
+def compare_models_service(
+    path: str, models: list, scaler: str,
+    split_ratio: float, missing: str, encoding: str, upload_hash: str = None,
+    optimize_dtypes: bool = True
+):
+    """
+    Preprocess the dataset once, then fit every requested model on the same
+    split in parallel and rank them by R². Runs inside a job worker.
+    """
+    timer = StageTimer()
+    try:
+        df, preprocessing_stats, _, cache_info, context = load_preprocessed(
+            path, missing, encoding, upload_hash, optimize_dtypes, timer
+        )
+        
+        with timer.stage('scale_features'):
+            X, y, feature_names = split_features_target(df, context)
+            X, _ = scale_features(X, scaler)
+        with timer.stage('split'):
+            X_train, X_test, y_train, y_test = train_test_split(
+                X, y, test_size=(1 - split_ratio), random_state=42
+            )
+        
+        n_jobs = min(len(models), COMPARE_WORKERS if COMPARE_WORKERS > 0 else job_cpus())
+        start = time.perf_counter()
+        # Fits run in joblib workers, whose CPU time and memory this process doesn't see
+        with timer.stage('fit_models'):
+            entries = Parallel(n_jobs=n_jobs)(
+                delayed(_leaderboard_entry)(m, X_train, y_train, X_test, y_test, feature_names)
+                for m in models
+            )
+        total_time = time.perf_counter() - start
+        
+        # Best R² first; models without a score (empty test split) go last
+        entries.sort(key=lambda e: -e['metrics']['r2'] if not np.isnan(e['metrics']['r2']) else float('inf'))
+        for rank, entry in enumerate(entries, start=1):
+            entry['rank'] = rank
+        
+        return {
+            "leaderboard": entries,
+            "best_model": entries[0]['model'],
+            "total_time": total_time,
+            "preprocessing_stats": preprocessing_stats,
+            "columns": list(feature_names),
+            "scaler_type": scaler,
+            "cache": cache_info,
+            "timings": timer.to_dict()
+        }
+        
+    except HTTPException:
+        raise
+    except pd.errors.EmptyDataError:
+        raise HTTPException(status_code=400, detail="The CSV file appears to be empty or corrupt")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(
+            status_code=500,
+            detail=f"An unexpected error occurred: {str(e)}"
+        )
@@ -0,0 +1,96 @@
+# app/utils/correlation.py
+import os
+import numpy as np
+from scipy.stats import rankdata
+
+from app.utils.run_store import run_path
+
+# Features (by absolute importance) the dashboard correlates
+CORRELATION_TOP_K = int(os.getenv("AUTOML_CORRELATION_TOP_K", "10"))
+# Rows of the preprocessed matrix kept for correlations; larger datasets are sampled
+CORRELATION_MAX_ROWS = int(os.getenv("AUTOML_CORRELATION_MAX_ROWS", "50000"))
+# Rows per float32 block when accumulating the cross products
+CORRELATION_BLOCK_ROWS = 8192
+
+CORRELATION_FILE = 'correlation_data.npz'
+
+
+def top_features(feature_importances: dict, k: int = CORRELATION_TOP_K) -> list:
+    """Names of the k features with the largest absolute importance (or coefficient)."""
+    ranked = sorted(feature_importances.items(), key=lambda item: abs(item[1]), reverse=True)
+    return [name for name, _ in ranked[:k]]
+
+
+def sample_rows(n: int, max_rows: int = CORRELATION_MAX_ROWS, seed: int = 42) -> np.ndarray:
+    """Sorted indices of a uniform sample of at most max_rows of n rows (all of them when n fits)."""
+    if n <= max_rows:
+        return np.arange(n)
+    return np.sort(np.random.default_rng(seed).choice(n, size=max_rows, replace=False))
+
+
+def pearson_matrix(X, block_rows: int = CORRELATION_BLOCK_ROWS) -> np.ndarray:
+    """
+    Pearson correlation between the columns of X. Centred rows are multiplied
+    in float32 blocks of block_rows, with the cross products summed in float64,
+    so memory stays at one block whatever the number of rows. Columns without
+    variance correlate as NaN.
+    """
+    X = np.asarray(X, dtype=np.float32)
+    n, k = X.shape
+    mean = X.mean(axis=0, dtype=np.float64).astype(np.float32)
+    cross = np.zeros((k, k))
+    for start in range(0, n, block_rows):
+        block = X[start:start + block_rows] - mean
+        cross += block.T @ block
+    scale = np.sqrt(np.diag(cross))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        corr = cross / np.outer(scale, scale)
+    np.clip(corr, -1.0, 1.0, out=corr)
+    np.fill_diagonal(corr, np.where(scale > 0, 1.0, np.nan))
+    return corr
+
+
+def spearman_matrix(X, block_rows: int = CORRELATION_BLOCK_ROWS) -> np.ndarray:
+    """Spearman rank correlation: Pearson on the column ranks (ties get their average rank)."""
+    ranks = rankdata(np.asarray(X, dtype=np.float32), axis=0).astype(np.float32)
+    return pearson_matrix(ranks, block_rows)
+
+
+def save_correlation_data(run_id: str, X, feature_names, feature_importances: dict,
+                          k: int = CORRELATION_TOP_K, max_rows: int = CORRELATION_MAX_ROWS):
+    """
+    Store a row sample of the top-k important columns of the preprocessed
+    matrix X (array or DataFrame) with the run; the correlations are computed
+    from it when the dashboard asks for them.
+    """
+    names = top_features(feature_importances, k)
+    if len(names) < 2:
+        return
+    positions = {str(name): i for i, name in enumerate(feature_names)}
+    cols = [positions[name] for name in names]
+    rows = sample_rows(len(X), max_rows)
+    if hasattr(X, 'iloc'):
+        sample = X.iloc[rows, cols].to_numpy(dtype=np.float32)
+    else:
+        sample = np.asarray(X)[np.ix_(rows, cols)].astype(np.float32)
+    with open(run_path(run_id, CORRELATION_FILE), 'wb') as f:
+        np.savez(f, feature_names=np.array(names, dtype=str), values=sample, total_rows=np.array(len(X)))
+
+
+def load_correlations(run_id: str):
+    """
+    Pearson and Spearman matrices of a run's top features, or None when the run
+    stored no correlation data.
+    """
+    path = run_path(run_id, CORRELATION_FILE)
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as data:
+        values = data['values']
+        return {
+            'features': data['feature_names'].tolist(),
+            'pearson': pearson_matrix(values),
+            'spearman': spearman_matrix(values),
+            'sampled_rows': int(len(values)),
+            'total_rows': int(data['total_rows'])
+        }
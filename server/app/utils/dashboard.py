@@ -1,18 +1,69 @@
 # app/utils/dashboard.py
-import pandas as pd
+import os
+import json
 import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+import pandas as pd
 from typing import Dict, Any, List
-from io import BytesIO
-import base64
+from fastapi import HTTPException
+
+from app.utils.run_store import run_path, write_atomic
+from app.utils.visualization import lttb_indices, MAX_PLOT_POINTS
+from app.utils.correlation import load_correlations
+
+# Inputs of a training run's dashboard, saved with the run
+SUMMARY_FILE = 'summary.json'
+# Generated sections are cached per run as dashboard/<section>.json
+DASHBOARD_DIR = 'dashboard'
+# Points per scatter/line trace before largest-triangle downsampling kicks in
+DASHBOARD_MAX_POINTS = int(os.getenv("AUTOML_DASHBOARD_MAX_POINTS", str(MAX_PLOT_POINTS)))
+# Equal-count bins of the residual trendline
+RESIDUAL_TREND_BINS = 20
+# Significant digits kept for plotted values
+SPEC_DIGITS = 6
+
+# Plotly's default qualitative palette
+COLOR_PALETTE = ['#636EFA', '#EF553B', '#00CC96', '#AB63FA', '#FFA15A',
+                 '#19D3F3', '#FF6692', '#B6E880', '#FF97FF', '#FECB52']
+
+
+def _values(values) -> list:
+    """Plot values as a JSON list, rounded to SPEC_DIGITS significant digits (NaN as null)."""
+    return [None if v != v else float(f'{v:.{SPEC_DIGITS}g}') for v in np.asarray(values, dtype=float).tolist()]
+
+
+def binned_trend(x, y, bins: int = RESIDUAL_TREND_BINS):
+    """
+    Mean x and mean y of equal-count bins of the points ordered by x: a trend
+    line in one sort, where LOWESS fits a local regression per point.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    bins = min(bins, len(x))
+    if not bins:
+        return np.empty(0), np.empty(0)
+    order = np.argsort(x, kind='stable')
+    starts = np.linspace(0, len(x), bins + 1).astype(int)[:-1]
+    counts = np.diff(np.append(starts, len(x)))
+    return np.add.reduceat(x[order], starts) / counts, np.add.reduceat(y[order], starts) / counts
+
+
+def _downsampled(x, y):
+    """The points sorted by x, reduced to DASHBOARD_MAX_POINTS by largest-triangle downsampling."""
+    order = np.argsort(x, kind='stable')
+    x, y = np.asarray(x)[order], np.asarray(y)[order]
+    keep = lttb_indices(x, y, DASHBOARD_MAX_POINTS)
+    return x[keep], y[keep]
+
 
 class AutoMLDashboard:
-    """Power BI-style interactive dashboard generator"""
-    
+    """
+    Power BI-style interactive dashboard generator. Charts are Plotly figure
+    specs ({'data': [...], 'layout': {...}}) for plotly.js to render, without
+    the default template, with large series downsampled.
+    """
+
     def __init__(self):
-        self.color_palette = px.colors.qualitative.Plotly
+        self.color_palette = COLOR_PALETTE
         self.theme = {
             'bg_color': '#f9f9f9',
             'font_color': '#333',
@@ -21,77 +72,85 @@ class AutoMLDashboard:
 
     def generate_dashboard(self, results: Dict[str, Any]) -> Dict[str, Any]:
         """Generate complete dashboard with multiple visualization components"""
-        dashboard = {
-            'data_quality': self._create_data_quality_section(results),
-            'model_performance': self._create_performance_section(results),
-            'feature_analysis': self._create_feature_analysis_section(results),
-            'predictions_analysis': self._create_predictions_section(results),
-            'model_config': self._create_config_section(results)
-        }
-        
-        # Add raw data for frontend flexibility
-        dashboard['raw_data'] = {
-            'metrics': results.get('metrics', {}),
+        return {name: self.generate_section(name, results) for name in self.SECTIONS}
+
+    def generate_section(self, name: str, results: Dict[str, Any]) -> Dict[str, Any]:
+        if name not in self.BUILDERS:
+            raise ValueError(f"Unknown dashboard section '{name}'")
+        return self.BUILDERS[name](self, results)
+
+    def _create_raw_data_section(self, results: Dict[str, Any]) -> Dict[str, Any]:
+        metrics = {key: value for key, value in results.get('metrics', {}).items() if key not in ('y_test', 'y_pred')}
+        # Raw values, for the frontend to chart as it likes
+        return {
+            'metrics': metrics,
             'feature_names': results.get('feature_names', []),
             'preprocessing_stats': results.get('preprocessing_stats', {})
         }
-        
-        return dashboard
+
+    def _spec(self, data: List[dict], title: str, **layout) -> Dict[str, Any]:
+        """A compact Plotly figure spec."""
+        return {
+            'data': data,
+            'layout': {
+                'title': {'text': title},
+                'paper_bgcolor': self.theme['bg_color'],
+                'plot_bgcolor': self.theme['plot_bgcolor'],
+                'font': {'color': self.theme['font_color']},
+                **layout
+            }
+        }
 
     def _create_data_quality_section(self, results: Dict[str, Any]) -> Dict[str, Any]:
         """Data quality assessment visualizations"""
         stats = results.get('preprocessing_stats', {})
+        initial_rows, initial_cols = stats.get('original_shape', (0, 0))
+        final_rows, final_cols = stats.get('final_shape', (0, 0))
+        feature_types = stats.get('feature_types', {})
         data = {
-            'initial_rows': stats.get('initial_rows', 0),
-            'final_rows': stats.get('final_rows', 0),
+            'initial_rows': initial_rows,
+            'final_rows': final_rows,
             'missing_values': sum(stats.get('missing_values_before', {}).values()),
             'dropped_columns': stats.get('dropped_constant_columns', 0),
-            'numeric_features': stats.get('numeric_features', 0),
-            'categorical_features': stats.get('categorical_features', 0)
+            'numeric_features': feature_types.get('numeric', 0),
+            'categorical_features': feature_types.get('categorical', 0)
         }
-        
+
         # Data Composition Chart
-        fig1 = px.pie(
-            names=['Numeric', 'Categorical'],
-            values=[data['numeric_features'], data['categorical_features']],
-            title='Feature Type Distribution',
-            color_discrete_sequence=self.color_palette[:2]
-        )
-        
+        fig1 = self._spec([{
+            'type': 'pie',
+            'labels': ['Numeric', 'Categorical'],
+            'values': [data['numeric_features'], data['categorical_features']],
+            'marker': {'colors': self.color_palette[:2]}
+        }], 'Feature Type Distribution')
+
         # Data Transformation Timeline
-        transform_df = pd.DataFrame({
-            'Stage': ['Original', 'Processed'],
-            'Columns': [stats.get('initial_cols', 0), stats.get('final_cols', 0)],
-            'Rows': [stats.get('initial_rows', 0), stats.get('final_rows', 0)]
-        })
-        
-        fig2 = px.line(
-            transform_df,
-            x='Stage',
-            y=['Columns', 'Rows'],
-            title='Data Transformation Progress',
-            markers=True
-        )
-        
+        stages = ['Original', 'Processed']
+        fig2 = self._spec([
+            {'type': 'scatter', 'mode': 'lines+markers', 'name': 'Columns', 'x': stages,
+             'y': [initial_cols, final_cols], 'line': {'color': self.color_palette[0]}},
+            {'type': 'scatter', 'mode': 'lines+markers', 'name': 'Rows', 'x': stages,
+             'y': [initial_rows, final_rows], 'line': {'color': self.color_palette[1]}}
+        ], 'Data Transformation Progress', xaxis={'title': {'text': 'Stage'}})
+
         return {
-            'composition_chart': self._fig_to_html(fig1),
-            'transform_chart': self._fig_to_html(fig2),
+            'composition_chart': fig1,
+            'transform_chart': fig2,
             'stats': data
         }
 
-    def _create_performance_section(self, results: Dict[str, Any]) -> Dict[str, Any]:
+    def _create_model_performance_section(self, results: Dict[str, Any]) -> Dict[str, Any]:
         """Model performance metrics visualization"""
         metrics = results.get('metrics', {})
-        
+
         # Performance Metrics Gauge
-        fig = go.Figure()
-        
-        fig.add_trace(go.Indicator(
-            mode="gauge+number+delta",
-            value=metrics.get('r2', 0),
-            domain={'x': [0, 1], 'y': [0, 1]},
-            title={'text': "R² Score"},
-            gauge={
+        fig = self._spec([{
+            'type': 'indicator',
+            'mode': 'gauge+number+delta',
+            'value': _values([metrics.get('r2', 0)])[0],
+            'domain': {'x': [0, 1], 'y': [0, 1]},
+            'title': {'text': "R² Score"},
+            'gauge': {
                 'axis': {'range': [0, 1]},
                 'steps': [
                     {'range': [0, 0.4], 'color': "lightgray"},
@@ -104,32 +163,19 @@ class AutoMLDashboard:
                     'value': 0.7
                 }
             }
-        ))
-        
-        fig.update_layout(title="Model Performance Gauge")
-        
+        }], "Model Performance Gauge")
+
         # Metrics Comparison
-        metrics_df = pd.DataFrame({
-            'Metric': ['RMSE', 'MAE', 'MAPE'],
-            'Value': [
-                metrics.get('rmse', 0),
-                metrics.get('mae', 0),
-                metrics.get('mape', 0)
-            ]
-        })
-        
-        fig2 = px.bar(
-            metrics_df,
-            x='Metric',
-            y='Value',
-            title='Error Metrics Comparison',
-            color='Metric',
-            color_discrete_sequence=self.color_palette[3:6]
-        )
-        
+        names = ['RMSE', 'MAE', 'MAPE']
+        values = _values([metrics.get('rmse', 0), metrics.get('mae', 0), metrics.get('mape', 0)])
+        fig2 = self._spec([
+            {'type': 'bar', 'name': name, 'x': [name], 'y': [value], 'marker': {'color': color}}
+            for name, value, color in zip(names, values, self.color_palette[3:6])
+        ], 'Error Metrics Comparison', xaxis={'title': {'text': 'Metric'}}, yaxis={'title': {'text': 'Value'}})
+
         return {
-            'performance_gauge': self._fig_to_html(fig),
-            'metrics_chart': self._fig_to_html(fig2),
+            'performance_gauge': fig,
+            'metrics_chart': fig2,
             'metrics': {
                 'r2': f"{metrics.get('r2', 0):.4f}",
                 'rmse': f"{metrics.get('rmse', 0):.4f}",
@@ -140,107 +186,100 @@ class AutoMLDashboard:
             }
         }
 
-    def _create_feature_analysis_section(self, results: Dict[str, Any]) -> Dict[str, Any]:
+    def _create_feature_section(self, results: Dict[str, Any]) -> Dict[str, Any]:
         """Feature importance and correlation analysis"""
         feature_importances = results.get('metrics', {}).get('feature_importances', {})
-        
+
         if not feature_importances:
             return {'error': 'No feature importance data available'}
-            
+
         # Feature Importance Bar Chart
         importance_df = pd.DataFrame({
             'Feature': list(feature_importances.keys()),
             'Importance': list(feature_importances.values())
         }).sort_values('Importance', ascending=False).head(20)
-        
-        fig1 = px.bar(
-            importance_df,
-            x='Importance',
-            y='Feature',
-            orientation='h',
-            title='Top 20 Important Features',
-            color='Importance',
-            color_continuous_scale='Bluered'
-        )
-        
-        # Feature Correlation Heatmap (top 10 features)
-        if len(importance_df) >= 10:
-            corr_matrix = pd.DataFrame(
-                np.random.rand(10, 10),
-                columns=importance_df['Feature'].head(10),
-                index=importance_df['Feature'].head(10)
-            )
-            
-            fig2 = px.imshow(
-                corr_matrix,
-                title='Feature Correlation (Top 10 Features)',
-                color_continuous_scale='RdBu',
-                zmin=-1,
-                zmax=1
+
+        fig1 = self._spec([{
+            'type': 'bar',
+            'orientation': 'h',
+            'x': _values(importance_df['Importance']),
+            'y': importance_df['Feature'].tolist(),
+            'marker': {'color': _values(importance_df['Importance']), 'colorscale': 'Bluered', 'showscale': True}
+        }], 'Top 20 Important Features',
+            xaxis={'title': {'text': 'Importance'}}, yaxis={'title': {'text': 'Feature'}, 'autorange': 'reversed'})
+
+        # Feature Correlation Heatmaps of the top features, from the run's sampled preprocessed matrix
+        correlations = results.get('correlations')
+        correlation_chart = rank_correlation_chart = None
+        if correlations:
+            correlation_chart = self._correlation_heatmap(correlations['features'], correlations['pearson'], 'Pearson')
+            rank_correlation_chart = self._correlation_heatmap(
+                correlations['features'], correlations['spearman'], 'Spearman'
             )
-            correlation_chart = self._fig_to_html(fig2)
-        else:
-            correlation_chart = None
-        
+
         return {
-            'importance_chart': self._fig_to_html(fig1),
+            'importance_chart': fig1,
             'correlation_chart': correlation_chart,
+            'rank_correlation_chart': rank_correlation_chart,
+            'correlation_rows': {
+                'sampled': correlations['sampled_rows'], 'total': correlations['total_rows']
+            } if correlations else None,
             'top_features': importance_df.to_dict('records')
         }
 
+    def _correlation_heatmap(self, features: List[str], matrix, method: str) -> Dict[str, Any]:
+        return self._spec([{
+            'type': 'heatmap',
+            'z': [_values(row) for row in matrix],
+            'x': features,
+            'y': features,
+            'colorscale': 'RdBu',
+            'zmin': -1,
+            'zmax': 1
+        }], f'{method} Correlation (Top {len(features)} Features)', yaxis={'autorange': 'reversed'})
+
     def _create_predictions_section(self, results: Dict[str, Any]) -> Dict[str, Any]:
         """Prediction analysis visualizations"""
-        y_test = np.array(results.get('metrics', {}).get('y_test', []))
-        y_pred = np.array(results.get('metrics', {}).get('y_pred', []))
-        
+        y_test = np.asarray(results.get('metrics', {}).get('y_test', []), dtype=float)
+        y_pred = np.asarray(results.get('metrics', {}).get('y_pred', []), dtype=float)
+
         if len(y_test) == 0 or len(y_pred) == 0:
             return {'error': 'No prediction data available'}
-        
-        # Actual vs Predicted Values
-        fig1 = go.Figure()
-        fig1.add_trace(go.Scatter(
-            x=y_test,
-            y=y_pred,
-            mode='markers',
-            name='Predictions',
-            marker=dict(color=self.color_palette[0])
-        ))
-        
-        # Perfect prediction line
-        min_val = min(min(y_test), min(y_pred))
-        max_val = max(max(y_test), max(y_pred))
-        fig1.add_trace(go.Scatter(
-            x=[min_val, max_val],
-            y=[min_val, max_val],
-            mode='lines',
-            name='Perfect Prediction',
-            line=dict(color='red', dash='dash')
-        ))
-        
-        fig1.update_layout(
-            title='Actual vs Predicted Values',
-            xaxis_title='Actual Values',
-            yaxis_title='Predicted Values'
-        )
-        
-        # Residuals Analysis
+
+        # Actual vs Predicted Values, downsampled above the point cap
+        actual, predicted = _downsampled(y_test, y_pred)
+        min_val = float(min(y_test.min(), y_pred.min()))
+        max_val = float(max(y_test.max(), y_pred.max()))
+        fig1 = self._spec([
+            {'type': 'scattergl', 'mode': 'markers', 'name': 'Predictions',
+             'x': _values(actual), 'y': _values(predicted), 'marker': {'color': self.color_palette[0]}},
+            # Perfect prediction line
+            {'type': 'scatter', 'mode': 'lines', 'name': 'Perfect Prediction',
+             'x': [min_val, max_val], 'y': [min_val, max_val], 'line': {'color': 'red', 'dash': 'dash'}}
+        ], 'Actual vs Predicted Values',
+            xaxis={'title': {'text': 'Actual Values'}}, yaxis={'title': {'text': 'Predicted Values'}})
+
+        # Residuals Analysis; the trend is binned over every point, not just the plotted ones
         residuals = y_test - y_pred
-        fig2 = px.scatter(
-            x=y_pred,
-            y=residuals,
-            title='Residual Analysis',
-            labels={'x': 'Predicted Values', 'y': 'Residuals'},
-            trendline='lowess',
-            color_discrete_sequence=[self.color_palette[1]]
-        )
-        fig2.add_hline(y=0, line_dash="dash", line_color="red")
-        
+        trend_x, trend_y = binned_trend(y_pred, residuals)
+        fitted, shown = _downsampled(y_pred, residuals)
+        fig2 = self._spec([
+            {'type': 'scattergl', 'mode': 'markers', 'name': 'Residuals',
+             'x': _values(fitted), 'y': _values(shown), 'marker': {'color': self.color_palette[1]}},
+            {'type': 'scatter', 'mode': 'lines', 'name': 'Binned Mean',
+             'x': _values(trend_x), 'y': _values(trend_y), 'line': {'color': self.color_palette[2]}}
+        ], 'Residual Analysis',
+            xaxis={'title': {'text': 'Predicted Values'}}, yaxis={'title': {'text': 'Residuals'}},
+            shapes=[{'type': 'line', 'xref': 'paper', 'x0': 0, 'x1': 1, 'y0': 0, 'y1': 0,
+                     'line': {'color': 'red', 'dash': 'dash'}}])
+
         return {
-            'predictions_chart': self._fig_to_html(fig1),
-            'residuals_chart': self._fig_to_html(fig2)
+            'predictions_chart': fig1,
+            'residuals_chart': fig2,
+            'points': {'total': int(len(y_test)), 'plotted': int(len(actual))}
         }
 
-    def _create_config_section(self, results: Dict[str, Any]) -> Dict[str, Any]:
+    def _create_model_config_section(self, results: Dict[str, Any]) -> Dict[str, Any]:
         """Model configuration details"""
         stats = results.get('preprocessing_stats', {})
         return {
@@ -253,11 +292,80 @@ class AutoMLDashboard:
             'features_used': len(results.get('feature_names', []))
         }
 
-    def _fig_to_html(self, fig) -> str:
-        """Convert Plotly figure to HTML for web embedding"""
-        return fig.to_html(full_html=False, include_plotlyjs='cdn')
+    # Dashboard sections, in order, and the method building each
+    BUILDERS = {
+        'data_quality': _create_data_quality_section,
+        'model_performance': _create_model_performance_section,
+        'feature_analysis': _create_feature_section,
+        'predictions_analysis': _create_predictions_section,
+        'model_config': _create_model_config_section,
+        'raw_data': _create_raw_data_section
+    }
+    SECTIONS = tuple(BUILDERS)
+
+
+def save_run_summary(run_id: str, metrics: dict, preprocessing_stats: dict, original_shape,
+                     model_type: str, scaler_type: str, feature_names, missing: str, encoding: str):
+    """
+    Persist the part of a training run's results its dashboard is built from;
+    y_test and y_pred are read from the run's plot data.
+    """
+    summary = {
+        'metrics': metrics,
+        'preprocessing_stats': {
+            **preprocessing_stats,
+            'original_shape': list(original_shape),
+            'missing_strategy': missing,
+            'encoding_strategy': encoding
+        },
+        'model_type': model_type,
+        'scaler_type': scaler_type,
+        'feature_names': list(feature_names)
+    }
+    write_atomic(run_path(run_id, SUMMARY_FILE), json.dumps(summary, default=str).encode('utf-8'))
+
+
+def load_run_results(run_id: str) -> Dict[str, Any]:
+    """The results dict AutoMLDashboard expects, from a run's summary, plot and correlation data."""
+    path = run_path(run_id, SUMMARY_FILE)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="This run has no dashboard")
+    with open(path) as f:
+        results = json.load(f)
+    with np.load(run_path(run_id, 'plot_data.npz'), allow_pickle=False) as data:
+        results['metrics']['y_test'] = data['y_test']
+        results['metrics']['y_pred'] = data['y_pred']
+    results['correlations'] = load_correlations(run_id)
+    return results
+
+
+def run_dashboard_section(run_id: str, name: str, results: Dict[str, Any] = None) -> bytes:
+    """
+    JSON of one section of a run's dashboard. It is generated on first request
+    and cached in the run, so reopening a dashboard only reads files; results
+    (loaded when not given) is only needed on a cache miss.
+    """
+    if name not in AutoMLDashboard.SECTIONS:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown dashboard section '{name}'. Available sections: {list(AutoMLDashboard.SECTIONS)}"
+        )
+    path = run_path(run_id, DASHBOARD_DIR, f'{name}.json')
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            return f.read()
+    section = AutoMLDashboard().generate_section(name, results or load_run_results(run_id))
+    data = json.dumps(section, separators=(',', ':')).encode('utf-8')
+    write_atomic(path, data)
+    return data
+
 
-    def _fig_to_base64(self, fig) -> str:
-        """Convert Plotly figure to base64 encoded image"""
-        img_bytes = fig.to_image(format="png", width=800, height=600)
-        return base64.b64encode(img_bytes).decode('utf-8')
\ No newline at end of file
+def run_dashboard(run_id: str) -> bytes:
+    """JSON of a run's whole dashboard, keyed by section, with the run's results loaded at most once."""
+    results = None
+    parts = []
+    for name in AutoMLDashboard.SECTIONS:
+        if results is None and not os.path.exists(run_path(run_id, DASHBOARD_DIR, f'{name}.json')):
+            results = load_run_results(run_id)
+        parts.append(b'"' + name.encode('utf-8') + b'":' + run_dashboard_section(run_id, name, results))
+    return b'{' + b','.join(parts) + b'}'
@@ -0,0 +1,132 @@
+# app/utils/dataset_cache.py
+import os
+import json
+import uuid
+import fcntl
+import hashlib
+import threading
+import tempfile
+import pandas as pd
+
+CACHE_DIR = os.getenv("AUTOML_CACHE_DIR", os.path.join(tempfile.gettempdir(), "automl_cache"))
+# Total size of cached entries before least recently used ones are evicted; 0 disables the cache
+CACHE_MAX_MB = float(os.getenv("AUTOML_CACHE_MAX_MB", "1024"))
+# Bumped whenever the cached metadata layout changes, so stale entries are never read
+CACHE_FORMAT_VERSION = 4
+# Hit/miss counters shared by every worker process using the cache directory
+STATS_FILE = 'stats.json'
+
+
+class DatasetCache:
+    """
+    Content-addressed on-disk cache of preprocessed datasets.
+    Entries are Feather (Arrow IPC) files plus a JSON metadata sidecar, evicted in LRU order.
+    """
+
+    def __init__(self, directory: str = CACHE_DIR, max_mb: float = CACHE_MAX_MB):
+        self.directory = directory
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @staticmethod
+    def make_key(upload_hash: str, **params) -> str:
+        """Combine the upload digest with the preprocessing parameters."""
+        payload = json.dumps({'version': CACHE_FORMAT_VERSION, 'upload': upload_hash, 'params': params}, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _paths(self, key: str):
+        base = os.path.join(self.directory, key)
+        return base + '.feather', base + '.json'
+
+    def get(self, key: str):
+        """Return (df, metadata) for a cached entry or None on a miss."""
+        if not self.enabled:
+            return None
+
+        data_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            df = pd.read_feather(data_path)
+            # Touch the entry so eviction sees it as recently used
+            os.utime(data_path)
+        except (OSError, ValueError):
+            self._count('misses')
+            return None
+
+        self._count('hits')
+        return df, meta
+
+    def _count(self, field: str = None) -> dict:
+        """
+        Increment a counter in the stats file (under an exclusive file lock, as
+        job workers are separate processes) and return the counters.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock, open(os.path.join(self.directory, STATS_FILE), 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0)
+            try:
+                stats = json.loads(f.read() or '{}')
+            except ValueError:
+                stats = {}
+            stats = {'hits': int(stats.get('hits', 0)), 'misses': int(stats.get('misses', 0))}
+            if field is not None:
+                stats[field] += 1
+                f.seek(0)
+                f.truncate()
+                json.dump(stats, f)
+                f.flush()
+            return stats
+
+    def put(self, key: str, df: pd.DataFrame, meta: dict):
+        if not self.enabled:
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        data_path, meta_path = self._paths(key)
+        tmp_suffix = f".{uuid.uuid4().hex}.tmp"
+
+        # Write to temporary names and rename, so concurrent workers never read partial entries
+        df.reset_index(drop=True).to_feather(data_path + tmp_suffix)
+        with open(meta_path + tmp_suffix, 'w') as f:
+            json.dump(meta, f)
+        os.replace(meta_path + tmp_suffix, meta_path)
+        os.replace(data_path + tmp_suffix, data_path)
+
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.feather'):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name[:-len('.feather')]))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, key in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            for path in self._paths(key):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= size
+
+    def info(self, hit: bool) -> dict:
+        """This request's outcome with the hit/miss totals across all workers."""
+        if not self.enabled:
+            return {'hit': hit, 'hits': 0, 'misses': 0}
+        return {'hit': hit, **self._count()}
+
+
+dataset_cache = DatasetCache()
@@ -0,0 +1,334 @@
+# app/utils/dataset_store.py
+import os
+import re
+import json
+import time
+import uuid
+import fcntl
+import shutil
+import hashlib
+import tempfile
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+
+from app.utils.export import to_arrow_table, EXPORT_BATCH_ROWS
+from app.utils.ingestion import read_csv_file, input_suffix, input_format, ColumnarFile
+from app.utils.instrumentation import StageTimer
+from app.utils.run_store import write_atomic
+
+DATASETS_DIR = os.getenv("AUTOML_DATASETS_DIR", os.path.join(tempfile.gettempdir(), "automl_datasets"))
+# Least recently used datasets (and abandoned uploads) are removed past this many
+MAX_DATASETS = int(os.getenv("AUTOML_MAX_DATASETS", "50"))
+# Largest chunk accepted by one PATCH of a resumable upload
+MAX_UPLOAD_CHUNK_BYTES = int(os.getenv("AUTOML_MAX_UPLOAD_CHUNK_BYTES", str(64 * 1024 * 1024)))
+# Uploads untouched for this long are abandoned and may be evicted; active ones never are
+UPLOAD_EXPIRY_SECONDS = float(os.getenv("AUTOML_UPLOAD_EXPIRY_HOURS", "24")) * 3600
+
+# Uncompressed Arrow IPC, so readers memory-map it and only touch the columns they use
+DATA_FILE = 'data.feather'
+META_FILE = 'dataset.json'
+# The upload is kept under its own extension (upload.csv, upload.parquet, ...)
+UPLOAD_FILE = 'upload'
+# Held (flock) while a chunk is appended or the upload completed, across processes
+UPLOAD_LOCK_FILE = 'upload.lock'
+HASH_CHUNK_BYTES = 1024 * 1024
+# Request body bytes gathered before each write to the upload file
+WRITE_BUFFER_BYTES = 1024 * 1024
+
+# A dataset is uploading until its upload is completed, then processing until the
+# CSV has been converted, after which it is ready (or failed)
+UPLOADING, PROCESSING, READY, FAILED = 'uploading', 'processing', 'ready', 'failed'
+
+_DATASET_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+
+def _dataset_dir(dataset_id: str) -> str:
+    if not _DATASET_ID_RE.match(dataset_id or ''):
+        raise HTTPException(status_code=404, detail=f"Dataset {dataset_id} not found")
+    base = os.path.join(DATASETS_DIR, dataset_id)
+    if not os.path.isdir(base):
+        raise HTTPException(status_code=404, detail=f"Dataset {dataset_id} not found")
+    return base
+
+
+def _write_meta(dataset_id: str, meta: dict):
+    write_atomic(os.path.join(DATASETS_DIR, dataset_id, META_FILE), json.dumps(meta).encode('utf-8'))
+
+
+def _create(meta: dict) -> str:
+    dataset_id = uuid.uuid4().hex
+    os.makedirs(os.path.join(DATASETS_DIR, dataset_id))
+    _write_meta(dataset_id, {'dataset_id': dataset_id, 'created_at': time.time(), **meta})
+    _evict_old_datasets()
+    return dataset_id
+
+
+def get_dataset(dataset_id: str) -> dict:
+    """
+    Metadata of a dataset. While it is uploading, 'offset' is the number of
+    bytes received so far, which is where an interrupted upload resumes.
+    """
+    base = _dataset_dir(dataset_id)
+    try:
+        with open(os.path.join(base, META_FILE)) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        raise HTTPException(status_code=404, detail=f"Dataset {dataset_id} not found")
+    if meta['status'] == UPLOADING:
+        meta['offset'] = _upload_offset(meta)
+    return meta
+
+
+def _upload_path(meta: dict) -> str:
+    return os.path.join(DATASETS_DIR, meta['dataset_id'], UPLOAD_FILE + input_suffix(meta['name']))
+
+
+def dataset_file(dataset_id: str) -> str:
+    """
+    Path of a ready dataset's Arrow file, for jobs to read from. Marks the
+    dataset as recently used; 409 while it is still uploading or processing.
+    """
+    meta = get_dataset(dataset_id)
+    if meta['status'] != READY:
+        raise HTTPException(
+            status_code=409,
+            detail=meta.get('error') or f"Dataset {dataset_id} is not ready (status: {meta['status']})"
+        )
+    base = _dataset_dir(dataset_id)
+    os.utime(base)
+    return os.path.join(base, DATA_FILE)
+
+
+def content_key(meta: dict) -> str:
+    """Cache key for the preprocessed dataset: the upload's digest, so it matches a direct CSV upload."""
+    return meta.get('sha256') or f"dataset:{meta['dataset_id']}"
+
+
+def create_upload(filename: str, size: int = None) -> str:
+    """Start a resumable upload of a CSV, Parquet or Feather file and return the id the dataset will have."""
+    input_suffix(filename)
+    if size is not None and size <= 0:
+        raise HTTPException(status_code=400, detail="Upload size must be positive")
+    dataset_id = _create({'status': UPLOADING, 'name': filename, 'size': size})
+    open(_upload_path(get_dataset(dataset_id)), 'wb').close()
+    return dataset_id
+
+
+def _upload_offset(meta: dict) -> int:
+    try:
+        return os.path.getsize(_upload_path(meta))
+    except OSError:
+        return 0
+
+
+def _require_uploading(dataset_id: str) -> dict:
+    meta = get_dataset(dataset_id)
+    if meta['status'] != UPLOADING:
+        raise HTTPException(status_code=409, detail=f"Upload of dataset {dataset_id} is already complete")
+    return meta
+
+
+def _lock_upload(dataset_id: str):
+    """
+    Take the upload's lock without waiting and return the open lock file (closing
+    it releases the lock, as does the process exiting). 409 if another request
+    holds it, so two PATCHes with the same offset can't both append.
+    """
+    f = open(os.path.join(_dataset_dir(dataset_id), UPLOAD_LOCK_FILE), 'a')
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        f.close()
+        raise HTTPException(status_code=409, detail=f"Another request is writing to the upload of dataset {dataset_id}")
+    return f
+
+
+def _open_append(dataset_id: str, offset: int):
+    meta = _require_uploading(dataset_id)
+    current = meta['offset']
+    if offset != current:
+        raise HTTPException(status_code=409, detail={"message": "Offset mismatch", "offset": current})
+    return meta, open(_upload_path(meta), 'ab')
+
+
+def _finish_append(out, offset: int, ok: bool):
+    # A failed or interrupted chunk is discarded whole, so the offset stays at a chunk boundary
+    if not ok:
+        out.truncate(offset)
+    out.close()
+    os.utime(os.path.dirname(out.name))
+
+
+async def append_chunk(dataset_id: str, offset: int, chunks, max_bytes: int = MAX_UPLOAD_CHUNK_BYTES) -> int:
+    """
+    Append the byte chunks of one request (at most max_bytes, None for no
+    limit) to an upload, which must start exactly where the received data
+    ends (409 with the current offset otherwise, so the client can resume
+    from there). Returns the new offset.
+    The upload is locked for the whole request, and file I/O runs in the
+    threadpool so the event loop keeps serving other requests.
+    """
+    lock = await run_in_threadpool(_lock_upload, dataset_id)
+    try:
+        meta, out = await run_in_threadpool(_open_append, dataset_id, offset)
+        received = 0
+        buffer = bytearray()
+        ok = False
+        try:
+            async for chunk in chunks:
+                received += len(chunk)
+                too_long = meta['size'] is not None and offset + received > meta['size']
+                if too_long or (max_bytes and received > max_bytes):
+                    raise HTTPException(
+                        status_code=413,
+                        detail="Chunk exceeds the declared upload size" if too_long else
+                        f"Chunks are limited to {max_bytes} bytes"
+                    )
+                buffer += chunk
+                if len(buffer) >= WRITE_BUFFER_BYTES:
+                    await run_in_threadpool(out.write, bytes(buffer))
+                    buffer.clear()
+            if buffer:
+                await run_in_threadpool(out.write, bytes(buffer))
+            ok = True
+        finally:
+            # Not awaited: this must also run when the request is cancelled
+            _finish_append(out, offset, ok)
+    finally:
+        lock.close()
+    return offset + received
+
+
+def complete_upload(dataset_id: str) -> dict:
+    """Close an upload for conversion; the returned metadata is marked as processing."""
+    lock = _lock_upload(dataset_id)
+    try:
+        meta = _require_uploading(dataset_id)
+        offset = meta.pop('offset')
+        if meta['size'] is not None and offset != meta['size']:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Upload is incomplete: received {offset} of {meta['size']} bytes"
+            )
+        if not offset:
+            raise HTTPException(status_code=400, detail="Upload is empty")
+        meta.update({'status': PROCESSING, 'size': offset})
+        _write_meta(dataset_id, meta)
+        return meta
+    finally:
+        lock.close()
+
+
+def reopen_upload(dataset_id: str):
+    """Undo complete_upload when the conversion job could not be queued."""
+    meta = get_dataset(dataset_id)
+    meta['status'] = UPLOADING
+    _write_meta(dataset_id, meta)
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(HASH_CHUNK_BYTES):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _store(dataset_id: str, data, meta: dict, timer: StageTimer) -> dict:
+    base = os.path.join(DATASETS_DIR, dataset_id)
+    with timer.stage('store'):
+        tmp_path = os.path.join(base, f"{DATA_FILE}.{uuid.uuid4().hex}.tmp")
+        if isinstance(data, pq.ParquetFile):
+            # Copied batch by batch, for datasets too large to hold as one table
+            schema, rows = data.schema_arrow, data.metadata.num_rows
+            with pa.ipc.new_file(tmp_path, schema) as writer:
+                for batch in data.iter_batches(batch_size=EXPORT_BATCH_ROWS):
+                    writer.write_batch(batch)
+        else:
+            table = data if isinstance(data, pa.Table) else to_arrow_table(data)
+            schema, rows = table.schema, table.num_rows
+            feather.write_feather(table, tmp_path, compression='uncompressed', chunksize=EXPORT_BATCH_ROWS)
+        os.replace(tmp_path, os.path.join(base, DATA_FILE))
+    meta.update({
+        'status': READY,
+        'rows': rows,
+        'columns': [{'name': field.name, 'type': str(field.type)} for field in schema],
+        'stored_bytes': os.path.getsize(os.path.join(base, DATA_FILE))
+    })
+    _write_meta(dataset_id, meta)
+    return meta
+
+
+def ingest_upload(dataset_id: str) -> dict:
+    """
+    Job entry point: parse a completed upload once and store it as Arrow
+    (Parquet and Feather uploads are converted without going through pandas).
+    The raw upload is removed afterwards; a parse error marks the dataset as failed.
+    """
+    timer = StageTimer()
+    meta = get_dataset(dataset_id)
+    upload_path = _upload_path(meta)
+    try:
+        with timer.stage('hash'):
+            meta['sha256'] = _file_digest(upload_path)
+        try:
+            with timer.stage('parse'):
+                if input_format(upload_path) == 'csv':
+                    data = read_csv_file(upload_path)
+                else:
+                    data = ColumnarFile(upload_path).read()
+        except pd.errors.EmptyDataError:
+            raise HTTPException(status_code=400, detail="The CSV file appears to be empty or corrupt")
+        except pd.errors.ParserError as e:
+            raise HTTPException(status_code=400, detail=f"Could not parse the CSV file: {str(e)}")
+        meta = _store(dataset_id, data, meta, timer)
+    except HTTPException as he:
+        _write_meta(dataset_id, {**meta, 'status': FAILED, 'error': he.detail})
+        raise
+    except Exception as e:
+        _write_meta(dataset_id, {**meta, 'status': FAILED, 'error': str(e)})
+        raise
+    finally:
+        try:
+            os.remove(upload_path)
+        except OSError:
+            pass
+    return {**meta, 'timings': timer.to_dict()}
+
+
+def register_dataset(data, name: str, source: dict = None) -> str:
+    """
+    Store a DataFrame, Arrow table or Parquet file (e.g. a cleaner's output)
+    as a new ready dataset and return its id.
+    """
+    dataset_id = _create({'status': PROCESSING, 'name': name, 'source': source})
+    _store(dataset_id, data, get_dataset(dataset_id), StageTimer())
+    return dataset_id
+
+
+def _evictable(entry: os.DirEntry) -> bool:
+    # Uploads in progress and datasets being converted are kept, unless abandoned
+    try:
+        with open(os.path.join(entry.path, META_FILE)) as f:
+            status = json.load(f)['status']
+    except (OSError, ValueError, KeyError):
+        return True
+    if status in (UPLOADING, PROCESSING):
+        return time.time() - entry.stat().st_mtime > UPLOAD_EXPIRY_SECONDS
+    return True
+
+
+def _evict_old_datasets():
+    try:
+        datasets = [entry for entry in os.scandir(DATASETS_DIR) if entry.is_dir()]
+    except OSError:
+        return
+    if len(datasets) <= MAX_DATASETS:
+        return
+    datasets = sorted((entry for entry in datasets if _evictable(entry)), key=lambda entry: entry.stat().st_mtime)
+    for entry in datasets[:len(datasets) - MAX_DATASETS]:
+        shutil.rmtree(entry.path, ignore_errors=True)
@@ -0,0 +1,162 @@
+# app/utils/export.py
+import io
+import os
+import uuid
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+from fastapi import HTTPException
+
+# Cleaned datasets are stored once as Parquet and converted while they stream
+CLEANED_FILE = 'cleaned.parquet'
+# Rows per Parquet row group, and per chunk of a streamed download
+EXPORT_BATCH_ROWS = int(os.getenv("AUTOML_EXPORT_BATCH_ROWS", "65536"))
+# Chunk size when a stored file is streamed as is
+FILE_CHUNK_BYTES = 1024 * 1024
+
+EXPORT_MEDIA_TYPES = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+    'arrow': 'application/vnd.apache.arrow.stream'
+}
+_ACCEPT_FORMATS = {
+    'text/csv': 'csv',
+    'application/vnd.apache.parquet': 'parquet',
+    'application/x-parquet': 'parquet',
+    'application/vnd.apache.arrow.stream': 'arrow',
+    'application/vnd.apache.arrow.file': 'arrow'
+}
+DEFAULT_EXPORT_FORMAT = 'csv'
+
+
+def negotiate_format(requested: str = None, accept: str = None) -> str:
+    """
+    Pick the export format from an explicit format name, falling back to the
+    Accept header (in the client's order of preference) and then to CSV.
+    """
+    if requested:
+        fmt = requested.lower()
+        if fmt not in EXPORT_MEDIA_TYPES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unsupported format '{requested}'. Choose from: {', '.join(EXPORT_MEDIA_TYPES)}"
+            )
+        return fmt
+    if not accept:
+        return DEFAULT_EXPORT_FORMAT
+
+    ranges = []
+    for position, part in enumerate(accept.split(',')):
+        media_type, *params = [p.strip() for p in part.split(';')]
+        quality = 1.0
+        for param in params:
+            if param.startswith('q='):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        ranges.append((-quality, position, media_type.lower()))
+
+    for neg_quality, _, media_type in sorted(ranges):
+        if neg_quality == 0:
+            break
+        if media_type in _ACCEPT_FORMATS:
+            return _ACCEPT_FORMATS[media_type]
+        if media_type in ('*/*', 'application/*', 'text/*'):
+            return DEFAULT_EXPORT_FORMAT
+    raise HTTPException(
+        status_code=406,
+        detail=f"None of the accepted types can be produced. Available: {', '.join(EXPORT_MEDIA_TYPES.values())}"
+    )
+
+
+def to_arrow_table(df: pd.DataFrame) -> pa.Table:
+    """Convert df to an Arrow table, without its index."""
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Object columns mixing numbers and strings (e.g. after filling with "missing")
+        mixed = df.select_dtypes(include='object').columns
+        return pa.Table.from_pandas(df.astype({col: 'string' for col in mixed}), preserve_index=False)
+
+
+def write_parquet(df, path: str):
+    """
+    Write df (a DataFrame or Arrow table) to path atomically, in row groups of
+    EXPORT_BATCH_ROWS so it can be streamed back in batches.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    table = df if isinstance(df, pa.Table) else to_arrow_table(df)
+    pq.write_table(table, tmp_path, row_group_size=EXPORT_BATCH_ROWS)
+    os.replace(tmp_path, path)
+
+
+def write_parquet_tables(schema: pa.Schema, tables, path: str):
+    """
+    Write tables produced one at a time (slices of a dataset too large to
+    build whole) to path atomically, each in row groups of at most EXPORT_BATCH_ROWS.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with pq.ParquetWriter(tmp_path, schema) as writer:
+        for table in tables:
+            writer.write_table(table, row_group_size=EXPORT_BATCH_ROWS)
+    os.replace(tmp_path, path)
+
+
+def _drain(sink: io.BytesIO) -> bytes:
+    data = sink.getvalue()
+    sink.seek(0)
+    sink.truncate()
+    return data
+
+
+def _iter_file(path: str):
+    with open(path, 'rb') as f:
+        while chunk := f.read(FILE_CHUNK_BYTES):
+            yield chunk
+
+
+def _iter_csv(parquet: pq.ParquetFile):
+    sink = io.BytesIO()
+    header = True
+    for batch in parquet.iter_batches(batch_size=EXPORT_BATCH_ROWS):
+        # Categorical columns are stored dictionary-encoded; the CSV writer needs plain values
+        batch = pa.Table.from_batches([batch]).cast(_decoded_schema(batch.schema))
+        pa_csv.write_csv(batch, sink, write_options=pa_csv.WriteOptions(include_header=header))
+        header = False
+        yield _drain(sink)
+    if header:
+        pa_csv.write_csv(_decoded_schema(parquet.schema_arrow).empty_table(), sink)
+        yield _drain(sink)
+
+
+def _iter_arrow(parquet: pq.ParquetFile):
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, parquet.schema_arrow) as writer:
+        for batch in parquet.iter_batches(batch_size=EXPORT_BATCH_ROWS):
+            writer.write_batch(batch)
+            yield _drain(sink)
+    yield _drain(sink)
+
+
+def _decoded_schema(schema: pa.Schema) -> pa.Schema:
+    return pa.schema([
+        field.with_type(field.type.value_type) if pa.types.is_dictionary(field.type) else field
+        for field in schema
+    ])
+
+
+def iter_export(path: str, fmt: str):
+    """
+    Stream a stored Parquet file as CSV, Parquet or Arrow IPC, one record batch
+    at a time, so the whole dataset is never materialized as one payload.
+    """
+    if fmt == 'parquet':
+        return _iter_file(path)
+    parquet = pq.ParquetFile(path)
+    if fmt == 'arrow':
+        return _iter_arrow(parquet)
+    return _iter_csv(parquet)
@@ -0,0 +1,310 @@
+# app/utils/ingestion.py
+import os
+import hashlib
+import tempfile
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+from pandas.api.types import union_categoricals
+from fastapi import UploadFile, HTTPException
+
+# Size of each read from the multipart body while spooling to disk
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# Rows parsed per chunk and optional cap (in MB) on the parsed DataFrame; 0 disables the cap
+CSV_CHUNK_ROWS = int(os.getenv("AUTOML_CSV_CHUNK_ROWS", "100000"))
+MAX_DATASET_MEMORY_MB = float(os.getenv("AUTOML_MAX_DATASET_MEMORY_MB", "0"))
+
+# String columns with at most this ratio of distinct values to rows become 'category'
+CATEGORY_MAX_RATIO = float(os.getenv("AUTOML_CATEGORY_MAX_RATIO", "0.5"))
+FLOAT32_MAX = float(np.finfo(np.float32).max)
+
+# Accepted input files by extension. Parquet and Feather/Arrow IPC files (which
+# include the stored datasets, see dataset_store) are memory-mapped and read by column
+INPUT_FORMATS = {'.csv': 'csv', '.parquet': 'parquet', '.pq': 'parquet',
+                 '.feather': 'arrow', '.arrow': 'arrow', '.ipc': 'arrow'}
+
+
+def input_suffix(filename: str, default: str = None) -> str:
+    """
+    The extension input files named filename are spooled under. Unknown
+    extensions get default, or a 400 when there is none.
+    """
+    suffix = os.path.splitext(filename or '')[1].lower()
+    if suffix in INPUT_FORMATS:
+        return suffix
+    if default is not None:
+        return default
+    raise HTTPException(status_code=400, detail="Only CSV, Parquet and Feather/Arrow files are supported")
+
+
+def input_format(path: str) -> str:
+    return INPUT_FORMATS.get(os.path.splitext(path)[1].lower(), 'csv')
+
+
+async def spool_upload(file: UploadFile, suffix: str = ".csv"):
+    """
+    Stream the uploaded file to a temporary file on disk.
+    Returns (path, sha256 hex digest of the contents); the caller is responsible for removing the file.
+    """
+    fd, path = tempfile.mkstemp(prefix="automl_upload_", suffix=suffix)
+    digest = hashlib.sha256()
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+    except Exception:
+        os.remove(path)
+        raise
+    return path, digest.hexdigest()
+
+
+async def read_prefix(file: UploadFile, max_bytes: int):
+    """
+    Read at most max_bytes from the start of the upload, cut back to the last
+    complete line. Returns (data, truncated), truncated telling whether the
+    upload continues past the prefix.
+    """
+    data = await file.read(max_bytes)
+    truncated = bool(await file.read(1))
+    if truncated:
+        end = data.rfind(b"\n")
+        if end < 0:
+            raise HTTPException(status_code=400, detail=f"No complete line within the first {max_bytes} bytes")
+        data = data[:end + 1]
+    return data, truncated
+
+
+def optimize_dtypes(df: pd.DataFrame, categorical: bool = True) -> pd.DataFrame:
+    """
+    Downcast numeric columns to the smallest width that holds their values (floats
+    to float32, which tree models convert to anyway) and turn low-cardinality
+    string columns into the 'category' dtype.
+    """
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_bool_dtype(series):
+            continue
+        if pd.api.types.is_integer_dtype(series):
+            df[col] = pd.to_numeric(series, downcast='integer')
+        elif pd.api.types.is_float_dtype(series) and series.dtype != np.float32:
+            if np.nan_to_num(series.abs().max(), nan=0.0) <= FLOAT32_MAX:
+                df[col] = series.astype(np.float32)
+        elif categorical and series.dtype == object:
+            if series.nunique() <= CATEGORY_MAX_RATIO * len(series):
+                df[col] = series.astype('category')
+    return df
+
+
+def _concat_chunks(chunks: list) -> pd.DataFrame:
+    """
+    Concatenate parsed chunks column by column. Categorical columns are merged
+    with union_categoricals, since pd.concat would fall back to object dtype when
+    the chunks saw different categories.
+    """
+    columns = {}
+    for col in chunks[0].columns:
+        parts = [chunk[col] for chunk in chunks]
+        if all(isinstance(part.dtype, pd.CategoricalDtype) for part in parts):
+            columns[col] = pd.Series(union_categoricals(parts, sort_categories=True), name=col)
+        else:
+            columns[col] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(columns)
+
+
+def _rebatch(batches, chunk_rows: int):
+    """Regroup record batches into tables of exactly chunk_rows rows (the last one may be shorter)."""
+    pending, pending_rows = [], 0
+    for batch in batches:
+        pending.append(batch)
+        pending_rows += batch.num_rows
+        while pending_rows >= chunk_rows:
+            table = pa.Table.from_batches(pending)
+            yield table.slice(0, chunk_rows)
+            rest = table.slice(chunk_rows)
+            pending, pending_rows = rest.to_batches(), rest.num_rows
+    if pending_rows:
+        yield pa.Table.from_batches(pending)
+
+
+class ColumnarFile:
+    """
+    A Parquet or Arrow IPC (Feather v2) file, memory-mapped. Columns are read
+    on their own, and rows are converted to pandas one slice at a time, so
+    columns that are not asked for are never decoded.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.format = input_format(path)
+        try:
+            if self.format == 'parquet':
+                self._parquet = pq.ParquetFile(path, memory_map=True)
+                self.schema = self._parquet.schema_arrow
+                self.num_rows = self._parquet.metadata.num_rows
+            else:
+                self._ipc = pa.ipc.open_file(pa.memory_map(path))
+                self.schema = self._ipc.schema
+                self.num_rows = self._ipc.count_rows()
+        except (pa.ArrowInvalid, OSError) as e:
+            raise HTTPException(status_code=400, detail=f"Could not read the {self.format} file: {str(e)}")
+        # A non-range pandas index is stored as extra columns; it is not data
+        index_columns = (self.schema.pandas_metadata or {}).get('index_columns', [])
+        self.columns = [name for name in self.schema.names if name not in index_columns]
+
+    def _project(self, columns) -> list:
+        if columns is None:
+            return self.columns
+        missing = [col for col in columns if col not in self.columns]
+        if missing:
+            raise HTTPException(status_code=400, detail=f"Columns not found in the dataset: {missing}")
+        # File order, like read_csv's usecols
+        wanted = set(columns)
+        return [col for col in self.columns if col in wanted]
+
+    def read(self, columns: list = None) -> pa.Table:
+        columns = self._project(columns)
+        if self.format == 'parquet':
+            return self._parquet.read(columns=columns)
+        return feather.read_table(self.path, columns=columns, memory_map=True)
+
+    def column(self, name: str) -> pa.ChunkedArray:
+        return self.read([name]).column(0)
+
+    def varies(self, name: str) -> bool:
+        """
+        True when Parquet row-group statistics alone show the column holds two
+        different values; False when they can't tell (and always for Arrow files).
+        """
+        if self.format != 'parquet':
+            return False
+        index = self._parquet.schema_arrow.get_field_index(name)
+        metadata = self._parquet.metadata
+        seen = None
+        for i in range(metadata.num_row_groups):
+            stats = metadata.row_group(i).column(index).statistics
+            if stats is None or not stats.has_min_max:
+                continue
+            if stats.min != stats.max or (seen is not None and stats.min != seen):
+                return True
+            seen = stats.min
+        return False
+
+    def iter_frames(self, chunk_rows: int, columns: list = None):
+        """DataFrames of chunk_rows rows; Parquet row groups are streamed, never read whole."""
+        columns = self._project(columns)
+        if self.format == 'parquet':
+            batches = self._parquet.iter_batches(batch_size=chunk_rows, columns=columns)
+        else:
+            batches = self.read(columns).to_batches()
+        empty = True
+        for table in _rebatch(batches, chunk_rows):
+            empty = False
+            yield table_to_pandas(table)
+        if empty:
+            yield table_to_pandas(self.schema.empty_table().select(columns))
+
+    def head(self, max_bytes: int) -> pa.Table:
+        """
+        The leading row groups (Parquet) or record batches (Arrow) that fit in
+        max_bytes, at least one; the rest of the file is not read.
+        """
+        if self.format == 'parquet':
+            metadata = self._parquet.metadata
+            groups, size = [], 0
+            for i in range(metadata.num_row_groups):
+                size += metadata.row_group(i).total_byte_size
+                if groups and size > max_bytes:
+                    break
+                groups.append(i)
+            if not groups:
+                return self.schema.empty_table().select(self.columns)
+            return self._parquet.read_row_groups(groups, columns=self.columns)
+        batches, size = [], 0
+        for i in range(self._ipc.num_record_batches):
+            batch = self._ipc.get_batch(i)
+            size += batch.nbytes
+            if batches and size > max_bytes:
+                break
+            batches.append(batch)
+        return pa.Table.from_batches(batches, schema=self.schema).select(self.columns)
+
+
+def table_to_pandas(table: pa.Table) -> pd.DataFrame:
+    # Pandas metadata is ignored so columns stored as 'string' come back as object, like read_csv
+    return table.to_pandas(ignore_metadata=True)
+
+
+def iter_chunks(path: str, chunk_rows: int, columns: list = None):
+    """DataFrames of up to chunk_rows rows from a CSV, Parquet or Arrow file."""
+    if input_format(path) != 'csv':
+        return ColumnarFile(path).iter_frames(chunk_rows, columns)
+    return pd.read_csv(path, chunksize=chunk_rows, usecols=columns)
+
+
+def _collect_chunks(chunks, limit_mb: float, optimize: bool, categorical: bool, report: dict) -> pd.DataFrame:
+    limit_bytes = limit_mb * 1024 * 1024 if limit_mb else None
+    collected = []
+    used_bytes = 0
+    raw_bytes = 0
+    for chunk in chunks:
+        if optimize:
+            raw_bytes += int(chunk.memory_usage(deep=True).sum())
+            chunk = optimize_dtypes(chunk, categorical)
+        used_bytes += int(chunk.memory_usage(deep=True).sum())
+        if limit_bytes and used_bytes > limit_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Dataset exceeds the memory limit of {limit_mb:g} MB"
+            )
+        collected.append(chunk)
+
+    if optimize and report is not None:
+        report.update({
+            'memory_before_bytes': raw_bytes,
+            'memory_after_bytes': used_bytes,
+            'memory_saved_bytes': raw_bytes - used_bytes
+        })
+
+    if len(collected) == 1:
+        return collected[0]
+    return _concat_chunks(collected)
+
+
+def read_csv_file(path: str, memory_limit_mb: float = None, chunk_rows: int = CSV_CHUNK_ROWS,
+                  optimize: bool = False, categorical: bool = True, report: dict = None) -> pd.DataFrame:
+    """
+    Parse a CSV file in bounded chunks, enforcing an optional memory cap on the result.
+    With optimize, each chunk goes through optimize_dtypes as soon as it is parsed;
+    if a report dict is given, the memory before/after optimization is recorded in it.
+    """
+    limit_mb = MAX_DATASET_MEMORY_MB if memory_limit_mb is None else memory_limit_mb
+    with pd.read_csv(path, chunksize=chunk_rows) as reader:
+        return _collect_chunks(reader, limit_mb, optimize, categorical, report)
+
+
+def read_dataset(path: str, columns: list = None, memory_limit_mb: float = None, chunk_rows: int = CSV_CHUNK_ROWS,
+                 optimize: bool = False, categorical: bool = True, report: dict = None) -> pd.DataFrame:
+    """
+    read_csv_file for a CSV, Parquet or Arrow file (a spooled upload or a
+    stored dataset), optionally restricted to the given columns (400 when one
+    is missing). Parquet and Arrow files are memory-mapped and converted slice
+    by slice, so columns that are not requested are never read from disk.
+    """
+    limit_mb = MAX_DATASET_MEMORY_MB if memory_limit_mb is None else memory_limit_mb
+    if input_format(path) != 'csv':
+        chunks = ColumnarFile(path).iter_frames(chunk_rows, columns)
+        return _collect_chunks(chunks, limit_mb, optimize, categorical, report)
+    if columns is not None:
+        header = pd.read_csv(path, nrows=0).columns
+        missing = [col for col in columns if col not in header]
+        if missing:
+            raise HTTPException(status_code=400, detail=f"Columns not found in the dataset: {missing}")
+    with pd.read_csv(path, chunksize=chunk_rows, usecols=columns) as reader:
+        return _collect_chunks(reader, limit_mb, optimize, categorical, report)
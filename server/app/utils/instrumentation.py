@@ -0,0 +1,202 @@
+# app/utils/instrumentation.py
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+# Stage peaks come from the kernel's resettable RSS high-water mark (Linux only);
+# set to 0 to record wall and CPU time only
+TRACK_STAGE_MEMORY = os.getenv("AUTOML_TRACK_STAGE_MEMORY", "1") == "1"
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+BYTES_BUCKETS = tuple(float(2 ** p) for p in range(20, 36, 2))  # 1 MiB .. 16 GiB
+MB = 1024 * 1024
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+_memory_supported = TRACK_STAGE_MEMORY and os.path.exists('/proc/self/clear_refs')
+
+
+def _current_rss() -> int:
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * _PAGE_SIZE
+
+
+def _peak_rss() -> int:
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def _reset_peak_rss():
+    # Writing 5 to clear_refs resets VmHWM to the current RSS
+    with open('/proc/self/clear_refs', 'w') as f:
+        f.write('5')
+
+
+class StageTimer:
+    """
+    Records wall time, CPU time and peak memory of named pipeline stages.
+
+    Peak memory is the process RSS high-water mark while the stage ran
+    (peak_rss_mb) and how far it rose above the RSS at stage start
+    (peak_alloc_mb). The mark is per process: under the thread job executor,
+    concurrent jobs share (and reset) it, so peaks are approximate there.
+    CPU time is process CPU, so it includes BLAS and joblib threads.
+    A stage entered twice (e.g. once per model) accumulates into one entry.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self._started = time.perf_counter()
+        self._open_peaks = []
+
+    def _observe_peak(self):
+        """Fold the high-water mark so far into every open stage, then reset it."""
+        global _memory_supported
+        if not _memory_supported or not self._open_peaks:
+            return
+        try:
+            peak = _peak_rss()
+            for frame in self._open_peaks:
+                frame[0] = max(frame[0], peak)
+            _reset_peak_rss()
+        except OSError:
+            _memory_supported = False
+
+    @contextmanager
+    def stage(self, name: str):
+        frame = [0]
+        rss_before = None
+        if _memory_supported:
+            try:
+                self._observe_peak()
+                rss_before = _current_rss()
+                _reset_peak_rss()
+            except OSError:
+                rss_before = None
+        self._open_peaks.append(frame)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            self._observe_peak()
+            self._open_peaks.remove(frame)
+            peak = frame[0] if rss_before is not None and _memory_supported else None
+            self._record(name, wall, cpu, peak, rss_before)
+
+    def _record(self, name, wall, cpu, peak, rss_before):
+        entry = self.stages.setdefault(name, {
+            'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'peak_rss_mb': None, 'peak_alloc_mb': None, 'calls': 0
+        })
+        entry['wall_seconds'] += wall
+        entry['cpu_seconds'] += cpu
+        entry['calls'] += 1
+        if peak is not None:
+            alloc = max(peak - rss_before, 0) / MB
+            entry['peak_rss_mb'] = max(entry['peak_rss_mb'] or 0.0, peak / MB)
+            entry['peak_alloc_mb'] = max(entry['peak_alloc_mb'] or 0.0, alloc)
+
+    def to_dict(self) -> dict:
+        """The `timings` block of a response."""
+        return {
+            'total_seconds': time.perf_counter() - self._started,
+            'stages': {
+                name: {key: round(value, 6) if isinstance(value, float) else value for key, value in entry.items()}
+                for name, entry in self.stages.items()
+            }
+        }
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus text exposition format."""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple, buckets: tuple):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['counts'][i] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                labels = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key))
+                sep = ',' if labels else ''
+                for bound, count in zip(self.buckets, series['counts']):
+                    lines.append(f'{self.name}_bucket{{{labels}{sep}le="{float(bound)!r}"}} {count}')
+                lines.append(f'{self.name}_bucket{{{labels}{sep}le="+Inf"}} {series["count"]}')
+                lines.append(f'{self.name}_sum{{{labels}}} {series["sum"]:.6f}')
+                lines.append(f'{self.name}_count{{{labels}}} {series["count"]}')
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class MetricsRegistry:
+    """
+    Process-wide histograms served by GET /metrics. Jobs run in worker
+    processes, so their stage timings are folded in by the API process from
+    the `timings` block of each finished job's result.
+    """
+
+    def __init__(self):
+        self.stage_wall = Histogram(
+            'automl_stage_wall_seconds', 'Wall time of a pipeline stage.', ('kind', 'stage'), SECONDS_BUCKETS)
+        self.stage_cpu = Histogram(
+            'automl_stage_cpu_seconds', 'Process CPU time of a pipeline stage.', ('kind', 'stage'), SECONDS_BUCKETS)
+        self.stage_alloc = Histogram(
+            'automl_stage_peak_alloc_bytes', 'Peak RSS growth during a pipeline stage.', ('kind', 'stage'),
+            BYTES_BUCKETS)
+        self.job_duration = Histogram(
+            'automl_job_duration_seconds', 'Time from job submission to completion.', ('kind', 'status'),
+            SECONDS_BUCKETS)
+
+    def observe_timings(self, kind: str, timings: dict):
+        for stage, entry in timings.get('stages', {}).items():
+            self.observe_stage(kind, stage, entry)
+
+    def observe_stage(self, kind: str, stage: str, entry: dict):
+        self.stage_wall.observe(entry['wall_seconds'], kind=kind, stage=stage)
+        self.stage_cpu.observe(entry['cpu_seconds'], kind=kind, stage=stage)
+        if entry.get('peak_alloc_mb') is not None:
+            self.stage_alloc.observe(entry['peak_alloc_mb'] * MB, kind=kind, stage=stage)
+
+    def observe_job(self, kind: str, status: str, seconds: float):
+        self.job_duration.observe(seconds, kind=kind, status=status)
+
+    def render(self) -> str:
+        lines = []
+        for histogram in (self.stage_wall, self.stage_cpu, self.stage_alloc, self.job_duration):
+            lines.extend(histogram.render())
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
+
+
+@contextmanager
+def observe_stage(kind: str, stage: str):
+    """Time a single stage that runs in the API process straight into the histograms."""
+    timer = StageTimer()
+    with timer.stage(stage):
+        yield
+    metrics.observe_stage(kind, stage, timer.stages[stage])
@@ -0,0 +1,82 @@
+# app/utils/pipeline.py
+import os
+import joblib
+import numpy as np
+import pandas as pd
+from functools import lru_cache
+from fastapi import HTTPException
+from app.utils.run_store import run_path
+
+PIPELINE_FILE = 'pipeline.joblib'
+
+
+class FittedPipeline:
+    """
+    Everything train_model_service learned while preprocessing and fitting,
+    so new data can be scored exactly the way the training data was.
+    """
+
+    def __init__(self, missing_strategy: str, fill_values: dict, dropped_columns: list,
+                 encoding: str, categories: dict, feature_names: list, target: str,
+                 scaler, model):
+        self.missing_strategy = missing_strategy
+        self.fill_values = fill_values
+        self.dropped_columns = dropped_columns
+        self.encoding = encoding
+        self.categories = categories
+        self.feature_names = list(feature_names)
+        self.target = target
+        self.scaler = scaler
+        self.model = model
+
+    def missing_features(self, columns) -> list:
+        return [col for col in self.feature_names if col not in set(columns)]
+
+    def transform(self, df: pd.DataFrame):
+        """
+        Apply the training preprocessing to a batch of raw rows.
+        Features are the original numeric columns, so the categorical encoding
+        (kept in self.categories for reference) does not change them.
+        Returns (X, valid_mask); rows still missing values after filling are not scored.
+        """
+        X = df[self.feature_names]
+        fills = {col: value for col, value in self.fill_values.items() if col in self.feature_names}
+        if fills:
+            X = X.fillna(fills)
+        X = X.apply(pd.to_numeric, errors='coerce')
+
+        valid = X.notna().all(axis=1).to_numpy()
+        if not valid.all():
+            X = X[valid]
+        # Same container the first fitted step saw: sklearn sets feature_names_in_
+        # when fitted on a DataFrame (in-memory training) and not on arrays
+        # (incremental training), and warns on a mismatch
+        first_step = self.scaler if self.scaler is not None else self.model
+        if not hasattr(first_step, 'feature_names_in_'):
+            X = X.to_numpy()
+        if self.scaler is not None:
+            X = self.scaler.transform(X)
+        return X, valid
+
+    def predict(self, df: pd.DataFrame) -> np.ndarray:
+        predictions = np.full(len(df), np.nan)
+        X, valid = self.transform(df)
+        if valid.any():
+            predictions[valid] = self.model.predict(X)
+        return predictions
+
+    def save(self, run_id: str):
+        # Uncompressed so the numpy arrays inside the model can be memory-mapped on load
+        joblib.dump(self, run_path(run_id, PIPELINE_FILE))
+
+
+@lru_cache(maxsize=8)
+def load_pipeline(run_id: str) -> FittedPipeline:
+    """
+    Load a run's pipeline with its arrays memory-mapped, so the pages are shared
+    between workers through the OS page cache instead of copied per process.
+    """
+    path = run_path(run_id, PIPELINE_FILE)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail=f"Run {run_id} has no saved pipeline")
+    return joblib.load(path, mmap_mode='r')
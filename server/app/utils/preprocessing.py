@@ -1,90 +1,199 @@
 import pandas as pd
 import numpy as np
 from sklearn.preprocessing import StandardScaler, MinMaxScaler, RobustScaler, LabelEncoder
+from app.utils.profiling import (
+    DataProfile, profile_dataframe, arrow_column_stats, arrow_column_kind, HIGH_CARDINALITY_THRESHOLD
+)
 
-# Global cache to track original numeric columns
-original_numeric_columns = []
+# String columns may arrive as 'category' when ingestion optimizes dtypes
+TEXT_DTYPES = ['object', 'category']
 
-def drop_constant(df: pd.DataFrame) -> pd.DataFrame:
-    return df.loc[:, df.apply(pd.Series.nunique) > 1]
+class PreprocessingContext:
+    """
+    Per-request preprocessing state: the parameters and everything learned while
+    fitting them. Each training request owns one, so concurrent requests in the
+    same process never share feature lists or fill values.
+    """
+
+    def __init__(self, missing: str, encoding: str):
+        self.missing = missing
+        self.encoding = encoding
+        self.fill_values = {}
+        self.dropped_columns = []
+        self.categories = {}
+        self.original_numeric_columns = []
+        self.target = None
+
+    def to_dict(self) -> dict:
+        return dict(vars(self))
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PreprocessingContext":
+        context = cls(data['missing'], data['encoding'])
+        vars(context).update(data)
+        return context
 
-def drop_high_cardinality(df: pd.DataFrame, threshold: int = 50) -> pd.DataFrame:
-    for col in df.select_dtypes(include='object').columns:
-        if df[col].nunique() > threshold:
+def drop_constant(df: pd.DataFrame, profile: DataProfile = None) -> pd.DataFrame:
+    # Without a profile, stop counting distinct values at two
+    profile = profile or profile_dataframe(df, limit=1)
+    return df.loc[:, [not profile[col].is_constant for col in df.columns]]
+
+def drop_high_cardinality(df: pd.DataFrame, threshold: int = HIGH_CARDINALITY_THRESHOLD,
+                          profile: DataProfile = None) -> pd.DataFrame:
+    text_cols = df.select_dtypes(include=TEXT_DTYPES).columns
+    if profile is None or profile.limit < threshold:
+        profile = profile_dataframe(df[text_cols], limit=threshold)
+    for col in text_cols:
+        if profile[col].exceeds(threshold):
             df.drop(columns=[col], inplace=True)
     return df
 
-def handle_missing(df: pd.DataFrame, strategy: str, text_placeholder: str = "missing") -> pd.DataFrame:
+def skippable_columns(columnar, missing: str, threshold: int = HIGH_CARDINALITY_THRESHOLD) -> dict:
+    """
+    Columns of a ColumnarFile that drop_constant or drop_high_cardinality
+    would remove whatever the other columns hold, so training need not read
+    them: constant columns without gaps and, unless the "drop" strategy lets
+    gaps elsewhere remove rows, columns without any values and string columns
+    over the threshold. Returns their stats by name.
+    """
+    skipped = {}
+    for col in columnar.columns:
+        # Varying columns can only be skipped for their cardinality, which needs the values
+        if columnar.varies(col) and (missing == "drop" or arrow_column_kind(columnar.schema.field(col).type) != 'text'):
+            continue
+        stats = arrow_column_stats(columnar.column(col), threshold)
+        empty = stats.values is not None and not stats.values
+        if stats.is_constant and (not stats.null_count or (empty and missing != "drop")):
+            skipped[col] = stats
+        elif missing != "drop" and stats.kind == 'text' and stats.exceeds(threshold):
+            skipped[col] = stats
+    return skipped
+
+def compute_fill_values(df: pd.DataFrame, strategy: str, text_placeholder: str = "missing") -> dict:
+    """
+    Per-column values handle_missing fills gaps with. Empty for the "drop" strategy.
+    """
     valid_strategies = ["drop", "mean", "median", "mode", "zero"]
     if strategy not in valid_strategies:
         raise ValueError(f"Invalid strategy. Expected one of: {valid_strategies}")
     
-    df = df.copy()
-    
     if strategy == "drop":
-        return df.dropna()
+        return {}
+    
+    fill_values = {}
     
     # Handle numeric columns
-    numeric_cols = df.select_dtypes(include=np.number).columns
-    for col in numeric_cols:
+    for col in df.select_dtypes(include=np.number).columns:
         if strategy == "mean":
-            df[col].fillna(df[col].mean(), inplace=True)
+            value = df[col].mean()
         elif strategy == "median":
-            df[col].fillna(df[col].median(), inplace=True)
+            value = df[col].median()
         elif strategy == "mode":
-            df[col].fillna(df[col].mode()[0], inplace=True)
-        elif strategy == "zero":
-            df[col].fillna(0, inplace=True)
+            value = df[col].mode()[0]
+        else:
+            value = 0
+        fill_values[col] = value.item() if hasattr(value, 'item') else value
     
     # Handle text/object columns
-    text_cols = df.select_dtypes(include='object').columns
-    for col in text_cols:
+    for col in df.select_dtypes(include=TEXT_DTYPES).columns:
         if strategy == "mode":
-            df[col].fillna(df[col].mode()[0], inplace=True)
+            fill_values[col] = df[col].mode()[0]
         else:
-            df[col].fillna(text_placeholder, inplace=True)
+            fill_values[col] = text_placeholder
     
-    return df
+    return fill_values
+
+def handle_missing(df: pd.DataFrame, strategy: str, text_placeholder: str = "missing",
+                   fill_values: dict = None) -> pd.DataFrame:
+    valid_strategies = ["drop", "mean", "median", "mode", "zero"]
+    if strategy not in valid_strategies:
+        raise ValueError(f"Invalid strategy. Expected one of: {valid_strategies}")
+    
+    if strategy == "drop":
+        return df.dropna()
+    
+    if fill_values is None:
+        fill_values = compute_fill_values(df, strategy, text_placeholder)
+    # Categorical columns reject fill values outside their categories even when
+    # nothing needs filling, so only columns with gaps are filled
+    fill_values = {col: value for col, value in fill_values.items() if col in df.columns and df[col].hasnans}
+    df = add_fill_categories(df, fill_values)
+    return df.fillna(fill_values)
+
+def add_fill_categories(df: pd.DataFrame, fill_values: dict) -> pd.DataFrame:
+    """
+    Categorical columns can only be filled with existing categories, so add any
+    fill value (e.g. the "missing" placeholder) that isn't one yet.
+    """
+    updates = {}
+    for col in df.select_dtypes(include='category').columns:
+        value = fill_values.get(col)
+        if value is not None and value not in df[col].cat.categories and df[col].isna().any():
+            updates[col] = df[col].cat.add_categories([value])
+    return df.assign(**updates) if updates else df
 
 def encode_categorical(df: pd.DataFrame, method: str) -> pd.DataFrame:
     if method == "label":
-        for col in df.select_dtypes(include='object').columns:
+        for col in df.select_dtypes(include=TEXT_DTYPES).columns:
             df[col] = LabelEncoder().fit_transform(df[col])
     elif method == "onehot":
+        # Unused categories would otherwise become all-zero dummy columns
+        for col in df.select_dtypes(include='category').columns:
+            df[col] = df[col].cat.remove_unused_categories()
         df = pd.get_dummies(df, drop_first=True)
     return df
 
-def track_original_numeric(df: pd.DataFrame):
+def get_categories(df: pd.DataFrame, profile: DataProfile = None) -> dict:
+    """
+    Sorted distinct values of each object column, i.e. the classes encode_categorical sees.
+    Taken from profile when it holds them (columns kept by drop_high_cardinality always do).
+    """
+    categories = {}
+    for col in df.select_dtypes(include=TEXT_DTYPES).columns:
+        values = profile[col].values if profile is not None and col in profile.columns else None
+        if values is None:
+            values = df[col].dropna().unique().tolist()
+        categories[col] = sorted(set(map(str, values)))
+    return categories
+
+def track_original_numeric(df: pd.DataFrame, context: PreprocessingContext):
     """
     Call this before any encoding to record original numeric columns.
     """
-    global original_numeric_columns
-    original_numeric_columns = df.select_dtypes(include=np.number).columns.tolist()
+    context.original_numeric_columns = df.select_dtypes(include=np.number).columns.tolist()
 
-def get_tracked_numeric_cols():
+def get_tracked_numeric_cols(context: PreprocessingContext):
     """
     Returns the numeric columns as tracked before encoding.
     """
-    return original_numeric_columns
+    return context.original_numeric_columns
 
-def split_features_target(df: pd.DataFrame):
-    global original_numeric_columns
-
-    target = df.columns[-1]  # Assume last column is target
+def split_features_target(df: pd.DataFrame, context: PreprocessingContext):
+    # Assume last column (after encoding) is target; recorded for the fitted pipeline
+    target = context.target = df.columns[-1]
 
     # Remove target if in numeric columns (to avoid including it in X)
-    features = [col for col in original_numeric_columns if col != target]
+    features = [col for col in context.original_numeric_columns if col != target]
 
     X = df[features]
     y = df[target]
 
     return X, y, X.columns
 
-def scale_features(X, scaler: str):
+def make_scaler(scaler: str):
     if scaler == "standard":
-        return StandardScaler().fit_transform(X)
+        return StandardScaler()
     if scaler == "minmax":
-        return MinMaxScaler().fit_transform(X)
+        return MinMaxScaler()
     if scaler == "robust":
-        return RobustScaler().fit_transform(X)
-    return X
+        return RobustScaler()
+    return None
+
+def scale_features(X, scaler: str):
+    """
+    Returns the scaled features and the fitted scaler (None when no scaling is applied).
+    """
+    fitted = make_scaler(scaler)
+    if fitted is None:
+        return X, None
+    return fitted.fit_transform(X), fitted
@@ -0,0 +1,144 @@
+# app/utils/profiling.py
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# String columns with more distinct values than this are dropped by drop_high_cardinality
+HIGH_CARDINALITY_THRESHOLD = 50
+
+# Distinct values are collected block by block so high-cardinality columns stop
+# after the first few thousand rows; blocks double in size up to the maximum
+FIRST_BLOCK_ROWS = 1024
+MAX_BLOCK_ROWS = 65536
+
+
+def column_kind(series: pd.Series) -> str:
+    """'numeric' (what select_dtypes(np.number) picks), 'text' (object/category) or 'other'."""
+    dtype = series.dtype
+    if pd.api.types.is_bool_dtype(dtype):
+        return 'other'
+    if pd.api.types.is_numeric_dtype(dtype):
+        return 'numeric'
+    if dtype == object or isinstance(dtype, pd.CategoricalDtype):
+        return 'text'
+    return 'other'
+
+
+def distinct_values(series: pd.Series, limit: int):
+    """
+    The set of distinct non-null values of series, or None as soon as there are
+    more than limit of them.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Count codes instead of hashing values; -1 (missing) lands in slot 0
+        codes = series.cat.codes.to_numpy().astype(np.intp) + 1
+        used = np.flatnonzero(np.bincount(codes, minlength=len(series.cat.categories) + 1)[1:])
+        if len(used) > limit:
+            return None
+        return set(series.cat.categories[used].tolist())
+
+    seen = set()
+    start, block = 0, FIRST_BLOCK_ROWS
+    while start < len(series):
+        uniques = series.iloc[start:start + block].unique()
+        seen.update(uniques[~pd.isna(uniques)].tolist())
+        if len(seen) > limit:
+            return None
+        start += block
+        block = min(block * 2, MAX_BLOCK_ROWS)
+    return seen
+
+
+def arrow_distinct_values(column: pa.ChunkedArray, limit: int):
+    """distinct_values for an Arrow column; NaN counts as missing, as in pandas."""
+    floating = pa.types.is_floating(column.type)
+    seen = set()
+    start, block = 0, FIRST_BLOCK_ROWS
+    while start < len(column):
+        uniques = pc.unique(column.slice(start, block)).drop_null()
+        if floating:
+            uniques = uniques.filter(pc.invert(pc.is_nan(uniques)))
+        if isinstance(uniques, pa.DictionaryArray):
+            uniques = uniques.dictionary_decode()
+        seen.update(uniques.to_pylist())
+        if len(seen) > limit:
+            return None
+        start += block
+        block = min(block * 2, MAX_BLOCK_ROWS)
+    return seen
+
+
+def arrow_column_stats(column: pa.ChunkedArray, limit: int) -> 'ColumnStats':
+    """
+    ColumnStats of an Arrow column as profile_dataframe would report them for
+    the column read into pandas, without converting it.
+    """
+    null_count = column.null_count
+    if pa.types.is_floating(column.type):
+        null_count += pc.sum(pc.is_nan(column)).as_py() or 0
+    return ColumnStats(arrow_column_kind(column.type), int(null_count), arrow_distinct_values(column, limit))
+
+
+def arrow_column_kind(data_type: pa.DataType) -> str:
+    """column_kind of a column of this Arrow type once converted to pandas."""
+    return column_kind(pa.chunked_array([], type=data_type).to_pandas())
+
+
+class ColumnStats:
+    def __init__(self, kind: str, null_count: int, values):
+        self.kind = kind
+        self.null_count = null_count
+        # Distinct non-null values, None when there are more than the profile's limit
+        self.values = values
+
+    @property
+    def is_constant(self) -> bool:
+        return self.values is not None and len(self.values) <= 1
+
+    def exceeds(self, threshold: int) -> bool:
+        return self.values is None or len(self.values) > threshold
+
+
+class DataProfile:
+    """
+    Per-column null count, kind and (capped) distinct values gathered in one
+    pass, shared by load_preprocessed's missing-value stats, drop_constant,
+    drop_high_cardinality, get_categories and the dashboard's feature types.
+    """
+
+    def __init__(self, columns: dict, limit: int):
+        self.columns = columns
+        self.limit = limit
+
+    def __getitem__(self, col) -> ColumnStats:
+        return self.columns[col]
+
+    def null_counts(self, columns=None) -> dict:
+        return {col: self.columns[col].null_count for col in (self.columns if columns is None else columns)}
+
+    def count(self, kind: str, columns=None) -> int:
+        return sum(1 for col in (self.columns if columns is None else columns) if self.columns[col].kind == kind)
+
+    def apply_fill(self, fill_values: dict):
+        """
+        Update the profile for handle_missing having filled the gaps with fill_values,
+        which can add the fill value as a new distinct value.
+        """
+        for col, value in fill_values.items():
+            stats = self.columns.get(col)
+            if stats is None or not stats.null_count or pd.isna(value):
+                continue
+            stats.null_count = 0
+            if stats.values is not None:
+                stats.values.add(value)
+                if len(stats.values) > self.limit:
+                    stats.values = None
+
+
+def profile_dataframe(df: pd.DataFrame, limit: int = HIGH_CARDINALITY_THRESHOLD) -> DataProfile:
+    """Profile every column of df, tracking distinct values up to limit."""
+    return DataProfile({
+        col: ColumnStats(column_kind(df[col]), int(df[col].isna().sum()), distinct_values(df[col], limit))
+        for col in df.columns
+    }, limit)
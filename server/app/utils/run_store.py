@@ -0,0 +1,58 @@
+# app/utils/run_store.py
+import os
+import re
+import uuid
+import shutil
+import tempfile
+from fastapi import HTTPException
+
+RUNS_DIR = os.getenv("AUTOML_RUNS_DIR", os.path.join(tempfile.gettempdir(), "automl_runs"))
+# Oldest runs are removed once more than this many are stored
+MAX_RUNS = int(os.getenv("AUTOML_MAX_RUNS", "200"))
+
+_RUN_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+
+def create_run() -> str:
+    """
+    Create a directory for a new training run and return its id.
+    """
+    run_id = uuid.uuid4().hex
+    os.makedirs(os.path.join(RUNS_DIR, run_id))
+    _evict_old_runs()
+    return run_id
+
+
+def run_path(run_id: str, *parts) -> str:
+    """
+    Path inside an existing run directory. Raises 404 for unknown or malformed ids.
+    """
+    if not _RUN_ID_RE.match(run_id):
+        raise HTTPException(status_code=404, detail=f"Run {run_id} not found")
+    base = os.path.join(RUNS_DIR, run_id)
+    if not os.path.isdir(base):
+        raise HTTPException(status_code=404, detail=f"Run {run_id} not found")
+    return os.path.join(base, *parts)
+
+
+def write_atomic(path: str, data: bytes):
+    """
+    Write bytes via a temporary file and rename, so concurrent readers never see partial files.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _evict_old_runs():
+    try:
+        runs = [entry for entry in os.scandir(RUNS_DIR) if entry.is_dir()]
+    except OSError:
+        return
+    if len(runs) <= MAX_RUNS:
+        return
+    runs.sort(key=lambda entry: entry.stat().st_mtime)
+    for entry in runs[:len(runs) - MAX_RUNS]:
+        shutil.rmtree(entry.path, ignore_errors=True)
@@ -1,38 +1,118 @@
 import io
-import base64
-import matplotlib.pyplot as plt
-
-def get_visualization_plot(model, columns, model_name: str) -> str:
-    plt.figure(figsize=(8, 6))
-    if hasattr(model, 'feature_importances_'):
-        plt.barh(columns, model.feature_importances_)
-        plt.xlabel('Importance')
-        plt.title('Feature Importance')
-    elif hasattr(model, 'coef_'):
-        plt.barh(columns, model.coef_)
-        plt.xlabel('Coefficient Value')
-        plt.title('Linear Regression Coefficients')
-    else:
-        return None
-    buf = io.BytesIO()
-    plt.tight_layout()
-    plt.savefig(buf, format='png')
-    plt.close()
-    buf.seek(0)
-    return base64.b64encode(buf.read()).decode('utf-8')
-
-def get_prediction_plot(y_true, y_pred) -> str:
-    plt.figure(figsize=(8, 5))
-    y_vals = y_true.values if hasattr(y_true, 'values') else y_true
-    plt.plot(y_vals, label='Actual', marker='o')
-    plt.plot(y_pred, label='Predicted', marker='x')
-    plt.title('Actual vs Predicted')
-    plt.xlabel('Sample')
-    plt.ylabel('Value')
-    plt.legend()
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+# Each renderer builds its own Agg Figure instead of using the global pyplot
+# state machine, so plots can be rendered concurrently from worker threads.
+
+# Caps on what gets drawn; larger inputs are downsampled before plotting
+MAX_PLOT_POINTS = 2000
+MAX_PLOT_FEATURES = 30
+# Markers are only drawn for small series, they dominate render time otherwise
+MARKER_POINT_LIMIT = 200
+
+def _render_png(fig: Figure) -> bytes:
+    FigureCanvasAgg(fig)
     buf = io.BytesIO()
-    plt.tight_layout()
-    plt.savefig(buf, format='png')
-    plt.close()
-    buf.seek(0)
-    return base64.b64encode(buf.read()).decode('utf-8')
\ No newline at end of file
+    fig.tight_layout()
+    fig.savefig(buf, format='png')
+    return buf.getvalue()
+
+def downsample_indices(n: int, max_points: int = MAX_PLOT_POINTS) -> np.ndarray:
+    """
+    Evenly spaced indices covering a series of length n with at most max_points entries.
+    """
+    if n <= max_points:
+        return np.arange(n)
+    return np.unique(np.linspace(0, n - 1, max_points).astype(int))
+
+def lttb_indices(x, y, max_points: int = MAX_PLOT_POINTS) -> np.ndarray:
+    """
+    Largest-triangle-three-buckets: indices of at most max_points points of the
+    series (x ascending) that keep its visual shape, peaks and dips included.
+    The first and last points are always kept; from each bucket in between,
+    the point forming the largest triangle with the previously kept point and
+    the next bucket's mean is picked.
+    """
+    n = len(x)
+    if n <= max_points or max_points < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, max_points - 1).astype(int)
+    keep = np.empty(max_points, dtype=np.intp)
+    keep[0], keep[-1] = 0, n - 1
+    previous = 0
+    for i in range(max_points - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x, next_y = x[end:edges[i + 2]].mean(), y[end:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        area = np.abs((x[previous] - next_x) * (y[start:end] - y[previous])
+                      - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(np.argmax(area))
+        keep[i + 1] = previous
+    return keep
+
+def render_feature_importance_plot(columns, values, kind: str) -> bytes:
+    """
+    Horizontal bar chart of feature importances ('importance'), linear coefficients ('coef')
+    or permutation importances ('permutation').
+    Only the MAX_PLOT_FEATURES largest magnitudes are shown.
+    """
+    columns = np.asarray(columns)
+    values = np.asarray(values, dtype=float)
+    if len(values) > MAX_PLOT_FEATURES:
+        top = np.sort(np.argsort(np.abs(values))[-MAX_PLOT_FEATURES:])
+        columns, values = columns[top], values[top]
+
+    fig = Figure(figsize=(8, 6))
+    ax = fig.add_subplot()
+    ax.barh(columns, values)
+    if kind == 'coef':
+        ax.set_xlabel('Coefficient Value')
+        ax.set_title('Linear Regression Coefficients')
+    elif kind == 'permutation':
+        ax.set_xlabel('Mean R² Drop')
+        ax.set_title('Permutation Importance')
+    else:
+        ax.set_xlabel('Importance')
+        ax.set_title('Feature Importance')
+    return _render_png(fig)
+
+def render_prediction_plot(y_true, y_pred, max_points: int = MAX_PLOT_POINTS) -> bytes:
+    y_true = np.asarray(y_true)
+    y_pred = np.asarray(y_pred)
+    idx = downsample_indices(len(y_true), max_points)
+    marker_true, marker_pred = ('o', 'x') if len(idx) <= MARKER_POINT_LIMIT else (None, None)
+
+    fig = Figure(figsize=(8, 5))
+    ax = fig.add_subplot()
+    ax.plot(idx, y_true[idx], label='Actual', marker=marker_true)
+    ax.plot(idx, y_pred[idx], label='Predicted', marker=marker_pred)
+    title = 'Actual vs Predicted'
+    if len(idx) < len(y_true):
+        title += f' ({len(idx)} of {len(y_true)} samples)'
+    ax.set_title(title)
+    ax.set_xlabel('Sample')
+    ax.set_ylabel('Value')
+    ax.legend()
+    return _render_png(fig)
+
+def render_run_plot(name: str, data) -> bytes:
+    """
+    Render one of a run's plots from its saved plot data, or return None if it isn't available.
+    """
+    if name == 'feature_importance':
+        if len(data['importance_values']) == 0:
+            return None
+        return render_feature_importance_plot(
+            data['feature_names'], data['importance_values'], str(data['importance_kind'])
+        )
+    if name == 'prediction':
+        return render_prediction_plot(data['y_test'], data['y_pred'])
+    return None
+
+PLOT_NAMES = ('feature_importance', 'prediction')
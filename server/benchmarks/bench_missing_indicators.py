@@ -0,0 +1,87 @@
+# benchmarks/bench_missing_indicators.py
+"""
+Compare the per-cell missing-indicator replacement that _handle_missing_values
+used to run against the vectorized AdvancedDataCleaner._normalize_missing_indicators.
+
+Run from the server directory:
+    python -m benchmarks.bench_missing_indicators --rows 1000000 --cols 50
+
+The legacy loop is far too slow for the full frame, so by default it is timed on
+--legacy-rows rows and extrapolated linearly (pass --legacy-rows 0 to time it in full).
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from app.services.adanceCleaning import AdvancedDataCleaner
+
+LEGACY_INDICATORS = ['', 'none', 'na', 'n/a', 'nan', 'null', 'missing', '-',
+                     'we dont have comf', 'null', 'NULL', 'NaN', 'N/A', 'NA',
+                     'missing', 'MISSING', 'None', 'NONE', '?', '.']
+
+
+def make_frame(rows: int, cols: int, seed: int = 0) -> pd.DataFrame:
+    """Half numeric columns, half low-cardinality strings sprinkled with missing indicators."""
+    rng = np.random.default_rng(seed)
+    values = np.array(['red', 'green', 'blue', 'N/A', ' null ', '?', 'MISSING', ''], dtype=object)
+    data = {}
+    for i in range(cols):
+        if i % 2 == 0:
+            data[f'num_{i}'] = rng.normal(size=rows)
+        else:
+            data[f'cat_{i}'] = values[rng.integers(0, len(values), rows)]
+    return pd.DataFrame(data)
+
+
+def legacy_normalize(df: pd.DataFrame) -> pd.DataFrame:
+    for col in df.columns:
+        df[col] = df[col].astype(str)
+        df[col] = df[col].apply(
+            lambda x: np.nan if str(x).strip().lower() in [m.strip().lower() for m in LEGACY_INDICATORS] else x
+        )
+    df.replace(r'^\s*$', np.nan, regex=True, inplace=True)
+    return df
+
+
+def vectorized_normalize(df: pd.DataFrame) -> pd.DataFrame:
+    cleaner = AdvancedDataCleaner(None, {})
+    cleaner.df = df
+    cleaner._normalize_missing_indicators()
+    return cleaner.df
+
+
+def timed(fn, df):
+    start = time.perf_counter()
+    result = fn(df)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--cols', type=int, default=50)
+    parser.add_argument('--legacy-rows', type=int, default=20_000)
+    args = parser.parse_args()
+
+    df = make_frame(args.rows, args.cols)
+    print(f"Frame: {args.rows:,} rows x {args.cols} columns")
+
+    new_time, new_df = timed(vectorized_normalize, df.copy())
+    print(f"vectorized: {new_time:8.2f}s")
+
+    legacy_rows = args.legacy_rows or args.rows
+    legacy_time, legacy_df = timed(legacy_normalize, df.head(legacy_rows).copy())
+    scale = args.rows / legacy_rows
+    label = "legacy" if scale == 1 else f"legacy (timed on {legacy_rows:,} rows, extrapolated)"
+    print(f"{label}: {legacy_time * scale:8.2f}s")
+    print(f"speedup: {legacy_time * scale / new_time:.0f}x")
+
+    # Both paths must flag the same cells as missing
+    sample = new_df.head(legacy_rows)
+    assert (sample.isna().values == legacy_df.isna().values).all(), "missing masks differ"
+    numeric = [c for c in df.columns if c.startswith('num_')]
+    print(f"numeric dtypes preserved: {all(new_df[c].dtype == np.float64 for c in numeric)}")
+
+
+if __name__ == '__main__':
+    main()
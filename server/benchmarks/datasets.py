@@ -0,0 +1,76 @@
+# benchmarks/datasets.py
+"""
+Seeded synthetic datasets for the benchmarks: the same arguments always give
+the same frame, so timings from different commits are comparable.
+"""
+import numpy as np
+import pandas as pd
+
+WORDS = np.array([
+    'data', 'model', 'training', 'running', 'quickly', 'the', 'and', 'value', 'values',
+    'feature', 'features', 'cleaned', 'missing', 'error', 'it', 'is', 'a', 'of', 'N/A',
+    'Hello,', 'world!', 'sales', 'price', 'customer', 'order', 'ordered', 'shipping'
+])
+MISSING_TOKENS = np.array(['', 'NA', 'null', '?', 'missing'], dtype=object)
+
+
+def make_dataset(rows: int = 100_000, numeric: int = 10, categorical: int = 4, text: int = 1,
+                 missing_ratio: float = 0.05, category_levels: int = 12, seed: int = 0) -> pd.DataFrame:
+    """
+    Numeric, categorical and free-text columns plus a constant column, a
+    high-cardinality id column and a numeric target as the last column.
+    missing_ratio of the feature cells are blanked: NaN in numeric columns, a mix
+    of NaN and missing indicators ('NA', '?', ...) in string columns.
+    """
+    rng = np.random.default_rng(seed)
+    data = {}
+    for i in range(numeric):
+        if i % 3 == 2:
+            data[f'num_{i}'] = rng.integers(0, 1000, rows).astype(float)
+        else:
+            # Heavy tails so outlier handling has something to do
+            data[f'num_{i}'] = rng.standard_t(df=4, size=rows) * (i + 1)
+    for i in range(categorical):
+        levels = np.array([f'level_{j}' for j in range(category_levels)], dtype=object)
+        data[f'cat_{i}'] = levels[rng.integers(0, category_levels, rows)]
+    for i in range(text):
+        lengths = rng.integers(1, 12, rows)
+        tokens = rng.choice(WORDS, lengths.sum())
+        data[f'text_{i}'] = [' '.join(t) for t in np.split(tokens, np.cumsum(lengths)[:-1])]
+    data['constant'] = np.ones(rows)
+    data['record_id'] = np.array([f'id_{i}' for i in range(rows)], dtype=object)
+
+    df = pd.DataFrame(data)
+    for col in df.columns:
+        if col in ('constant', 'record_id'):
+            continue
+        mask = rng.random(rows) < missing_ratio
+        if pd.api.types.is_numeric_dtype(df[col]):
+            df.loc[mask, col] = np.nan
+        else:
+            values = df[col].to_numpy(dtype=object)
+            values[mask] = np.where(rng.random(mask.sum()) < 0.5, None, MISSING_TOKENS[rng.integers(0, len(MISSING_TOKENS), mask.sum())])
+            df[col] = values
+
+    numeric_cols = [c for c in df.columns if c.startswith('num_')]
+    df['target'] = df[numeric_cols].fillna(0).to_numpy() @ rng.normal(size=len(numeric_cols)) + rng.normal(size=rows)
+    return df
+
+
+def cleaning_config(df: pd.DataFrame, **overrides) -> dict:
+    """AdvancedDataCleaner preprocessing config covering every column of a make_dataset frame."""
+    config = {
+        'available_columns': list(df.columns),
+        'numeric_columns': [c for c in df.columns if c.startswith('num_')],
+        'categorical_columns': [c for c in df.columns if c.startswith('cat_')],
+        'text_columns': [c for c in df.columns if c.startswith('text_')],
+        'imputation_method': 'median',
+        'outlier_method': 'iqr',
+        'outlier_threshold': 1.5,
+        'scaling_method': 'standard',
+        'encoding_method': 'onehot',
+        'text_vectorization': 'tfidf',
+        'n_components': 3
+    }
+    config.update(overrides)
+    return config
@@ -0,0 +1,61 @@
+# benchmarks/harness.py
+"""
+Measurement helpers: wall time, CPU time and peak Python/numpy allocation of a
+single call, with the input built fresh (and untimed) before every run.
+"""
+import gc
+import time
+import statistics
+import tracemalloc
+
+
+def measure(fn, setup=None, repeat: int = 3) -> dict:
+    """
+    Call fn(*setup()) `repeat` times for timing, then once more under tracemalloc
+    for the peak allocation (tracing slows Python-heavy code, so it is kept out of
+    the timed runs). Returns median/min wall seconds, median CPU seconds and peak MB.
+    """
+    walls, cpus = [], []
+    for _ in range(repeat):
+        args = setup() if setup else ()
+        gc.collect()
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        fn(*args)
+        walls.append(time.perf_counter() - wall_start)
+        cpus.append(time.process_time() - cpu_start)
+
+    args = setup() if setup else ()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'wall_seconds': statistics.median(walls),
+        'wall_seconds_min': min(walls),
+        'cpu_seconds': statistics.median(cpus),
+        'peak_mb': peak / (1024 * 1024),
+        'repeat': repeat
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float, min_seconds: float = 0.01,
+            min_mb: float = 1.0) -> list:
+    """
+    Stages whose median wall time or peak memory grew by more than `threshold`
+    (0.2 = 20%) relative to the baseline. Differences below min_seconds / min_mb
+    are treated as noise. Returns a list of (stage, metric, baseline, current).
+    """
+    regressions = []
+    for stage, result in current.items():
+        before = baseline.get(stage)
+        if before is None:
+            continue
+        for metric, floor in (('wall_seconds', min_seconds), ('peak_mb', min_mb)):
+            old, new = before[metric], result[metric]
+            if new > old * (1 + threshold) and new - old > floor:
+                regressions.append((stage, metric, old, new))
+    return regressions
@@ -0,0 +1,59 @@
+# benchmarks/stress_concurrent_training.py
+"""
+Concurrency stress check for the training service: many trainings on datasets
+with different column sets run on one shared thread pool, and every result must
+report exactly its own dataset's features. With the old module-level
+original_numeric_columns this failed as requests overwrote each other's lists.
+
+Run from the server directory:
+    python -m benchmarks.stress_concurrent_training --jobs 64 --threads 16
+"""
+import os
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from app.services.train_service import train_model_service
+
+
+def write_dataset(directory: str, index: int, rows: int) -> tuple:
+    """Each dataset gets its own number of uniquely named feature columns."""
+    rng = np.random.default_rng(index)
+    features = [f'ds{index}_f{j}' for j in range(2 + index % 5)]
+    df = pd.DataFrame(rng.normal(size=(rows, len(features))), columns=features)
+    df['category'] = rng.choice(['a', 'b', 'c'], rows)
+    df['target'] = df[features].sum(axis=1) + rng.normal(scale=0.1, size=rows)
+    path = os.path.join(directory, f'dataset_{index}.csv')
+    df.to_csv(path, index=False)
+    return path, features
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--jobs', type=int, default=64)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--rows', type=int, default=2000)
+    args = parser.parse_args()
+
+    models = ['LinearRegression', 'DecisionTree', 'RandomForest']
+    encodings = ['label', 'onehot']
+    with tempfile.TemporaryDirectory() as directory:
+        datasets = [write_dataset(directory, i, args.rows) for i in range(args.jobs)]
+
+        def run(i):
+            path, features = datasets[i]
+            result = train_model_service(path, models[i % 3], 'standard', 0.8, 'mean', encodings[i % 2])
+            return features, result['columns']
+
+        with ThreadPoolExecutor(max_workers=args.threads) as pool:
+            outcomes = list(pool.map(run, range(args.jobs)))
+
+    mismatches = [(expected, got) for expected, got in outcomes if expected != got]
+    print(f"{args.jobs} trainings on {args.threads} threads: {len(mismatches)} feature-list mismatches")
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+# benchmarks/suite.py
+"""
+Micro-benchmarks for the preprocessing helpers used by /train and for every
+AdvancedDataCleaner step, on a seeded synthetic dataset.
+
+Run from the server directory:
+    python -m benchmarks.suite --rows 100000 --output bench.json
+    python -m benchmarks.suite --rows 100000 --compare bench.json --threshold 0.2
+
+Each stage reports median/min wall time, CPU time and peak allocation (tracemalloc).
+Cleaner steps run on the output of the steps before them, as in clean_data.
+With --compare the run exits with status 1 if any stage's median wall time or
+peak memory grew by more than --threshold relative to the baseline file.
+"""
+import os
+import re
+import sys
+import json
+import time
+import logging
+import warnings
+import argparse
+import platform
+import tempfile
+import numpy as np
+import pandas as pd
+import sklearn
+
+from app.utils.ingestion import read_csv_file, read_dataset
+from app.utils.preprocessing import (
+    compute_fill_values, handle_missing, drop_constant, drop_high_cardinality,
+    encode_categorical, scale_features
+)
+from app.services.adanceCleaning import AdvancedDataCleaner
+from benchmarks.datasets import make_dataset, cleaning_config
+from benchmarks.harness import measure, compare
+
+
+def preprocessing_stages(df: pd.DataFrame, paths: dict) -> dict:
+    """
+    The helpers load_preprocessed chains, each fed the previous helper's output,
+    plus reading df back from the CSV, Parquet and Feather files in paths.
+    """
+    csv_path = paths['csv']
+    filled = handle_missing(df.copy(), 'mean')
+    reduced = drop_high_cardinality(drop_constant(filled.copy()))
+    numeric = reduced.select_dtypes(include=np.number).drop(columns=['target'])
+    return {
+        'read_csv_file': (lambda: read_csv_file(csv_path), None),
+        'read_csv_file_optimized': (lambda: read_csv_file(csv_path, optimize=True), None),
+        'read_dataset_parquet': (lambda: read_dataset(paths['parquet']), None),
+        'read_dataset_feather': (lambda: read_dataset(paths['feather']), None),
+        'compute_fill_values': (compute_fill_values, lambda: (df, 'mean')),
+        'handle_missing': (handle_missing, lambda: (df.copy(), 'mean')),
+        'drop_constant': (drop_constant, lambda: (filled.copy(),)),
+        'drop_high_cardinality': (drop_high_cardinality, lambda: (filled.copy(),)),
+        'encode_categorical_label': (encode_categorical, lambda: (reduced.copy(), 'label')),
+        'encode_categorical_onehot': (encode_categorical, lambda: (reduced.copy(), 'onehot')),
+        'scale_features': (scale_features, lambda: (numeric, 'standard'))
+    }
+
+
+def _cleaner(config: dict, state: tuple) -> AdvancedDataCleaner:
+    cleaner = AdvancedDataCleaner(None, config)
+    cleaner.df = state[0].copy()
+    cleaner.sparse_blocks = list(state[1])
+    return cleaner
+
+
+def cleaner_stages(df: pd.DataFrame) -> dict:
+    """
+    Every AdvancedDataCleaner step, in clean_data order, keyed 'cleaner.<step>'.
+    The input of each step is computed once up front by running the default
+    variant of the steps before it; variants of a step share its input.
+    """
+    config = cleaning_config(df)
+    rng = np.random.default_rng(0)
+    steps = [
+        ('normalize_missing_indicators', AdvancedDataCleaner._normalize_missing_indicators, {}),
+        ('handle_missing_values', AdvancedDataCleaner._handle_missing_values, {'knn': {'imputation_method': 'knn'}}),
+        ('handle_outliers', AdvancedDataCleaner._handle_outliers, {'clip': {'outlier_action': 'clip'}}),
+        ('scale_features', AdvancedDataCleaner._scale_features, {}),
+        ('encode_categorical', AdvancedDataCleaner._encode_categorical, {}),
+        ('process_text_columns', AdvancedDataCleaner._process_text_columns,
+         {'hashing': {'text_vectorization': 'hashing'}}),
+        ('reduce_dimensionality', AdvancedDataCleaner._reduce_dimensionality, {}),
+        ('handle_imbalance', AdvancedDataCleaner._handle_imbalance, {}),
+        ('remove_duplicates', AdvancedDataCleaner._remove_duplicates, {})
+    ]
+
+    stages = {}
+    state = (df, [])
+    for name, method, variants in steps:
+        step_config = config
+        if name == 'handle_imbalance':
+            # SMOTE needs numeric features and a class label; a 1-in-10 minority class
+            features = state[0].select_dtypes(include=np.number).drop(columns=['target'])
+            state = (features.assign(label=(rng.random(len(features)) < 0.1).astype(int)), state[1])
+            step_config = dict(config, target_column='label')
+        stages[f'cleaner.{name}'] = (method, lambda c=step_config, s=state: (_cleaner(c, s),))
+        for variant, overrides in variants.items():
+            stages[f'cleaner.{name}.{variant}'] = (
+                method, lambda c=dict(step_config, **overrides), s=state: (_cleaner(c, s),))
+
+        cleaner = _cleaner(step_config, state)
+        method(cleaner)
+        state = (cleaner.df, cleaner.sparse_blocks)
+    return stages
+
+
+def run(args) -> dict:
+    df = make_dataset(args.rows, numeric=args.numeric, categorical=args.categorical, text=args.text,
+                      missing_ratio=args.missing_ratio, seed=args.seed)
+    pattern = re.compile(args.stages) if args.stages else None
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        paths = {fmt: os.path.join(directory, f'bench.{fmt}') for fmt in ('csv', 'parquet', 'feather')}
+        df.to_csv(paths['csv'], index=False)
+        df.to_parquet(paths['parquet'], index=False)
+        df.to_feather(paths['feather'], compression='uncompressed')
+        stages = {**preprocessing_stages(df, paths), **cleaner_stages(df)}
+        for name, (fn, setup) in stages.items():
+            if pattern and not pattern.search(name):
+                continue
+            results[name] = measure(fn, setup, repeat=args.repeat)
+            r = results[name]
+            print(f"{name:40s} {r['wall_seconds']:9.4f}s  cpu {r['cpu_seconds']:9.4f}s  peak {r['peak_mb']:9.1f} MB",
+                  file=sys.stderr)
+
+    return {
+        'meta': {
+            'rows': args.rows, 'numeric': args.numeric, 'categorical': args.categorical, 'text': args.text,
+            'missing_ratio': args.missing_ratio, 'seed': args.seed, 'repeat': args.repeat,
+            'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+            'sklearn': sklearn.__version__, 'machine': platform.machine(), 'cpu_count': os.cpu_count(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')
+        },
+        'results': results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--numeric', type=int, default=10)
+    parser.add_argument('--categorical', type=int, default=4)
+    parser.add_argument('--text', type=int, default=1)
+    parser.add_argument('--missing-ratio', type=float, default=0.05)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--stages', help="only run stages whose name matches this regex")
+    parser.add_argument('--output', help="write the JSON results to this file (default: stdout)")
+    parser.add_argument('--compare', help="baseline JSON from an earlier run")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="allowed relative growth of wall time / peak memory (default 0.2)")
+    args = parser.parse_args()
+
+    # The cleaner logs every step at INFO
+    logging.disable(logging.INFO)
+    warnings.simplefilter('ignore', FutureWarning)
+    report = run(args)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline['meta'].get('rows') != args.rows:
+            print(f"warning: baseline ran on {baseline['meta'].get('rows')} rows, this run on {args.rows}",
+                  file=sys.stderr)
+        regressions = compare(baseline['results'], report['results'], args.threshold)
+        for stage, metric, old, new in regressions:
+            print(f"REGRESSION {stage} {metric}: {old:.4f} -> {new:.4f} ({(new / old - 1) * 100:+.0f}%)",
+                  file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions past {args.threshold:.0%}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,2 @@
+# conftest.py
+# Lets the tests under tests/ import the app package when run from server/
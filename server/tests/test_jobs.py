@@ -0,0 +1,105 @@
+# tests/test_jobs.py
+import os
+import time
+import numpy as np
+import pytest
+from sklearn.tree import DecisionTreeRegressor
+
+from app.services import jobs
+from app.services.jobs import JobManager
+
+
+def wait(manager: JobManager, job_id: str, timeout: float = 60) -> dict:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        info = manager.status(job_id)
+        if info['status'] in ('completed', 'failed'):
+            return info
+        time.sleep(0.05)
+    raise TimeoutError(f"Job {job_id} did not finish")
+
+
+def test_pool_recovers_after_worker_dies():
+    manager = JobManager(max_workers=1, executor="process")
+    try:
+        crashed = manager.submit("crash", os._exit, 1)
+        assert wait(manager, crashed)['status'] == 'failed'
+
+        job_id = manager.submit("sum", sum, [1, 2, 3])
+        assert wait(manager, job_id)['status'] == 'completed'
+        assert manager.result(job_id) == 6
+    finally:
+        manager.shutdown()
+
+
+
+@pytest.fixture
+def four_cores(monkeypatch):
+    # The default configuration on a 4-core machine: one job worker per core
+    monkeypatch.setattr(os, "cpu_count", lambda: 4)
+    monkeypatch.setattr(jobs, "JOB_WORKERS", 4)
+
+
+def record_parallel(monkeypatch, module) -> list:
+    """Replace module's joblib Parallel with one that records n_jobs and runs in process."""
+    seen = []
+    real_parallel = module.Parallel
+
+    def recording_parallel(n_jobs=None, **kwargs):
+        seen.append(n_jobs)
+        kwargs.pop('timeout', None)  # not supported in process
+        return real_parallel(n_jobs=1, **kwargs)
+
+    monkeypatch.setattr(module, "Parallel", recording_parallel)
+    return seen
+
+
+def run_lone_job(fn, *args):
+    manager = JobManager(max_workers=4, executor="thread")
+    try:
+        job_id = manager.submit("test", fn, *args)
+        assert wait(manager, job_id)['status'] == 'completed', manager.status(job_id)
+        return manager.result(job_id)
+    finally:
+        manager.shutdown()
+
+
+def test_lone_compare_job_fits_models_in_parallel(tmp_path, monkeypatch, four_cores):
+    from app.services import train_service
+
+    path = tmp_path / "data.csv"
+    path.write_text("a,b,t\n" + "".join(f"{i},{i % 7},{2 * i + 1}\n" for i in range(60)))
+    seen = record_parallel(monkeypatch, train_service)
+    run_lone_job(
+        train_service.compare_models_service, str(path),
+        ["LinearRegression", "DecisionTree"], "standard", 0.8, "mean", "label"
+    )
+    assert seen == [2]
+
+
+def test_lone_search_job_scores_candidates_in_parallel(monkeypatch, four_cores):
+    from app.services import search_service
+
+    rng = np.random.default_rng(0)
+    X = rng.random((300, 3))
+    y = X @ [1.0, 2.0, 3.0]
+    seen = record_parallel(monkeypatch, search_service)
+    result = run_lone_job(
+        search_service.successive_halving_search, DecisionTreeRegressor,
+        search_service.PARAM_SPACES["DecisionTree"], X, y, 30.0, 9
+    )
+    assert result['best_params']
+    assert seen and all(n_jobs > 1 for n_jobs in seen)
+
+
+def test_lone_permutation_job_scores_features_in_parallel(monkeypatch, four_cores):
+    from app.services import importance_service
+
+    rng = np.random.default_rng(0)
+    X = rng.random((200, 3))
+    y = X @ [1.0, 2.0, 3.0]
+    model = DecisionTreeRegressor(random_state=0).fit(X, y)
+    seen = record_parallel(monkeypatch, importance_service)
+    result = run_lone_job(importance_service.permutation_importance, model, X, y, ["a", "b", "c"], 30.0)
+    assert result['features_scored'] == 3
+    assert seen == [3]
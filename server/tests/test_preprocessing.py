@@ -0,0 +1,19 @@
+# tests/test_preprocessing.py
+import numpy as np
+import pandas as pd
+
+from app.services.train_service import train_model_service
+
+
+def test_text_target_with_onehot_encoding_trains(tmp_path):
+    # Regression: the target used to be resolved before encoding, and get_dummies
+    # replaces a text target column, so the split raised KeyError
+    rng = np.random.default_rng(0)
+    path = tmp_path / "data.csv"
+    pd.DataFrame({
+        'a': rng.random(60),
+        'b': rng.choice(['x', 'y', 'z'], 60),
+        't': rng.choice(['low', 'high'], 60)
+    }).to_csv(path, index=False)
+    result = train_model_service(str(path), "LinearRegression", "standard", 0.8, "mean", "onehot")
+    assert list(result['columns']) == ['a']